@@ -0,0 +1,225 @@
+# ---------------------------
+# AJUSTE DE PRECIOS POR REGIÓN, INFLACIÓN Y MONEDA (sin Streamlit)
+# ---------------------------
+# Los catálogos guardan un solo juego de precios de referencia (USD, Quito). Un
+# perfil (región, moneda, fecha) no crea una copia ajustada de cada tabla: se
+# calcula un vector de factores por fila y se multiplica recién al leer o
+# exportar un presupuesto (o al descargar un catálogo ajustado).
+#   factor = general de la región × factor por CATEGORIA × factor por FUENTE
+#            × (1 + inflación anual) ^ años desde FECHA_ACTUALIZACION
+#            × unidades de la moneda por USD
+# - Inflación: la de la CATEGORIA; si no hay, la de la FUENTE; si no, la general ("*").
+# - Los precios propios de un presupuesto solo cambian de moneda.
+# - Las tablas de factores viven en SQLite (ARQUIPRO_AJUSTES) y se leen una vez
+#   por proceso; el vector de factores se guarda por tabla y perfil hasta que
+#   cambien los factores.
+import os
+import sqlite3
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from catalogo import PRECIO, fecha_iso
+
+RUTA_AJUSTES = os.environ.get(
+    "ARQUIPRO_AJUSTES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "datos", "ajustes.sqlite")
+)
+REGION_REFERENCIA = "Quito (ref.)"
+MONEDA_REFERENCIA = "USD"
+TODOS = "*"
+COLUMNAS_FACTOR = ["CATEGORIA", "FUENTE"]  # columnas del catálogo por las que se ajusta
+CAPACIDAD_CACHE = 16  # vectores de factores en memoria
+
+TABLAS_AJUSTE = {
+    # COLUMNA: "CATEGORIA", "FUENTE" o "*" (factor general de la región); VALOR "*" = cualquier valor
+    "factores": ["REGION", "COLUMNA", "VALOR", "FACTOR"],
+    "inflacion": ["COLUMNA", "VALOR", "PCT_ANUAL"],
+    "monedas": ["MONEDA", "POR_USD", "SIMBOLO"],
+}
+_CLAVES = {"factores": ["REGION", "COLUMNA", "VALOR"], "inflacion": ["COLUMNA", "VALOR"], "monedas": ["MONEDA"]}
+_NUMERICAS = {"factores": "FACTOR", "inflacion": "PCT_ANUAL", "monedas": "POR_USD"}
+
+
+class Perfil:
+    def __init__(self, region=REGION_REFERENCIA, moneda=MONEDA_REFERENCIA, fecha=None):
+        self.region = region
+        self.moneda = moneda
+        self.fecha = None if fecha is None else pd.Timestamp(fecha).date().isoformat()  # inflación hasta esta fecha
+
+    def clave(self):
+        return (self.region, self.moneda, self.fecha)
+
+    def neutro(self):
+        return self.region == REGION_REFERENCIA and self.moneda == MONEDA_REFERENCIA and self.fecha is None
+
+    def __repr__(self):
+        return f"Perfil({self.region!r}, {self.moneda!r}, {self.fecha!r})"
+
+
+def _mapear(serie, valores, defecto):
+    # serie de texto -> valores de un dict, con un factorize (pocas categorías, muchas filas)
+    codigos, unicos = pd.factorize(serie.fillna("").astype(str))
+    mapeados = pd.Series(unicos).map(valores).fillna(defecto).to_numpy(dtype=float)
+    return mapeados[codigos] if len(codigos) else np.zeros(0)
+
+
+class AlmacenAjustes:
+    def __init__(self, ruta=RUTA_AJUSTES):
+        self.ruta = ruta
+        self.version = 0  # sube con cada cambio de factores (invalida los vectores en memoria)
+        self._lock = threading.Lock()
+        self._tablas = {}
+        self._cache = OrderedDict()  # (id(df), filas, perfil, version) -> (weakref df, factores)
+        if os.path.dirname(ruta):
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with self._conectar() as con:
+            for nombre, cols in TABLAS_AJUSTE.items():
+                defs = ", ".join(f"{c} {'REAL' if c == _NUMERICAS[nombre] else 'TEXT'}" for c in cols)
+                con.execute(f"CREATE TABLE IF NOT EXISTS {nombre} ({defs}, PRIMARY KEY ({', '.join(_CLAVES[nombre])}))")
+            con.execute("INSERT OR IGNORE INTO monedas VALUES (?, 1.0, '$')", (MONEDA_REFERENCIA,))
+        self._leer()
+
+    def _conectar(self):
+        return sqlite3.connect(self.ruta, timeout=30)
+
+    def _leer(self):
+        with self._conectar() as con:
+            tablas = {n: pd.read_sql_query(f"SELECT * FROM {n} ORDER BY rowid", con) for n in TABLAS_AJUSTE}
+        with self._lock:
+            self._tablas = tablas
+            self._cache.clear()
+            self.version += 1
+
+    def tabla(self, nombre):
+        return self._tablas[nombre]
+
+    def guardar_tabla(self, nombre, df):
+        # Reemplaza la tabla completa (p. ej. lo editado en la app); filas sin clave se ignoran
+        cols, claves, num = TABLAS_AJUSTE[nombre], _CLAVES[nombre], _NUMERICAS[nombre]
+        df = pd.DataFrame(df).reindex(columns=cols)
+        for c in cols:
+            if c != num:
+                df[c] = df[c].astype(object).where(df[c].notna(), "").astype(str).str.strip()
+        df[num] = pd.to_numeric(df[num], errors="coerce")
+        df = df[(df[claves] != "").all(axis=1) & df[num].notna()].drop_duplicates(claves, keep="last")
+        if nombre == "factores" and not df["COLUMNA"].isin(COLUMNAS_FACTOR + [TODOS]).all():
+            raise ValueError(f"COLUMNA debe ser una de: {', '.join(COLUMNAS_FACTOR + [TODOS])}")
+        if nombre == "monedas":
+            if (df[num] <= 0).any():
+                raise ValueError("POR_USD debe ser mayor que cero")
+            if MONEDA_REFERENCIA not in set(df["MONEDA"]):
+                df = pd.concat([pd.DataFrame([[MONEDA_REFERENCIA, 1.0, "$"]], columns=cols), df], ignore_index=True)
+        with self._conectar() as con:
+            con.execute(f"DELETE FROM {nombre}")
+            con.executemany(f"INSERT INTO {nombre} VALUES ({', '.join('?' * len(cols))})",
+                            df.astype(object).where(df.notna(), None).itertuples(index=False, name=None))
+        self._leer()
+        return len(df)
+
+    def regiones(self):
+        return [REGION_REFERENCIA] + [r for r in pd.unique(self._tablas["factores"]["REGION"]) if r != REGION_REFERENCIA]
+
+    def monedas(self):
+        return self._tablas["monedas"]["MONEDA"].tolist()
+
+    def tasa(self, moneda):
+        m = self._tablas["monedas"]
+        fila = m[m["MONEDA"] == moneda]
+        if fila.empty:
+            raise KeyError(moneda)
+        return float(fila["POR_USD"].iloc[-1])
+
+    def _region(self, df, region):
+        # general × CATEGORIA × FUENTE; un VALOR "*" cubre los valores sin factor propio
+        f = np.ones(len(df))
+        fac = self._tablas["factores"]
+        fac = fac[fac["REGION"] == region]
+        if fac.empty:
+            return f
+        general = fac[fac["COLUMNA"] == TODOS]
+        if len(general):
+            f *= float(general["FACTOR"].prod())
+        for col in COLUMNAS_FACTOR:
+            sub = fac[fac["COLUMNA"] == col]
+            if sub.empty or col not in df.columns:
+                continue
+            defecto = sub.loc[sub["VALOR"] == TODOS, "FACTOR"]
+            f *= _mapear(df[col], dict(zip(sub["VALOR"], sub["FACTOR"])), float(defecto.iloc[-1]) if len(defecto) else 1.0)
+        return f
+
+    def _inflacion(self, df, fecha):
+        inf = self._tablas["inflacion"]
+        if fecha is None or inf.empty or "FECHA_ACTUALIZACION" not in df.columns:
+            return np.ones(len(df))
+        general = inf.loc[(inf["COLUMNA"] == TODOS) | (inf["VALOR"] == TODOS), "PCT_ANUAL"]
+        pct = np.full(len(df), float(general.iloc[-1]) if len(general) else 0.0)
+        # primero FUENTE y después CATEGORIA, así la CATEGORIA tiene prioridad
+        for col in ["FUENTE", "CATEGORIA"]:
+            sub = inf[(inf["COLUMNA"] == col) & (inf["VALOR"] != TODOS)]
+            if len(sub) and col in df.columns:
+                propio = _mapear(df[col], dict(zip(sub["VALOR"], sub["PCT_ANUAL"])), np.nan)
+                pct = np.where(np.isnan(propio), pct, propio)
+        # las fechas se repiten mucho: se interpreta cada fecha distinta una sola vez
+        codigos, unicas = pd.factorize(df["FECHA_ACTUALIZACION"].astype(str))
+        desde = pd.to_datetime(fecha_iso(unicas), errors="coerce")
+        anios = ((pd.Timestamp(fecha) - desde).dt.days / 365.25).to_numpy(dtype=float, na_value=0.0)
+        return (1 + pct / 100) ** np.maximum(anios[codigos] if len(codigos) else np.zeros(0), 0.0)
+
+    def factores(self, df, perfil):
+        # Vector de factores (uno por fila de df) para llevar sus precios de referencia al perfil.
+        # Se recalcula solo si cambia la tabla (otro objeto), el perfil o los factores.
+        clave = (id(df), len(df), perfil.clave(), self.version)
+        with self._lock:
+            en_cache = self._cache.get(clave)
+            if en_cache is not None and en_cache[0]() is df:
+                self._cache.move_to_end(clave)
+                return en_cache[1]
+        f = self._region(df, perfil.region) * self._inflacion(df, perfil.fecha) * self.tasa(perfil.moneda)
+        f.setflags(write=False)
+        with self._lock:
+            self._cache[clave] = (weakref.ref(df), f)
+            while len(self._cache) > CAPACIDAD_CACHE:
+                self._cache.popitem(last=False)
+        return f
+
+    def ajustar(self, df, perfil, columnas=None):
+        # Copia de df con las columnas de precio ajustadas (para exportar un catálogo)
+        columnas = [c for c in (columnas or dict.fromkeys(PRECIO.values())) if c in df.columns]
+        if perfil.neutro() or not columnas:
+            return df
+        f = self.factores(df, perfil)
+        return df.assign(**{c: pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=float) * f for c in columnas})
+
+    def factores_presupuesto(self, p, catalogo, perfil):
+        # Un factor por línea de p: el de su fila del catálogo; los precios propios solo cambian de moneda
+        tasa = self.tasa(perfil.moneda)
+        if perfil.neutro() or not len(p):
+            return np.full(len(p), tasa)
+        pos = p.posiciones(catalogo)
+        f = self.factores(catalogo, perfil)
+        en_catalogo = np.where(pos >= 0, f[np.maximum(pos, 0)] if len(f) else tasa, tasa)
+        return np.where(np.isnan(p.precio), en_catalogo, tasa)
+
+    def vista(self, p, catalogo, perfil):
+        # p.vista(catalogo) con los precios del perfil (para PDF y exportación)
+        vista = p.vista(catalogo)
+        if not perfil.neutro():
+            vista["PRECIO_UNITARIO_USD"] = vista["PRECIO_UNITARIO_USD"].to_numpy(dtype=float) * \
+                self.factores_presupuesto(p, catalogo, perfil)
+        return vista
+
+
+_almacenes = {}
+_lock_almacenes = threading.Lock()
+
+
+def abrir_ajustes(ruta=RUTA_AJUSTES):
+    # Un almacén de factores por ruta y por proceso
+    with _lock_almacenes:
+        alm = _almacenes.get(ruta)
+        if alm is None:
+            alm = _almacenes[ruta] = AlmacenAjustes(ruta)
+        return alm
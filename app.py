@@ -1,12 +1,9 @@
+import os
 import streamlit as st
-import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
 from datetime import datetime
-from io import BytesIO
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
+from registro import obtener_hoja, cola_registros
+from tema import css
+from metricas import tramo, contar, inicio_rerun, fin_rerun, antes_del_rerun, configurar_desde_entorno, a_json, a_prometheus
 
 # ---------------------------
 # CONFIGURACIÓN GENERAL
@@ -16,73 +13,15 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="collapsed"
 )
+# Tramos de tiempo y contadores de esta ejecución (ver metricas.py)
+configurar_desde_entorno()
+inicio_rerun()
 
-# Tema oscuro + acentos verde claro + botón ayuda amarillo
+# Tema oscuro + acentos verde claro + botón ayuda amarillo (CSS armado una vez, ver tema.py)
 def inject_theme(dark=True):
-    if dark:
-        st.markdown("""
-            <style>
-            html, body, [class*="css"]  {
-              background-color: #121212 !important;
-              color: #FFFFFF !important;
-              font-family: Inter, system-ui, -apple-system, Segoe UI, Roboto, "Helvetica Neue", Arial;
-            }
-            .stButton>button {
-              border-radius: 12px;
-              border: 2px solid #7CFFB2;
-              background: #1E1E1E;
-              color: #FFFFFF;
-            }
-            .stButton>button:hover {
-              border-color: #B5FFD4;
-              background: #2A2A2A;
-            }
-            .help-btn button{
-              background: #FFD400 !important;
-              color: #000 !important;
-              border: 0 !important;
-              font-weight: 700 !important;
-            }
-            .accent{
-              border: 1px solid #7CFFB2 !important;
-              border-radius: 12px;
-              padding: 8px 12px;
-            }
-            </style>
-        """, unsafe_allow_html=True)
-    else:
-        st.markdown("""
-            <style>
-            html, body, [class*="css"]  {
-              background-color: #FAFAFA !important;
-              color: #111 !important;
-              font-family: Inter, system-ui, -apple-system, Segoe UI, Roboto, "Helvetica Neue", Arial;
-            }
-            .stButton>button {
-              border-radius: 12px;
-              border: 2px solid #2ecc71;
-              background: #FFFFFF;
-              color: #111;
-            }
-            .stButton>button:hover {
-              border-color: #35d47a;
-              background: #F3FFF8;
-            }
-            .help-btn button{
-              background: #FFD400 !important;
-              color: #000 !important;
-              border: 0 !important;
-              font-weight: 700 !important;
-            }
-            .accent{
-              border: 1px solid #2ecc71 !important;
-              border-radius: 12px;
-              padding: 8px 12px;
-            }
-            </style>
-        """, unsafe_allow_html=True)
-
-inject_theme(dark=True)
+    st.markdown(css(dark), unsafe_allow_html=True)
+
+inject_theme(dark=st.session_state.get("tema", "Oscuro") == "Oscuro")
 
 # Branding fijo (solo en la app, NO va al PDF)
 st.title("🏠 Presupuestos – Arqui-Pro")
@@ -91,16 +30,11 @@ st.caption("Sistema profesional de presupuestos para construcción y remodelaci
 # ---------------------------
 # CONEXIÓN GOOGLE SHEETS (REGISTRO)
 # ---------------------------
-SHEET_URL = "https://docs.google.com/spreadsheets/d/1FzV4o3uQafKohDbil0kzfJBHaxmH2QKvOL2MC6gxGE0/edit?usp=sharing"
-SCOPE = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
-
+# La hoja y el cliente se abren una vez por proceso (ver registro.py)
 def get_gsheet():
     try:
-        creds = Credentials.from_service_account_info(st.secrets["gcp_service_account"], scopes=SCOPE)
-        client = gspread.authorize(creds)
-        sh = client.open_by_url(SHEET_URL)
-        ws = sh.sheet1  # Hoja 1: "Usuarios registrados" con columnas: Nombre y Apellido | WhatsApp | Email | Fecha/Hora
-        return ws
+        with tramo("sheets.obtener_hoja"):
+            return obtener_hoja(st.secrets["gcp_service_account"])
     except Exception as e:
         st.error("❌ Error conectando a Google Sheets. Revisa `Secrets` y comparte la hoja con el Service Account.")
         st.stop()
@@ -112,49 +46,6 @@ if "registered" not in st.session_state:
     st.session_state.registered = False
 if "view" not in st.session_state:
     st.session_state.view = None
-if "rubros" not in st.session_state:
-    # Plantilla inicial vivienda media-baja (Quito) con cantidades=0
-    data = [
-        # CODIGO, DESCRIPCION, UNIDAD, PRECIO_UNITARIO_USD, CATEGORIA, INCERTIDUMBRE, SUPUESTO_NOTAS, FUENTE, FECHA_ACTUALIZACION
-        ["DEM-001","Limpieza y trazo de terreno","m²",0.80,"Demoliciones/Preparación","Baja","Terreno accesible, sin escombros previos","Ref. local","2025-08-31"],
-        ["MOV-001","Excavación manual zanjas cimentación","m³",10.50,"Cimentación","Media","Suelo tipo II, sin agua","Ref. local","2025-08-31"],
-        ["CIM-001","Cimentación corrida hormigón ciclópeo","m³",85.00,"Cimentación","Media","Dosificación 120 kg, piedra disponible","Ref. local","2025-08-31"],
-        ["EST-001","Columna de hormigón armado f'c=210 kg/cm²","m³",165.00,"Estructura","Media","Acero #3-#5, cimbras reutilizables","Ref. local","2025-08-31"],
-        ["EST-002","Viga/Cadena de amarre f'c=210 kg/cm²","m³",160.00,"Estructura","Media","Longitudes regulares","Ref. local","2025-08-31"],
-        ["EST-003","Losa maciza de hormigón armado 12 cm","m²",24.00,"Estructura","Media","Espesor 12 cm, malla 6-6/10-10","Ref. local","2025-08-31"],
-        ["MAN-001","Muro bloque cemento 15 cm","m²",18.50,"Mampostería","Media","Bloque estándar, mortero 1:4","Ref. local","2025-08-31"],
-        ["MAN-002","Tabique interior bloque 10 cm","m²",16.00,"Mampostería","Media","Altura ≤ 2.6 m","Ref. local","2025-08-31"],
-        ["INS-001","Instalación sanitaria baño completo","ud",320.00,"Instalaciones","Alta","Incluye tuberías y aparatos básicos","Ref. local","2025-08-31"],
-        ["INS-002","Instalación eléctrica vivienda tipo (hasta 60 m²)","ud",380.00,"Instalaciones","Alta","Canalización y tablero básico","Ref. local","2025-08-31"],
-        ["ACB-001","Piso cerámico económico","m²",11.50,"Acabados","Media","Incluye adhesivo, junta","Ref. local","2025-08-31"],
-        ["ACB-002","Revestimiento cerámico pared (baño/cocina)","m²",13.50,"Acabados","Media","Altura 1.50 m","Ref. local","2025-08-31"],
-        ["ACB-003","Enlucido y pintura interior","m²",6.80,"Acabados","Media","Pintura látex estándar","Ref. local","2025-08-31"],
-        ["ACB-004","Pintura exterior","m²",7.50,"Acabados","Media","Sellador + 2 manos","Ref. local","2025-08-31"],
-        ["CAR-001","Puerta metálica simple","ud",140.00,"Carpintería/Cerrajería","Alta","Incluye bisagras y cerradura simple","Ref. local","2025-08-31"],
-        ["CAR-002","Ventana metálica c/vidrio 1.20x1.00","ud",120.00,"Carpintería/Cerrajería","Media","Perfilería liviana","Ref. local","2025-08-31"],
-        ["CBT-001","Estructura metálica para cubierta liviana","m²",18.00,"Cubierta","Media","Luz corta","Ref. local","2025-08-31"],
-        ["CBT-002","Cubierta teja fibrocemento","m²",12.00,"Cubierta","Media","Incluye fijaciones","Ref. local","2025-08-31"],
-        ["IMP-001","Impermeabilización losa expuesta","m²",9.50,"Impermeabilización","Alta","Membrana asfáltica 3 mm","Ref. local","2025-08-31"],
-        ["EXT-001","Cerramiento perimetral en bloque","m²",19.00,"Exteriores","Media","Altura 2.00 m","Ref. local","2025-08-31"],
-        ["EXT-002","Acceso peatonal hormigón simple","m²",10.00,"Exteriores","Baja","Espesor 8 cm","Ref. local","2025-08-31"],
-    ]
-    df = pd.DataFrame(data, columns=[
-        "CODIGO","DESCRIPCION","UNIDAD","PRECIO_UNITARIO_USD","CATEGORIA","INCERTIDUMBRE","SUPUESTO_NOTAS","FUENTE","FECHA_ACTUALIZACION"
-    ])
-    df["CANTIDAD"] = 0.0
-    st.session_state.rubros = df
-
-if "materiales" not in st.session_state:
-    st.session_state.materiales = pd.DataFrame(columns=["CODIGO","DESCRIPCION","UNIDAD","PRECIO_UNITARIO_USD","FUENTE","FECHA_ACTUALIZACION"])
-
-if "mano_obra" not in st.session_state:
-    st.session_state.mano_obra = pd.DataFrame(columns=["CODIGO","DESCRIPCION","UNIDAD","COSTO_UNITARIO_USD","RENDIMIENTO","FUENTE","FECHA_ACTUALIZACION"])
-
-if "herramientas" not in st.session_state:
-    st.session_state.herramientas = pd.DataFrame(columns=["CODIGO","DESCRIPCION","UNIDAD","TARIFA_USO_USD","FUENTE","FECHA_ACTUALIZACION"])
-
-if "presupuestos" not in st.session_state:
-    st.session_state.presupuestos = {}  # nombre -> DataFrame de rubros
 
 
 # ---------------------------
@@ -174,7 +65,8 @@ def show_register():
                 st.stop()
             ws = get_gsheet()
             fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            ws.append_row([nombre, whatsapp, email, fecha])
+            # se envía en segundo plano, en lote con otros registros
+            cola_registros(ws).encolar([nombre, whatsapp, email, fecha])
             st.session_state.registered = True
             st.success("✅ Registro exitoso. Bienvenido a Arqui-Pro.")
 
@@ -185,14 +77,66 @@ if not st.session_state.registered:
 # MENÚ PRINCIPAL
 # ---------------------------
 if st.session_state.registered:
-    # Modo claro/oscuro (opcional)
+    # pandas, el catálogo y los cálculos se cargan recién aquí (la pantalla de
+    # registro no los necesita); Python los importa una sola vez por proceso
+    import numpy as np
+    import pandas as pd
+    from calculo import totales
+    import secrets
+    from catalogo import abrir_catalogo, CapaSesion, TABLAS, vista_capa
+    from apu import MotorAPU, TIPOS, motor_sesion
+    from edicion import TablaEditable
+    from presupuesto import Presupuesto
+    from espacio import abrir_almacen, ConflictoVersion, nuevo_espacio, espacio_valido, DIAS_INACTIVIDAD
+    from riesgo import simular
+    from importacion import importar, FORMATOS
+    from historial import deriva_compartida, comparar_presupuesto
+    from revisiones import comparar, fusionar
+    from cache_pdf import pdf_en_cache
+    from cubicacion import VARIABLES, REGLAS, cantidades, rejilla, barrido
+    from ajustes import abrir_ajustes, Perfil, TABLAS_AJUSTE
+    from busqueda import indice_compartido
+
+    # Catálogo compartido (una carga por proceso); cada sesión guarda solo sus cambios
+    catalogo = abrir_catalogo()
+    for _tabla in TABLAS:
+        if _tabla not in st.session_state:
+            st.session_state[_tabla] = CapaSesion(catalogo, _tabla)
+
+    # Los presupuestos viven en el servidor, por espacio de trabajo (ver espacio.py);
+    # la sesión solo guarda el código (opaco) del espacio. El código viaja en la URL
+    # (?espacio=...): al recargar o abrir el enlace guardado se vuelve al mismo espacio
+    almacen = abrir_almacen()
+    if "espacio" not in st.session_state:
+        en_url = st.query_params.get("espacio", "")
+        st.session_state.espacio = en_url if espacio_valido(en_url) else nuevo_espacio()
+        almacen.tocar(st.session_state.espacio)
+
+    # Factores por región, inflación y moneda (ver ajustes.py); los catálogos siguen en USD de referencia
+    ajustes = abrir_ajustes()
+
+    # Modo claro/oscuro (opcional); el CSS se inyecta arriba, una vez por ejecución
     with st.sidebar:
         st.markdown("### Apariencia")
-        modo = st.radio("Tema", ["Oscuro", "Claro"], index=0)
-        if modo == "Oscuro":
-            inject_theme(dark=True)
-        else:
-            inject_theme(dark=False)
+        st.radio("Tema", ["Oscuro", "Claro"], index=0, key="tema")
+        st.markdown("### Espacio de trabajo")
+        codigo = st.text_input("Código del espacio (compártelo solo con tu equipo)", st.session_state.espacio,
+                               key="espacio_codigo").strip()
+        if codigo != st.session_state.espacio:
+            if espacio_valido(codigo):
+                st.session_state.espacio = codigo
+                almacen.tocar(codigo)
+            else:
+                st.error("Código de espacio no válido: pega el código completo que te compartieron.")
+        st.caption("Guarda el enlace de esta página (o el código): es la única forma de volver a tus presupuestos. "
+                   f"Los espacios sin uso por {DIAS_INACTIVIDAD} días se borran.")
+        st.markdown("### Precios")
+        region = st.selectbox("Región", ajustes.regiones(), key="region")
+        moneda = st.selectbox("Moneda", ajustes.monedas(), key="moneda")
+        al_dia = st.checkbox("Actualizar por inflación a hoy", key="inflacion_hoy")
+    perfil = Perfil(region, moneda, datetime.now().date() if al_dia else None)
+    if st.query_params.get("espacio") != st.session_state.espacio:
+        st.query_params["espacio"] = st.session_state.espacio
 
     st.markdown("## 📌 Menú Principal")
     c1, c2, c3 = st.columns(3)
@@ -216,14 +160,186 @@ if st.session_state.registered:
     st.markdown("---")
 
     # ------------ VISTAS ------------
+    def guardar_en_catalogo(capa):
+        # Los cambios quedan en la sesión hasta confirmarlos en el catálogo compartido
+        if len(capa):
+            col1, col2 = st.columns([3,1])
+            col1.caption(f"{len(capa)} cambio(s) solo en tu sesión.")
+            if col2.button("💾 Guardar en catálogo", key=f"guardar_{capa.nombre}"):
+                capa.confirmar()
+                st.success("Catálogo actualizado.")
+
+    def importar_lista(nombre, tipo=None):
+        # Carga masiva (CSV/Excel/Parquet) directo al catálogo compartido
+        with st.expander("📥 Importar lista de precios (CSV, Excel o Parquet)"):
+            st.caption("Columnas obligatorias: CODIGO, UNIDAD y precio. Los códigos existentes se actualizan "
+                       "solo en las columnas que trae el archivo.")
+            archivo = st.file_uploader("Archivo", type=FORMATOS + ["xls", "txt"], key=f"importar_{nombre}")
+            solo_nuevos = st.checkbox("Solo agregar códigos nuevos (no actualizar existentes)", key=f"importar_nuevos_{nombre}")
+            if archivo is not None and st.button("Importar", key=f"importar_btn_{nombre}"):
+                try:
+                    with st.spinner("Importando..."):
+                        res = importar(catalogo, nombre, archivo, archivo.name, solo_nuevos)
+                except ValueError as e:
+                    st.error(str(e))
+                    return
+                st.success(f"{res['leidas']} fila(s) leídas: {res['nuevas']} nuevas, {res['actualizadas']} actualizadas, "
+                           f"{res['duplicadas']} duplicadas, {len(res['rechazadas'])} rechazadas.")
+                if len(res["rechazadas"]):
+                    st.dataframe(res["rechazadas"].head(500), hide_index=True, use_container_width=True)
+                    st.download_button("Descargar rechazadas (CSV)", res["rechazadas"].to_csv(index=False).encode("utf-8"),
+                                       file_name=f"rechazadas_{nombre}.csv", mime="text/csv")
+                if tipo:
+                    propagar_precios(tipo, res["codigos"])
+
+    def deriva_precios(nombre):
+        # Variación de precios del catálogo entre dos fechas (según el historial)
+        with st.expander("📈 Deriva de precios entre fechas"):
+            col1, col2 = st.columns(2)
+            desde = col1.date_input("Desde", datetime(datetime.now().year, 1, 1), key=f"deriva_desde_{nombre}")
+            hasta = col2.date_input("Hasta", key=f"deriva_hasta_{nombre}")
+            # el body de un expander corre aunque esté cerrado: el informe se memoriza por versión y fechas
+            informe = deriva_compartida((nombre, catalogo.ruta, catalogo.version[nombre]),
+                                        catalogo.historial(nombre), [desde, hasta])
+            cambios = informe[informe["VARIACION"].fillna(0) != 0].sort_values("VARIACION_PCT", ascending=False)
+            st.caption(f"{len(cambios)} código(s) cambiaron de precio.")
+            st.dataframe(cambios.round(2), use_container_width=True)
+
+    def factores_precios(nombre):
+        # Tablas de ajuste (compartidas) y descarga del catálogo con los precios del perfil elegido
+        with st.expander("🌎 Factores por región, inflación y moneda"):
+            st.caption("Los precios del catálogo son de referencia (USD, Quito). La región, la moneda y la "
+                       "inflación elegidas en la barra lateral se aplican al ver, exportar y descargar.")
+            tablas = st.tabs(["Factores por región", "Inflación anual (%)", "Monedas"])
+            for pestana, clave in zip(tablas, TABLAS_AJUSTE):
+                with pestana:
+                    editado = st.data_editor(ajustes.tabla(clave), num_rows="dynamic", use_container_width=True,
+                                             key=f"ajustes_{clave}_{ajustes.version}")
+                    if st.button("Guardar", key=f"ajustes_guardar_{clave}"):
+                        try:
+                            n = ajustes.guardar_tabla(clave, editado)
+                        except ValueError as e:
+                            st.error(str(e))
+                        else:
+                            st.success(f"{n} fila(s) guardadas.")
+                            st.rerun()
+            if not perfil.neutro():
+                # el CSV ajustado se arma solo a pedido y vale mientras no cambie nada de lo que lo define
+                capa = st.session_state[nombre]
+                clave = (catalogo.version[nombre], capa.revision, perfil.clave(), ajustes.version)
+                listo = st.session_state.get(f"ajustado_{nombre}")
+                if listo is not None and listo[0] != clave:
+                    st.session_state.pop(f"ajustado_{nombre}")
+                    listo = None
+                if listo is None and st.button(f"Preparar catálogo ajustado ({perfil.region}, {perfil.moneda})",
+                                               key=f"ajustado_preparar_{nombre}"):
+                    with tramo("ajustes.descarga"):
+                        ajustado = ajustes.ajustar(rubros_vigentes() if nombre == "rubros" else capa.df(), perfil)
+                        listo = st.session_state[f"ajustado_{nombre}"] = (clave, ajustado.to_csv(index=False).encode("utf-8"))
+                if listo is not None:
+                    st.download_button(f"Descargar catálogo ajustado ({perfil.region}, {perfil.moneda}) (CSV)", listo[1],
+                                       file_name=f"{nombre}_{perfil.moneda}.csv", mime="text/csv", key=f"ajustado_{nombre}_btn")
+
+    def editor_incremental(tabla, clave, al_cambiar=None, disabled=("SUBTOTAL",)):
+        # El editor solo entrega el delta de la edición: se aplica en sitio sobre `tabla`
+        # (subtotales y base incluidos) y se reinicia el widget con una clave nueva.
+        k = f"{clave}_{tabla.version}"
+        def aplicar():
+            with tramo("edicion.delta"):
+                res = tabla.aplicar_delta(st.session_state[k], con_filas=al_cambiar is not None)
+                if al_cambiar:
+                    al_cambiar(res)
+        with tramo("data_editor"):
+            st.data_editor(tabla.df, key=k, on_change=antes_del_rerun(aplicar), num_rows="dynamic",
+                           use_container_width=True, disabled=list(disabled))
+
+    def tabla_rubros():
+        # Vista editable de los rubros; se rehace solo si cambió la capa de la sesión o el catálogo
+        capa = st.session_state.rubros
+        clave = (catalogo.version["rubros"], capa.revision)
+        if st.session_state.get("rubros_tabla_clave") != clave:
+            contar("copias_df")
+            with tramo("rubros.tabla"):
+                st.session_state.rubros_tabla = TablaEditable(capa.df())
+            st.session_state.rubros_tabla_clave = clave
+        return st.session_state.rubros_tabla
+
+    def rubros_vigentes():
+        # Rubros del catálogo con los cambios de la sesión (sin cambios: la tabla compartida);
+        # la vista con cambios vive en una caché del proceso, no en la sesión
+        return vista_capa(st.session_state.rubros)
+
+    def clave_presupuesto(nombre, version):
+        capa = st.session_state.rubros
+        return (st.session_state.espacio, nombre, version, catalogo.version["rubros"], capa.revision)
+
+    def tabla_presupuesto(nombre, p, version):
+        # Vista (líneas + catálogo) solo del presupuesto abierto; se rehace si cambió
+        # el presupuesto en el almacén o los rubros de la sesión
+        clave = clave_presupuesto(nombre, version)
+        if st.session_state.get("presu_tabla_clave") != clave:
+            contar("copias_df")
+            with tramo("presupuesto.vista"):
+                st.session_state.presu_tabla = TablaEditable(p.vista(rubros_vigentes()))
+            st.session_state.presu_tabla_clave = clave
+        return st.session_state.presu_tabla
+
+    def indice(nombre):
+        # Sin cambios propios, la sesión usa el índice compartido del proceso; con cambios,
+        # uno de su capa en la misma caché acotada del proceso
+        capa = st.session_state[nombre]
+        if not len(capa):
+            return indice_compartido((nombre, catalogo.ruta, catalogo.version[nombre]), catalogo.tabla(nombre))
+        return indice_compartido(((nombre, id(capa)), catalogo.ruta, catalogo.version[nombre], capa.revision),
+                                 vista_capa(capa))
+
+    def motor_apu():
+        # Se reconstruye si cambió la composición APU o los precios de insumos del catálogo
+        # compartido (otra sesión pudo confirmar materiales, mano de obra o herramientas)
+        # El motor vive en una caché acotada del proceso (la sesión solo guarda su identificador);
+        # si se descartó por inactividad, se reconstruye y se resincroniza
+        ver = tuple(catalogo.version[t] for t in ["apu", "materiales", "mano_obra", "herramientas"])
+        sesion = st.session_state.setdefault("sesion_id", secrets.token_hex(8))
+        motor, nuevo = motor_sesion((sesion, *ver), lambda: MotorAPU(
+            catalogo.componentes(), vista_capa(st.session_state.materiales),
+            vista_capa(st.session_state.mano_obra), vista_capa(st.session_state.herramientas)))
+        if nuevo:
+            # al reconstruir, sincroniza los rubros cuyo precio no coincide con su APU
+            derivados = motor.precios()
+            rub = rubros_vigentes().drop_duplicates("CODIGO", keep="last").set_index("CODIGO")
+            actuales = rub["PRECIO_UNITARIO_USD"].reindex(derivados.index)
+            aplicar_precios_rubros(derivados[(actuales - derivados).abs().gt(1e-9) | actuales.isna()])
+        return motor
+
+    def aplicar_precios_rubros(nuevos):
+        # Nuevos precios de rubros -> capa de rubros (los presupuestos los toman al leerlos)
+        if len(nuevos):
+            st.session_state.rubros.fijar("PRECIO_UNITARIO_USD", nuevos)
+            st.info(f"APU: {len(nuevos)} rubro(s) recalculados; los presupuestos usan el nuevo precio.")
+
+    def propagar_precios(tipo, codigos):
+        # Cambió el precio de algunos insumos: solo se recalculan los rubros que los usan
+        if not codigos:
+            return
+        tabla, col = TIPOS[tipo]
+        df = st.session_state[tabla].df()
+        precios = df[df["CODIGO"].isin(codigos)].drop_duplicates("CODIGO", keep="last").set_index("CODIGO")[col]
+        aplicar_precios_rubros(motor_apu().cambiar_precios(tipo, precios))
+
     def vista_rubros():
         st.subheader("📋 Rubros (globales)")
         st.info("Edita cantidades y precios. Cantidades iniciales = 0.")
-        df = st.session_state.rubros.copy()
-        df["SUBTOTAL"] = (df["CANTIDAD"] * df["PRECIO_UNITARIO_USD"]).round(2)
-        edited = st.data_editor(df, num_rows="dynamic", use_container_width=True)
-        st.session_state.rubros = edited.drop(columns=["SUBTOTAL"])
+        capa = st.session_state.rubros
+        def registrar(res):
+            capa.registrar(res["filas"], res["borrados"])
+            # la tabla ya tiene el cambio: no hace falta reconstruirla
+            st.session_state.rubros_tabla_clave = (catalogo.version["rubros"], capa.revision)
+        editor_incremental(tabla_rubros(), "editor_rubros", registrar)
         st.success("Cambios guardados en tu sesión.")
+        guardar_en_catalogo(st.session_state.rubros)
+        importar_lista("rubros")
+        deriva_precios("rubros")
+        factores_precios("rubros")
 
         with st.expander("➕ Crear rubro nuevo"):
             colA, colB, colC = st.columns(3)
@@ -248,14 +364,39 @@ if st.session_state.registered:
                         "INCERTIDUMBRE":incertid,"SUPUESTO_NOTAS":supuesto,
                         "FUENTE":fuente,"FECHA_ACTUALIZACION":str(fecha),"CANTIDAD":0.0
                     }
-                    st.session_state.rubros = pd.concat([st.session_state.rubros, pd.DataFrame([new])], ignore_index=True)
+                    st.session_state.rubros.agregar(new)
                     st.success("Rubro agregado.")
 
+        with st.expander("🧮 Análisis de precios unitarios (APU)"):
+            st.caption("Precio del rubro = Σ cantidad × precio del insumo ÷ rendimiento. "
+                       "Si falta el rendimiento de mano de obra se usa el de su tabla.")
+            codigos = rubros_vigentes()["CODIGO"].tolist()  # vista en caché: sin copias por rerun
+            rubro = st.selectbox("Rubro", codigos, key="apu_rubro")
+            motor = motor_apu()
+            comp = motor.desglose(rubro)
+            editado = st.data_editor(
+                comp[["TIPO","INSUMO","CANTIDAD","RENDIMIENTO"]], num_rows="dynamic", use_container_width=True,
+                key=f"apu_{rubro}", column_config={"TIPO": st.column_config.SelectboxColumn("TIPO", options=list(TIPOS))},
+            )
+            if len(comp):
+                st.dataframe(comp, use_container_width=True)
+                st.metric("Precio APU (USD)", f"{comp['COSTO_USD'].sum():,.2f}")
+            if st.button("Guardar APU y aplicar precio"):
+                catalogo.guardar_componentes(rubro, editado)
+                motor_apu()  # al reconstruirse sincroniza este rubro (y cualquier otro desfasado) una sola vez
+                st.success("APU guardado.")
+
     def vista_materiales():
         st.subheader("🧱 Materiales")
-        df = st.session_state.materiales.copy()
-        edited = st.data_editor(df, num_rows="dynamic", use_container_width=True)
-        st.session_state.materiales = edited
+        consulta = st.text_input("🔎 Buscar material", key="buscar_material")
+        if consulta.strip():
+            st.dataframe(indice("materiales").buscar(consulta), hide_index=True, use_container_width=True)
+        edited = st.data_editor(st.session_state.materiales.df(), num_rows="dynamic", use_container_width=True)
+        propagar_precios("material", st.session_state.materiales.actualizar(edited))
+        guardar_en_catalogo(st.session_state.materiales)
+        importar_lista("materiales", "material")
+        deriva_precios("materiales")
+        factores_precios("materiales")
         with st.expander("➕ Crear material"):
             colA, colB, colC = st.columns(3)
             codigo = colA.text_input("Código mat.")
@@ -271,14 +412,18 @@ if st.session_state.registered:
                 else:
                     new = {"CODIGO":codigo,"DESCRIPCION":desc,"UNIDAD":unidad,
                            "PRECIO_UNITARIO_USD":precio,"FUENTE":fuente,"FECHA_ACTUALIZACION":str(fecha)}
-                    st.session_state.materiales = pd.concat([st.session_state.materiales, pd.DataFrame([new])], ignore_index=True)
+                    st.session_state.materiales.agregar(new)
+                    propagar_precios("material", [new["CODIGO"]])
                     st.success("Material agregado.")
 
     def vista_mano():
         st.subheader("👷 Mano de Obra")
-        df = st.session_state.mano_obra.copy()
-        edited = st.data_editor(df, num_rows="dynamic", use_container_width=True)
-        st.session_state.mano_obra = edited
+        edited = st.data_editor(st.session_state.mano_obra.df(), num_rows="dynamic", use_container_width=True)
+        propagar_precios("mano_obra", st.session_state.mano_obra.actualizar(edited))
+        guardar_en_catalogo(st.session_state.mano_obra)
+        importar_lista("mano_obra", "mano_obra")
+        deriva_precios("mano_obra")
+        factores_precios("mano_obra")
         with st.expander("➕ Crear mano de obra"):
             colA, colB, colC = st.columns(3)
             codigo = colA.text_input("Código MO")
@@ -296,14 +441,18 @@ if st.session_state.registered:
                     new = {"CODIGO":codigo,"DESCRIPCION":desc,"UNIDAD":unidad,
                            "COSTO_UNITARIO_USD":costo,"RENDIMIENTO":rend,
                            "FUENTE":fuente,"FECHA_ACTUALIZACION":str(fecha)}
-                    st.session_state.mano_obra = pd.concat([st.session_state.mano_obra, pd.DataFrame([new])], ignore_index=True)
+                    st.session_state.mano_obra.agregar(new)
+                    propagar_precios("mano_obra", [new["CODIGO"]])
                     st.success("Mano de obra agregada.")
 
     def vista_herr():
         st.subheader("🛠️ Herramientas / Equipos")
-        df = st.session_state.herramientas.copy()
-        edited = st.data_editor(df, num_rows="dynamic", use_container_width=True)
-        st.session_state.herramientas = edited
+        edited = st.data_editor(st.session_state.herramientas.df(), num_rows="dynamic", use_container_width=True)
+        propagar_precios("herramienta", st.session_state.herramientas.actualizar(edited))
+        guardar_en_catalogo(st.session_state.herramientas)
+        importar_lista("herramientas", "herramienta")
+        deriva_precios("herramientas")
+        factores_precios("herramientas")
         with st.expander("➕ Crear herramienta"):
             colA, colB, colC = st.columns(3)
             codigo = colA.text_input("Código eq.")
@@ -319,85 +468,15 @@ if st.session_state.registered:
                 else:
                     new = {"CODIGO":codigo,"DESCRIPCION":desc,"UNIDAD":unidad,
                            "TARIFA_USO_USD":tarifa,"FUENTE":fuente,"FECHA_ACTUALIZACION":str(fecha)}
-                    st.session_state.herramientas = pd.concat([st.session_state.herramientas, pd.DataFrame([new])], ignore_index=True)
+                    st.session_state.herramientas.agregar(new)
+                    propagar_precios("herramienta", [new["CODIGO"]])
                     st.success("Herramienta agregada.")
 
-    def make_pdf(budget_df, cliente_nombre, constructor_nombre, constructor_cel, constructor_dir, leyenda, logo_bytes):
-        buffer = BytesIO()
-        c = canvas.Canvas(buffer, pagesize=A4)
-        width, height = A4
-
-        # Logo opcional
-        if logo_bytes is not None:
-            try:
-                img = ImageReader(logo_bytes)
-                c.drawImage(img, width-140, height-100, width=120, height=60, preserveAspectRatio=True, mask='auto')
-            except:
-                pass
-
-        # Encabezado simple
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(40, height-50, "Presupuesto de Obra")
-        c.setFont("Helvetica", 10)
-        c.drawString(40, height-70, f"Cliente: {cliente_nombre}")
-        c.drawString(40, height-85, f"Fecha: {datetime.now().strftime('%Y-%m-%d')}")
-
-        # Tabla
-        y = height - 120
-        headers = ["Código","Descripción","Unidad","Cant.","P.Unit (USD)","Subtotal (USD)"]
-        colw = [60, 220, 50, 50, 80, 80]
-        c.setFont("Helvetica-Bold", 9)
-        x = 40
-        for i, htxt in enumerate(headers):
-            c.drawString(x, y, htxt)
-            x += colw[i]
-        y -= 12
-        c.line(40, y, 40+sum(colw), y)
-        y -= 8
-        c.setFont("Helvetica", 8)
-
-        total = 0.0
-        for _, r in budget_df.iterrows():
-            if y < 120:
-                c.showPage()
-                y = height - 80
-            sub = float(r["CANTIDAD"]) * float(r["PRECIO_UNITARIO_USD"])
-            total += sub
-            vals = [
-                r["CODIGO"],
-                (r["DESCRIPCION"][:55] + "...") if len(r["DESCRIPCION"])>58 else r["DESCRIPCION"],
-                r["UNIDAD"],
-                f'{r["CANTIDAD"]:.2f}',
-                f'{float(r["PRECIO_UNITARIO_USD"]):.2f}',
-                f'{sub:.2f}'
-            ]
-            x = 40
-            for i, v in enumerate(vals):
-                c.drawString(x, y, str(v))
-                x += colw[i]
-            y -= 12
-
-        # Resumen (los % ya vienen calculados afuera)
-        y -= 10
-        c.line(40, y, 40+sum(colw), y); y -= 6
-        c.setFont("Helvetica-Bold", 10)
-        c.drawRightString(40+sum(colw), y, f"Total: {total:.2f} USD"); y -= 20
-
-        # Pie - datos constructor
-        c.setFont("Helvetica", 9)
-        c.drawString(40, 60, f"Constructor: {constructor_nombre}  |  Cel.: {constructor_cel}")
-        if constructor_dir:
-            c.drawString(40, 46, f"Dirección: {constructor_dir}")
-        if leyenda:
-            c.drawString(40, 32, f"Leyenda: {leyenda}")
-
-        c.showPage()
-        c.save()
-        buffer.seek(0)
-        return buffer
-
     def vista_presu():
         st.subheader("➕ Crear/Editar Presupuesto")
+        espacio = st.session_state.espacio
+        st.info(f"Espacio de trabajo: `{espacio}`. Guarda el enlace de esta página para volver a tus presupuestos; "
+                "quien tenga este código ve y edita sus presupuestos.")
         # crear nuevo
         colA, colB = st.columns([2,1])
         nuevo = colA.text_input("Nombre del presupuesto (ej: Vivienda 60 m² – Cliente Pérez)")
@@ -405,25 +484,71 @@ if st.session_state.registered:
             if not nuevo.strip():
                 st.error("Pon un nombre.")
             else:
-                st.session_state.presupuestos[nuevo] = st.session_state.rubros.copy()
-                st.success(f"Presupuesto '{nuevo}' creado.")
+                # solo se copian los rubros con cantidad; el resto se agrega con el buscador
+                try:
+                    almacen.guardar(espacio, nuevo, Presupuesto.desde_df(rubros_vigentes()))
+                    st.success(f"Presupuesto '{nuevo}' creado.")
+                except ConflictoVersion:
+                    st.error(f"Ya existe un presupuesto '{nuevo}' en el espacio '{espacio}'.")
 
         # seleccionar existente
-        if st.session_state.presupuestos:
-            nombres = list(st.session_state.presupuestos.keys())
+        nombres = almacen.nombres(espacio)
+        if nombres:
             sel = st.selectbox("Presupuestos existentes", nombres)
             bcol1, bcol2 = st.columns(2)
             if bcol1.button("Eliminar presupuesto seleccionado"):
-                st.session_state.presupuestos.pop(sel, None)
+                almacen.eliminar(espacio, sel)
+                st.session_state.pop("presu_tabla_clave", None)
                 st.warning("Presupuesto eliminado.")
                 st.stop()
 
+            try:
+                p, version = almacen.cargar(espacio, sel)
+            except KeyError:
+                st.warning("Otro usuario eliminó este presupuesto.")
+                st.stop()
+            if st.session_state.pop("presu_conflicto", False):
+                st.warning("Otro usuario modificó este presupuesto antes que tú: se cargó su versión, repite tu cambio.")
+
+            def guardar(q, ver):
+                # Concurrencia optimista: si otro guardó antes, se descarta el cambio y se recarga
+                try:
+                    return almacen.guardar(espacio, sel, q, ver)
+                except ConflictoVersion:
+                    st.session_state.presu_conflicto = True
+                    st.session_state.pop("presu_tabla_clave", None)
+                    return None
+            st.markdown("#### Agregar rubros desde el catálogo")
+            consulta = st.text_input("🔎 Buscar rubro (código, descripción o categoría)", key="buscar_rubro")
+            if consulta.strip():
+                encontrados = indice("rubros").buscar(consulta, limite=50)
+                marcados = st.dataframe(
+                    encontrados[["CODIGO","DESCRIPCION","UNIDAD","PRECIO_UNITARIO_USD","CATEGORIA","SCORE"]],
+                    hide_index=True, use_container_width=True, on_select="rerun", selection_mode="multi-row",
+                    key="buscar_rubro_sel",
+                )
+                colA, colB = st.columns([1,2])
+                cant = colA.number_input("Cantidad", 0.0, step=1.0, key="buscar_rubro_cant")
+                if colB.button("Agregar seleccionados al presupuesto"):
+                    elegidos = encontrados.iloc[marcados.selection.rows].drop(columns=["SCORE"])
+                    n = p.agregar(elegidos["CODIGO"], cant)
+                    if n and guardar(p, version) is None:
+                        st.rerun()
+                    version += bool(n)
+                    st.success(f"{n} rubro(s) agregados (los que ya estaban no se duplican).")
+
             st.markdown("#### Editar rubros del presupuesto")
-            dfp = st.session_state.presupuestos[sel].copy()
-            dfp["SUBTOTAL"] = (dfp["CANTIDAD"] * dfp["PRECIO_UNITARIO_USD"]).round(2)
-            dfp = st.data_editor(dfp, num_rows="dynamic", use_container_width=True)
-            # guardar cambios
-            st.session_state.presupuestos[sel] = dfp.drop(columns=["SUBTOTAL"])
+            # solo se editan cantidad y precio (los rubros se agregan con el buscador)
+            tabla = tabla_presupuesto(sel, p, version)
+            def registrar(res):
+                nuevas = p.registrar(res["filas"], res["borrados"], rubros_vigentes())
+                nueva_version = guardar(p, version)
+                if nueva_version and not nuevas and len(p) == len(tabla.df):
+                    # la vista ya tiene el cambio: no hace falta reconstruirla
+                    st.session_state.presu_tabla_clave = clave_presupuesto(sel, nueva_version)
+            editables = {"CANTIDAD", "PRECIO_UNITARIO_USD"}
+            editor_incremental(tabla, f"editor_presu_{sel}", registrar,
+                               disabled=[c for c in tabla.df.columns if c not in editables])
 
             # parámetros
             st.markdown("#### Parámetros de cálculo")
@@ -433,24 +558,144 @@ if st.session_state.registered:
             pct_iva        = col3.number_input("IVA (%)", 0.0, 100.0, 15.0, 0.5)
             pct_anticipo   = col4.number_input("Anticipo (%)", 0.0, 100.0, 0.0, 0.5)
 
-            base = float((dfp["CANTIDAD"] * dfp["PRECIO_UNITARIO_USD"]).sum())
-            indirectos = base * pct_indirectos/100
-            subtotal = base + indirectos
-            descuento = subtotal * pct_descuento/100
-            neto = subtotal - descuento
-            iva = neto * pct_iva/100
-            total = neto + iva
-            anticipo = total * pct_anticipo/100
+            parametros = {"pct_indirectos": pct_indirectos, "pct_descuento": pct_descuento,
+                          "pct_iva": pct_iva, "pct_anticipo": pct_anticipo}
+            with tramo("totales"):
+                if perfil.neutro():
+                    tot = totales(tabla.base, **parametros)
+                else:
+                    # precios de referencia × vector de factores del perfil (sin copiar el catálogo)
+                    rub = rubros_vigentes()
+                    base = float(np.nansum(p.cantidad * p.precios(rub) * ajustes.factores_presupuesto(p, rub, perfil)))
+                    tot = totales(base, **parametros)
 
             st.markdown("#### Totales")
-            st.metric("Base (USD)", f"{base:,.2f}")
-            st.metric("Indirectos (USD)", f"{indirectos:,.2f}")
-            st.metric("Subtotal (USD)", f"{subtotal:,.2f}")
-            st.metric("Descuento (USD)", f"{descuento:,.2f}")
-            st.metric("Neto (USD)", f"{neto:,.2f}")
-            st.metric("IVA (USD)", f"{iva:,.2f}")
-            st.metric("TOTAL (USD)", f"{total:,.2f}")
-            st.metric("Anticipo (USD)", f"{anticipo:,.2f}")
+            if not perfil.neutro():
+                st.caption(f"Precios ajustados a {perfil.region}, en {perfil.moneda}"
+                           + (f", con inflación hasta {perfil.fecha}" if perfil.fecha else "") + ".")
+            mon = perfil.moneda
+            st.metric(f"Base ({mon})", f"{tot['base']:,.2f}")
+            st.metric(f"Indirectos ({mon})", f"{tot['indirectos']:,.2f}")
+            st.metric(f"Subtotal ({mon})", f"{tot['subtotal']:,.2f}")
+            st.metric(f"Descuento ({mon})", f"{tot['descuento']:,.2f}")
+            st.metric(f"Neto ({mon})", f"{tot['neto']:,.2f}")
+            st.metric(f"IVA ({mon})", f"{tot['iva']:,.2f}")
+            st.metric(f"TOTAL ({mon})", f"{tot['total']:,.2f}")
+            st.metric(f"Anticipo ({mon})", f"{tot['anticipo']:,.2f}")
+
+            with st.expander("🎲 Riesgo de costo (Monte Carlo por INCERTIDUMBRE)"):
+                st.caption("Cada nivel (Baja/Media/Alta) varía precio y cantidad con una distribución triangular.")
+                escenarios = st.number_input("Escenarios", 1_000, 1_000_000, 100_000, 10_000)
+                if st.button("Simular"):
+                    with st.spinner("Simulando..."):
+                        filas = tabla.df if perfil.neutro() else ajustes.vista(p, rubros_vigentes(), perfil)
+                        riesgo = simular(filas, int(escenarios), pct_indirectos, pct_descuento, pct_iva)
+                    st.caption(f"Montos en {perfil.moneda}.")
+                    st.dataframe(riesgo.round(2), hide_index=True, use_container_width=True)
+
+            with st.expander("📈 Comparar con los precios de otra fecha"):
+                st.caption(f"Cotizado el {p.fecha}. Las líneas con precio propio lo conservan.")
+                fecha = st.date_input("Precios vigentes al", datetime.strptime(p.fecha, "%Y-%m-%d"), key=f"fecha_precios_{sel}")
+                comp = comparar_presupuesto(p, catalogo.historial("rubros"), rubros_vigentes(), fecha)
+                if not perfil.neutro():
+                    # región y moneda del perfil; sin inflación, que aquí es justamente lo que se compara
+                    f = ajustes.factores_presupuesto(p, rubros_vigentes(), Perfil(perfil.region, perfil.moneda))
+                    montos = ["PRECIO_FECHA", "PRECIO_HOY", "SUBTOTAL_FECHA", "SUBTOTAL_HOY", "DIFERENCIA"]
+                    comp[montos] = comp[montos].to_numpy() * f[:, None]
+                col1, col2, col3 = st.columns(3)
+                col1.metric(f"Base al {fecha} ({mon})", f"{comp['SUBTOTAL_FECHA'].sum():,.2f}")
+                col2.metric(f"Base hoy ({mon})", f"{comp['SUBTOTAL_HOY'].sum():,.2f}")
+                col3.metric(f"Diferencia ({mon})", f"{comp['DIFERENCIA'].sum():,.2f}")
+                st.dataframe(comp.round(2), hide_index=True, use_container_width=True)
+
+            with st.expander("📐 Cubicar desde la geometría"):
+                st.caption("Calcula las cantidades a partir de unas pocas medidas de la vivienda.")
+                juego = st.selectbox("Juego de reglas", list(REGLAS), key=f"cub_reglas_{sel}")
+                geo = {}
+                principales = ["AREA_PISO", "PERIMETRO", "ALTURA", "TABIQUES", "PUERTAS", "VENTANAS", "BANOS"]
+                cols = st.columns(4)
+                for k, v in enumerate(principales):
+                    defecto, etiqueta = VARIABLES[v]
+                    geo[v] = cols[k % 4].number_input(etiqueta, 0.0, value=float(defecto), key=f"cub_{v}_{sel}")
+                cub = cantidades(geo, REGLAS[juego])
+                cub = cub[cub > 0]
+                rub = rubros_vigentes()
+                previa = rub.drop_duplicates("CODIGO", keep="last").set_index("CODIGO").reindex(cub.index)
+                st.dataframe(pd.DataFrame({"DESCRIPCION": previa["DESCRIPCION"], "UNIDAD": previa["UNIDAD"], "CANTIDAD": cub}),
+                             use_container_width=True)
+                if st.button("Aplicar cantidades al presupuesto"):
+                    n = p.fijar_cantidades(cub.index, cub.to_numpy())
+                    if guardar(p, version) is not None:
+                        st.session_state.pop("presu_tabla_clave", None)
+                        st.session_state.cub_aplicado = n
+                    st.rerun()
+                if "cub_aplicado" in st.session_state:
+                    st.success(f"Cantidades aplicadas ({st.session_state.pop('cub_aplicado')} rubro(s) nuevos).")
+
+                st.markdown("**Factibilidad: variantes de planta**")
+                st.caption("Perímetro y tabiques se escalan con el área, a partir de las medidas de arriba.")
+                colA, colB, colC = st.columns(3)
+                areas = colA.slider("Área de piso (m²)", 20, 400, (40, 120), key=f"cub_areas_{sel}")
+                alturas = colB.multiselect("Alturas (m)", [2.4, 2.5, 2.6, 2.8, 3.0], [2.5], key=f"cub_alturas_{sel}")
+                banos = colC.multiselect("Baños", [1, 2, 3], [1, 2], key=f"cub_banos_{sel}")
+                if alturas and banos:
+                    with tramo("cubicacion.barrido"):
+                        variantes = rejilla(AREA_PISO=np.arange(areas[0], areas[1] + 1, 5, dtype=float),
+                                            ALTURA=alturas, BANOS=banos)
+                        escala = variantes["AREA_PISO"] / max(geo["AREA_PISO"], 1.0)
+                        variantes["PERIMETRO"] = geo["PERIMETRO"] * np.sqrt(escala)
+                        variantes["TABIQUES"] = geo["TABIQUES"] * escala
+                        for v in ["PUERTAS", "VENTANAS"]:
+                            variantes[v] = geo[v]
+                        # precios de referencia × vector de factores en caché (sin copia ajustada del catálogo)
+                        estudio = barrido(variantes, rub, REGLAS[juego], parametros,
+                                          None if perfil.neutro() else ajustes.factores(rub, perfil))
+                    st.caption(f"Base, total y costo por m² en {perfil.moneda}.")
+                    curvas = estudio.assign(VARIANTE=estudio["ALTURA"].map("h={:g} m".format) + ", "
+                                            + estudio["BANOS"].map("{:g} baño(s)".format))
+                    st.line_chart(curvas.pivot_table(index="AREA_PISO", columns="VARIANTE", values="total"))
+                    st.dataframe(estudio[["AREA_PISO", "PERIMETRO", "ALTURA", "BANOS", "base", "total", "costo_m2"]].round(2),
+                                 hide_index=True, use_container_width=True)
+
+            with st.expander("🔀 Revisiones: comparar y fusionar"):
+                colA, colB = st.columns([2,1])
+                copia = colA.text_input("Guardar una copia como revisión (nombre)", f"{sel} (rev.)", key=f"rev_nombre_{sel}")
+                if colB.button("Guardar revisión"):
+                    try:
+                        almacen.guardar(espacio, copia, p)
+                        st.success(f"Revisión '{copia}' guardada.")
+                    except ConflictoVersion:
+                        st.error(f"Ya existe un presupuesto '{copia}'.")
+                otros = [n for n in almacen.nombres(espacio) if n != sel]
+                elegidas = st.multiselect("Comparar con", otros, key=f"rev_comparar_{sel}")
+                if elegidas:
+                    with tramo("revisiones.comparar"):
+                        revs = {sel: p, **{n: almacen.cargar(espacio, n)[0] for n in elegidas}}
+                        cambios, bases = comparar(revs, rubros_vigentes())
+                    st.dataframe(bases.round(2).to_frame().T, use_container_width=True)
+                    aviso = "" if perfil.neutro() else " Subtotales en USD de referencia (sin región, inflación ni moneda)."
+                    st.caption(f"{len(cambios)} rubro(s) con diferencias.{aviso}")
+                    st.dataframe(cambios.round(2), hide_index=True, use_container_width=True)
+
+                # fusión de tres vías: los cambios de `ajena` respecto de `base` se aplican sobre este presupuesto
+                colA, colB = st.columns(2)
+                base_rev = colA.selectbox("Revisión base (de la que partieron ambas)", otros, key=f"rev_base_{sel}")
+                ajena_rev = colB.selectbox("Traer los cambios de", otros, key=f"rev_ajena_{sel}")
+                if otros and st.button("Fusionar en este presupuesto"):
+                    with tramo("revisiones.fusionar"):
+                        fusionado, conflictos = fusionar(almacen.cargar(espacio, base_rev)[0], p,
+                                                         almacen.cargar(espacio, ajena_rev)[0])
+                    if guardar(fusionado, version) is not None:
+                        st.session_state.pop("presu_tabla_clave", None)
+                        st.session_state.rev_conflictos = conflictos
+                    st.rerun()
+                conflictos = st.session_state.pop("rev_conflictos", None)
+                if conflictos is not None:
+                    if len(conflictos):
+                        st.warning(f"Fusión con {len(conflictos)} conflicto(s): se conservó tu versión en esos rubros.")
+                        st.dataframe(conflictos, hide_index=True, use_container_width=True)
+                    else:
+                        st.success("Fusión sin conflictos.")
 
             st.markdown("---")
             st.markdown("#### Datos para PDF (cliente/constructor)")
@@ -469,8 +714,26 @@ if st.session_state.registered:
                 elif not cliente_nombre.strip():
                     st.error("Nombre del cliente es obligatorio.")
                 else:
-                    pdf = make_pdf(st.session_state.presupuestos[sel], cliente_nombre, constructor_nombre, constructor_cel, constructor_dir, leyenda, logo.read() if logo else None)
+                    # si nada cambió desde la última exportación, el PDF sale de la caché en disco
+                    filas = tabla.df if perfil.neutro() else ajustes.vista(p, rubros_vigentes(), perfil)
+                    pdf = pdf_en_cache(filas, cliente_nombre, constructor_nombre, constructor_cel, constructor_dir, leyenda, logo.getvalue() if logo else None,
+                                       totales=tot, parametros=parametros, moneda=perfil.moneda)
                     st.download_button("Descargar PDF", data=pdf, file_name=f"{sel.replace(' ','_')}.pdf", mime="application/pdf")
+
+            # Fin de mes: todos los presupuestos en un ZIP (un PDF por presupuesto, en paralelo).
+            # El cliente de cada PDF es el nombre del presupuesto.
+            if st.button("📦 Exportar todos (ZIP)"):
+                if not constructor_nombre.strip() or not constructor_cel.strip():
+                    st.error("Nombre y Celular del constructor son obligatorios.")
+                else:
+                    datos = lambda nombre: {"cliente_nombre": nombre, "constructor_nombre": constructor_nombre,
+                                            "constructor_cel": constructor_cel, "constructor_dir": constructor_dir, "leyenda": leyenda,
+                                            "parametros": parametros, "moneda": perfil.moneda}
+                    from pdf_presupuesto import exportar_todos
+                    with st.spinner(f"Generando {len(nombres)} PDF..."), tramo("pdf.exportar_todos"):
+                        rub = rubros_vigentes()
+                        zbuf = exportar_todos({n: ajustes.vista(q, rub, perfil) for n, q in almacen.todos(espacio).items()}, datos, logo.getvalue() if logo else None)
+                    st.download_button("Descargar ZIP", data=zbuf, file_name="presupuestos.zip", mime="application/zip")
         else:
             st.info("Crea tu primer presupuesto usando el cuadro superior.")
 
@@ -484,7 +747,8 @@ if st.session_state.registered:
                 if st.button("Guardar material"):
                     if codigo and desc and unidad:
                         new = {"CODIGO":codigo,"DESCRIPCION":desc,"UNIDAD":unidad,"PRECIO_UNITARIO_USD":precio,"FUENTE":"","FECHA_ACTUALIZACION":datetime.now().date().isoformat()}
-                        st.session_state.materiales = pd.concat([st.session_state.materiales, pd.DataFrame([new])], ignore_index=True)
+                        st.session_state.materiales.agregar(new)
+                        propagar_precios("material", [new["CODIGO"]])
                         st.success("Material creado (base personal).")
                     else:
                         st.error("Completa código, descripción y unidad.")
@@ -496,7 +760,8 @@ if st.session_state.registered:
                 if st.button("Guardar MO"):
                     if codigo and desc and unidad:
                         new = {"CODIGO":codigo,"DESCRIPCION":desc,"UNIDAD":unidad,"COSTO_UNITARIO_USD":costo,"RENDIMIENTO":"","FUENTE":"","FECHA_ACTUALIZACION":datetime.now().date().isoformat()}
-                        st.session_state.mano_obra = pd.concat([st.session_state.mano_obra, pd.DataFrame([new])], ignore_index=True)
+                        st.session_state.mano_obra.agregar(new)
+                        propagar_precios("mano_obra", [new["CODIGO"]])
                         st.success("Mano de obra creada (base personal).")
                     else:
                         st.error("Completa código, descripción y unidad.")
@@ -508,7 +773,8 @@ if st.session_state.registered:
                 if st.button("Guardar herramienta"):
                     if codigo and desc and unidad:
                         new = {"CODIGO":codigo,"DESCRIPCION":desc,"UNIDAD":unidad,"TARIFA_USO_USD":tarifa,"FUENTE":"","FECHA_ACTUALIZACION":datetime.now().date().isoformat()}
-                        st.session_state.herramientas = pd.concat([st.session_state.herramientas, pd.DataFrame([new])], ignore_index=True)
+                        st.session_state.herramientas.agregar(new)
+                        propagar_precios("herramienta", [new["CODIGO"]])
                         st.success("Herramienta creada (base personal).")
                     else:
                         st.error("Completa código, descripción y unidad.")
@@ -523,18 +789,42 @@ if st.session_state.registered:
         """)
         st.download_button("Descargar guía PDF (próxima versión)", data=b"Proximamente", file_name="Guia_ArquiPro.pdf")
 
-    if st.session_state.view == "rubros":
-        vista_rubros()
-    elif st.session_state.view == "materiales":
-        vista_materiales()
-    elif st.session_state.view == "mano":
-        vista_mano()
-    elif st.session_state.view == "herr":
-        vista_herr()
-    elif st.session_state.view == "presu":
-        vista_presu()
-    elif st.session_state.view == "ayuda":
-        vista_ayuda()
-    else:
-        st.info("Usa los botones de arriba para comenzar.")
+    # las vistas en caché solo viven mientras su pantalla está abierta
+    # (una sesión inactiva no retiene copias de tablas)
+    if st.session_state.view != "presu":
+        for _k in ("presu_tabla", "presu_tabla_clave"):
+            st.session_state.pop(_k, None)
+    if st.session_state.view != "rubros":
+        for _k in ("rubros_tabla", "rubros_tabla_clave"):
+            st.session_state.pop(_k, None)
+
+    with tramo(f"vista.{st.session_state.view}"):
+        if st.session_state.view == "rubros":
+            vista_rubros()
+        elif st.session_state.view == "materiales":
+            vista_materiales()
+        elif st.session_state.view == "mano":
+            vista_mano()
+        elif st.session_state.view == "herr":
+            vista_herr()
+        elif st.session_state.view == "presu":
+            vista_presu()
+        elif st.session_state.view == "ayuda":
+            vista_ayuda()
+        else:
+            st.info("Usa los botones de arriba para comenzar.")
   
+
+# ---------------------------
+# PANEL DE MÉTRICAS (solo administrador: ?admin=<ARQUIPRO_ADMIN_TOKEN>)
+# ---------------------------
+tramos_rerun = fin_rerun()
+_token = os.environ.get("ARQUIPRO_ADMIN_TOKEN")
+if _token and st.query_params.get("admin") == _token:
+    with st.sidebar.expander("⏱️ Métricas (admin)"):
+        st.caption("Tramos de esta ejecución (ms)")
+        st.dataframe({"tramo": [n for n, _ in tramos_rerun], "ms": [round(t * 1000, 2) for _, t in tramos_rerun]},
+                     hide_index=True, use_container_width=True)
+        st.download_button("JSON", a_json(), file_name="metricas.json", mime="application/json")
+        st.download_button("Prometheus", a_prometheus(), file_name="metricas.prom", mime="text/plain")
+        st.code(a_prometheus(), language="text")
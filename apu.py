@@ -0,0 +1,146 @@
+# ---------------------------
+# ANÁLISIS DE PRECIOS UNITARIOS (APU) (sin Streamlit)
+# ---------------------------
+# Cada rubro se compone de insumos (materiales, mano de obra, herramientas):
+#     costo componente = CANTIDAD × precio insumo / RENDIMIENTO
+#     PRECIO_UNITARIO_USD del rubro = Σ costos de sus componentes
+# El grafo insumo -> rubros se guarda por columnas (estilo CSC) en arreglos NumPy,
+# así un cambio de precio solo toca los rubros que usan ese insumo. Los presupuestos
+# guardan solo sus líneas (ver presupuesto.py) y leen el precio del catálogo al
+# mostrarse, así que toman los nuevos precios sin repreciarlos uno por uno.
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from catalogo import COLUMNAS_APU
+
+CAPACIDAD_MOTORES = 8  # motores en memoria por proceso
+
+# tipo de insumo -> (tabla del catálogo, columna de precio)
+TIPOS = {
+    "material": ("materiales", "PRECIO_UNITARIO_USD"),
+    "mano_obra": ("mano_obra", "COSTO_UNITARIO_USD"),
+    "herramienta": ("herramientas", "TARIFA_USO_USD"),
+}
+
+
+def _num(serie, defecto):
+    return pd.to_numeric(serie, errors="coerce").fillna(defecto).to_numpy(dtype=float)
+
+
+class MotorAPU:
+    def __init__(self, componentes, materiales, mano_obra, herramientas):
+        tablas = {"materiales": materiales, "mano_obra": mano_obra, "herramientas": herramientas}
+        comp = componentes.reindex(columns=COLUMNAS_APU).dropna(subset=["RUBRO", "TIPO", "INSUMO"])
+        comp = comp[comp["TIPO"].isin(list(TIPOS))]
+
+        # insumos: todos los del catálogo + los citados en el APU aunque aún no existan
+        claves, precios = [], []
+        rend_mo = {}
+        for tipo, (tabla, col) in TIPOS.items():
+            df = tablas[tabla]
+            cods = df["CODIGO"].astype(str).tolist()
+            claves += [(tipo, c) for c in cods]
+            precios.append(_num(df[col], 0.0) if len(df) else np.zeros(0))
+            if tipo == "mano_obra" and len(df):
+                rend_mo = dict(zip(cods, _num(df["RENDIMIENTO"], np.nan)))
+        self._insumo = {k: j for j, k in enumerate(dict.fromkeys(claves))}
+        precio_insumo = np.concatenate(precios) if precios else np.zeros(0)
+        # si hay códigos repetidos, gana el último (igual que en el catálogo)
+        self.precio_insumo = np.zeros(len(self._insumo))
+        self.precio_insumo[[self._insumo[k] for k in claves]] = precio_insumo
+        for k in zip(comp["TIPO"], comp["INSUMO"].astype(str)):
+            if k not in self._insumo:
+                self._insumo[k] = len(self._insumo)
+        self.precio_insumo = np.concatenate([self.precio_insumo, np.zeros(len(self._insumo) - len(self.precio_insumo))])
+
+        # coeficiente por componente: CANTIDAD / RENDIMIENTO (MO toma el rendimiento de su tabla si falta)
+        cant = _num(comp["CANTIDAD"], 0.0)
+        rend = pd.to_numeric(comp["RENDIMIENTO"], errors="coerce")
+        es_mo = comp["TIPO"] == "mano_obra"
+        rend = rend.where(rend.notna() | ~es_mo, comp["INSUMO"].astype(str).map(rend_mo))
+        rend = rend.to_numpy(dtype=float, na_value=np.nan)
+        rend = np.where(np.isfinite(rend) & (rend > 0), rend, 1.0)
+        coef = cant / rend
+
+        self.rubros = pd.Index(pd.unique(comp["RUBRO"].astype(str)))
+        r = self.rubros.get_indexer(comp["RUBRO"].astype(str))
+        j = np.array([self._insumo[k] for k in zip(comp["TIPO"], comp["INSUMO"].astype(str))], dtype=np.int64)
+        self._comp = comp.assign(_r=r, _j=j, _coef=coef)
+
+        # CSC: componentes ordenados por insumo, con punteros de inicio por insumo
+        orden = np.argsort(j, kind="stable")
+        self._col_rubro = r[orden]
+        self._col_coef = coef[orden]
+        self._col_ptr = np.searchsorted(j[orden], np.arange(len(self._insumo) + 1))
+        self.precio = np.bincount(r, weights=coef * self.precio_insumo[j], minlength=len(self.rubros)) if len(r) else np.zeros(0)
+
+    def precios(self):
+        # PRECIO_UNITARIO_USD derivado de cada rubro con APU
+        return pd.Series(self.precio, index=self.rubros, name="PRECIO_UNITARIO_USD")
+
+    def recalcular(self):
+        c = self._comp
+        self.precio = np.bincount(c["_r"], weights=c["_coef"] * self.precio_insumo[c["_j"]], minlength=len(self.rubros))
+        return self.precios()
+
+    def cambiar_precios(self, tipo, precios):
+        # precios: Series CODIGO -> nuevo precio de insumos del mismo tipo.
+        # Devuelve Series con el nuevo precio solo de los rubros afectados.
+        precios = pd.to_numeric(pd.Series(precios), errors="coerce").dropna()
+        # un código repetido daría dos deltas contra el mismo precio anterior: gana el último
+        precios = precios[~precios.index.astype(str).duplicated(keep="last")]
+        js = np.array([self._insumo.get((tipo, str(c)), -1) for c in precios.index], dtype=np.int64)
+        ok = js >= 0
+        js, nuevos = js[ok], precios.to_numpy(dtype=float)[ok]
+        delta = nuevos - self.precio_insumo[js]
+        self.precio_insumo[js] = nuevos
+        cambia = delta != 0
+        js, delta = js[cambia], delta[cambia]
+        if not len(js):
+            return self.precios().iloc[:0]
+        # todas las entradas de las columnas afectadas en una sola pasada
+        ini, fin = self._col_ptr[js], self._col_ptr[js + 1]
+        n = fin - ini
+        pos = np.repeat(ini - np.cumsum(np.r_[0, n[:-1]]), n) + np.arange(n.sum())
+        r = self._col_rubro[pos]
+        dr = np.zeros(len(self.rubros))
+        np.add.at(dr, r, self._col_coef[pos] * np.repeat(delta, n))
+        afectados = np.unique(r)
+        self.precio[afectados] += dr[afectados]
+        return pd.Series(self.precio[afectados], index=self.rubros[afectados], name="PRECIO_UNITARIO_USD")
+
+    def desglose(self, rubro):
+        # Componentes de un rubro con su costo parcial
+        c = self._comp[self._comp["RUBRO"].astype(str) == str(rubro)]
+        precio = self.precio_insumo[c["_j"].to_numpy()]
+        return pd.DataFrame({
+            "TIPO": c["TIPO"].to_numpy(), "INSUMO": c["INSUMO"].astype(str).to_numpy(),
+            "CANTIDAD": c["CANTIDAD"].to_numpy(), "RENDIMIENTO": c["RENDIMIENTO"].to_numpy(),
+            "PRECIO_INSUMO_USD": precio, "COSTO_USD": (c["_coef"].to_numpy() * precio).round(4),
+        })
+
+
+_motores = OrderedDict()
+_lock_motores = threading.Lock()
+
+
+def motor_sesion(clave, construir):
+    # Motor de una sesión en una LRU del proceso, no en la sesión. `clave` empieza por
+    # la sesión y sigue con las versiones del catálogo; `construir()` crea uno nuevo.
+    # Devuelve (motor, nuevo): nuevo = recién construido (hay que sincronizar rubros).
+    with _lock_motores:
+        motor = _motores.get(clave)
+        if motor is not None:
+            _motores.move_to_end(clave)
+            return motor, False
+    motor = construir()
+    with _lock_motores:
+        for viejo in [k for k in _motores if k[0] == clave[0] and k != clave]:
+            del _motores[viejo]
+        _motores[clave] = motor
+        while len(_motores) > CAPACIDAD_MOTORES:
+            _motores.popitem(last=False)
+    return motor, True
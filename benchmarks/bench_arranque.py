@@ -0,0 +1,80 @@
+# ---------------------------
+# BENCHMARK: arranque en frío y costo por interacción de app.py
+# ---------------------------
+# Uso:  python -m benchmarks.bench_arranque [repeticiones]
+# Cada medición corre en un proceso nuevo (importaciones en frío):
+#   - importación: streamlit, lo que necesita la pantalla de registro, el resto
+#     de la app (pandas, catálogo, cálculos) y la capa de PDF (reportlab).
+#   - primer render y re-ejecución (rerun) con streamlit.testing.AppTest, para la
+#     pantalla de registro y para cada vista con el usuario ya registrado.
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_IMPORTACION = """
+import json, time
+t = [time.perf_counter()]
+import streamlit
+t.append(time.perf_counter())
+import registro, tema
+t.append(time.perf_counter())
+import calculo, catalogo, apu, edicion, presupuesto, riesgo, importacion, historial, busqueda, revisiones, cache_pdf, cubicacion
+t.append(time.perf_counter())
+import pdf_presupuesto
+t.append(time.perf_counter())
+print(json.dumps(dict(zip(["streamlit", "registro", "app", "pdf"], [(b - a) * 1000 for a, b in zip(t, t[1:])]))))
+"""
+
+_RENDER = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+vista = sys.argv[1]
+at = AppTest.from_file(sys.argv[2], default_timeout=120)
+if vista != "registro":
+    at.session_state["registered"] = True
+    at.session_state["view"] = vista
+t0 = time.perf_counter()
+at.run()
+t1 = time.perf_counter()
+at.run()
+t2 = time.perf_counter()
+assert not at.exception, [e.value for e in at.exception]
+print(json.dumps({"primero": (t1 - t0) * 1000, "rerun": (t2 - t1) * 1000,
+                  "pdf_cargado": "pdf_presupuesto" in sys.modules, "pandas_cargado": "pandas" in sys.modules}))
+"""
+
+
+def _correr(codigo, *args, entorno=None):
+    res = subprocess.run([sys.executable, "-c", codigo, *args], cwd=RAIZ, env=entorno,
+                         capture_output=True, text=True, check=True)
+    return json.loads(res.stdout.strip().splitlines()[-1])
+
+
+def main(argv):
+    rep = int(argv[0]) if argv else 3
+    with tempfile.TemporaryDirectory() as d:
+        entorno = {**os.environ, "ARQUIPRO_CATALOGO": os.path.join(d, "catalogo.sqlite"), "PYTHONPATH": RAIZ}
+
+        medidas = [_correr(_IMPORTACION, entorno=entorno) for _ in range(rep)]
+        print(f"Importación en frío (mediana de {rep}, ms):")
+        for k in medidas[0]:
+            print(f"  {k:<10} {np.median([m[k] for m in medidas]):8.1f}")
+
+        print(f"Render con AppTest (mediana de {rep}, ms):")
+        app = os.path.join(RAIZ, "app.py")
+        for vista in ["registro", "rubros", "materiales", "presu", "ayuda"]:
+            medidas = [_correr(_RENDER, vista, app, entorno=entorno) for _ in range(rep)]
+            ultimo = medidas[-1]
+            print(f"  {vista:<10} primero {np.median([m['primero'] for m in medidas]):8.1f}   "
+                  f"rerun {np.median([m['rerun'] for m in medidas]):7.1f}   "
+                  f"pandas={'sí' if ultimo['pandas_cargado'] else 'no'} pdf={'sí' if ultimo['pdf_cargado'] else 'no'}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
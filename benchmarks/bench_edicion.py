@@ -0,0 +1,62 @@
+# ---------------------------
+# BENCHMARK: edición de un presupuesto de 10k filas (copia completa vs delta)
+# ---------------------------
+# Uso:  python -m benchmarks.bench_edicion [filas] [repeticiones]
+# "copia" reproduce el flujo anterior de vista_presu por cada interacción:
+#   .copy() + columna SUBTOTAL + drop(SUBTOTAL) + suma completa de la base.
+# "delta" aplica el delta del editor con TablaEditable y recalcula los totales.
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.sintetico import rubros_sinteticos
+from calculo import totales
+from edicion import TablaEditable
+
+
+def flujo_copia(df, pos, valor):
+    dfp = df.copy()
+    dfp["SUBTOTAL"] = (dfp["CANTIDAD"] * dfp["PRECIO_UNITARIO_USD"]).round(2)
+    dfp.loc[pos, "CANTIDAD"] = valor  # lo que devolvería st.data_editor
+    guardado = dfp.drop(columns=["SUBTOTAL"])
+    base = float((dfp["CANTIDAD"] * dfp["PRECIO_UNITARIO_USD"]).sum())
+    return guardado, totales(base)
+
+
+def medir(fn, repeticiones):
+    tiempos = []
+    for i in range(repeticiones):
+        t0 = time.perf_counter()
+        fn(i)
+        tiempos.append(time.perf_counter() - t0)
+    return np.median(tiempos) * 1000
+
+
+def main(argv):
+    filas = int(argv[0]) if argv else 10_000
+    rep = int(argv[1]) if len(argv) > 1 else 200
+    df = rubros_sinteticos(filas)
+    rng = np.random.default_rng(1)
+    tabla = TablaEditable(df)
+
+    estado = {"df": df}
+    def copia(i):
+        estado["df"], _ = flujo_copia(estado["df"], int(rng.integers(filas)), float(i))
+    def delta(k):
+        def paso(i):
+            pos = rng.integers(filas, size=k)
+            tabla.aplicar_delta({"edited_rows": {int(p): {"CANTIDAD": float(i)} for p in pos}})
+            totales(tabla.base)
+        return paso
+
+    print(f"{filas} filas, mediana de {rep} interacciones")
+    print(f"  copia completa (antes):   {medir(copia, rep):8.3f} ms")
+    for k in (1, 10, 100):
+        print(f"  delta, {k:>3} celda(s):      {medir(delta(k), rep):8.3f} ms")
+    deriva = abs(tabla.base - tabla.recalcular())
+    print(f"  deriva de la base acumulada tras {4 * rep} deltas: {deriva:.2e} USD")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,49 @@
+# ---------------------------
+# BENCHMARK: importación masiva de listas de precios
+# ---------------------------
+# Uso:  python -m benchmarks.bench_importacion [filas ...]
+# Genera un CSV de proveedor (";" y coma decimal, con algunas filas inválidas)
+# y lo importa en un catálogo temporal: el tiempo por fila debe mantenerse
+# aproximadamente constante (importación lineal en el tamaño del archivo).
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from catalogo import Catalogo
+from importacion import importar
+
+
+def lista_proveedor(filas, semilla=0):
+    rng = np.random.default_rng(semilla)
+    df = pd.DataFrame({
+        "Código": [f"MAT-{i:06d}" for i in range(filas)],
+        "Descripción": "Material de prueba",
+        "Und.": rng.choice(["kg", "m", "m²", "m³", "ud"], filas),
+        "Precio": [f"{v:.2f}".replace(".", ",") for v in rng.uniform(0.5, 500, filas)],
+        "Fuente": "Proveedor",
+    })
+    malas = rng.choice(filas, max(1, filas // 1000), replace=False)
+    df.loc[malas, "Precio"] = "s/p"
+    return df
+
+
+def main(argv):
+    tamanos = [int(a) for a in argv] or [10_000, 50_000, 200_000]
+    with tempfile.TemporaryDirectory() as d:
+        for filas in tamanos:
+            ruta = os.path.join(d, f"lista_{filas}.csv")
+            lista_proveedor(filas).to_csv(ruta, sep=";", index=False)
+            cat = Catalogo(os.path.join(d, f"catalogo_{filas}.sqlite"))
+            t0 = time.perf_counter()
+            res = importar(cat, "materiales", ruta)
+            seg = time.perf_counter() - t0
+            print(f"{filas:>8} filas: {seg * 1000:8.1f} ms  ({seg / filas * 1e6:5.2f} µs/fila)  "
+                  f"nuevas={res['nuevas']} rechazadas={len(res['rechazadas'])}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,45 @@
+# ---------------------------
+# BENCHMARK: make_pdf vs número de filas (tiempo y RSS pico)
+# ---------------------------
+# Uso:  python -m benchmarks.bench_pdf [filas ...]
+# Cada tamaño corre en un subproceso aparte para medir su RSS pico de forma aislada.
+import json
+import resource
+import subprocess
+import sys
+import time
+
+FILAS = [100, 1000, 5000, 20000]
+
+
+def medir(n, destino="spool"):
+    from benchmarks.sintetico import rubros_sinteticos
+    from pdf_presupuesto import make_pdf, spool
+
+    df = rubros_sinteticos(n)
+    rss_antes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    salida = spool() if destino == "spool" else None
+    buf = make_pdf(df, "Cliente", "Constructor", "0999999999", "", "", None, salida=salida)
+    seg = time.perf_counter() - t0
+    tam = len(buf.read())
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"filas": n, "seg": round(seg, 3), "filas_seg": round(n / seg), "pdf_kb": tam // 1024,
+            "rss_pico_mb": round(rss / 1024, 1), "rss_render_mb": round((rss - rss_antes) / 1024, 1)}
+
+
+def main(argv):
+    if argv[:1] == ["--uno"]:
+        print(json.dumps(medir(int(argv[1]))))
+        return
+    filas = [int(a) for a in argv] or FILAS
+    print(f"{'filas':>8} {'seg':>8} {'filas/s':>9} {'PDF KB':>8} {'RSS pico MB':>12} {'Δ render MB':>12}")
+    for n in filas:
+        out = subprocess.run([sys.executable, "-m", "benchmarks.bench_pdf", "--uno", str(n)],
+                             capture_output=True, text=True, check=True)
+        r = json.loads(out.stdout)
+        print(f"{r['filas']:>8} {r['seg']:>8} {r['filas_seg']:>9} {r['pdf_kb']:>8} {r['rss_pico_mb']:>12} {r['rss_render_mb']:>12}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
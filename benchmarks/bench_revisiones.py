@@ -0,0 +1,58 @@
+# ---------------------------
+# BENCHMARK: diferencias y fusión de revisiones de presupuesto
+# ---------------------------
+# Uso:  python -m benchmarks.bench_revisiones [lineas] [cambios]
+# Arma una revisión base sintética y dos revisiones que editan, borran y agregan
+# `cambios` líneas cada una (con algunas coincidencias para forzar conflictos),
+# y mide diferencias(), comparar() y fusionar() (meta: milisegundos para 10.000 líneas).
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.sintetico import rubros_sinteticos
+from presupuesto import Presupuesto
+from revisiones import comparar, diferencias, fusionar
+
+
+def revision(base, catalogo, cambios, rng):
+    q = Presupuesto(base.codigos, base.cantidad, base.precio, base.fecha)
+    pos = rng.choice(len(q), cambios, replace=False)
+    q.cantidad[pos] += rng.integers(1, 5, cambios)
+    q.precio[pos[: cambios // 4]] = rng.uniform(1, 100, cambios // 4)
+    borrar = rng.choice(len(q), cambios // 4, replace=False)
+    q = Presupuesto(np.delete(q.codigos, borrar), np.delete(q.cantidad, borrar), np.delete(q.precio, borrar), q.fecha)
+    q.agregar(rng.choice(catalogo["CODIGO"].to_numpy()[len(base):], cambios // 4, replace=False), 1)
+    return q
+
+
+def medir(fn, rep=7):
+    fn()
+    tiempos = []
+    for _ in range(rep):
+        t0 = time.perf_counter()
+        res = fn()
+        tiempos.append(time.perf_counter() - t0)
+    return np.median(tiempos) * 1000, res
+
+
+def main(argv):
+    lineas = int(argv[0]) if argv else 10_000
+    cambios = int(argv[1]) if len(argv) > 1 else 500
+    rng = np.random.default_rng(0)
+    catalogo = rubros_sinteticos(lineas * 2)
+    base = Presupuesto(catalogo["CODIGO"].to_numpy()[:lineas], rng.integers(1, 50, lineas))
+    propia, ajena = revision(base, catalogo, cambios, rng), revision(base, catalogo, cambios, rng)
+
+    ms, res = medir(lambda: diferencias(base, propia))
+    print(f"diferencias (sin catálogo)   {ms:8.2f} ms   {len(res)} filas")
+    ms, res = medir(lambda: diferencias(base, propia, catalogo))
+    print(f"diferencias (con subtotales) {ms:8.2f} ms   {len(res)} filas")
+    ms, res = medir(lambda: comparar({"base": base, "propia": propia, "ajena": ajena}, catalogo))
+    print(f"comparar (3 revisiones)      {ms:8.2f} ms   {len(res[0])} filas")
+    ms, (fusionado, conflictos) = medir(lambda: fusionar(base, propia, ajena))
+    print(f"fusionar (3 vías)            {ms:8.2f} ms   {len(fusionado)} líneas, {len(conflictos)} conflictos")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
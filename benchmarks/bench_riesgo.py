@@ -0,0 +1,50 @@
+# ---------------------------
+# BENCHMARK: simulación Monte Carlo de riesgo de costo
+# ---------------------------
+# Uso:  python -m benchmarks.bench_riesgo [lineas] [escenarios]
+# Mide simular() sobre un presupuesto sintético (meta: < 1 s para 1.000 líneas
+# y 100.000 escenarios) y compara los percentiles con un muestreo directo de las
+# triangulares, más lento, como control de exactitud.
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.sintetico import rubros_sinteticos
+from riesgo import DISTRIBUCIONES, simular
+
+
+def directo(df, n, semilla=2):
+    rng = np.random.default_rng(semilla)
+    sub = (df["CANTIDAD"] * df["PRECIO_UNITARIO_USD"]).to_numpy(dtype=float)
+    bases = np.zeros(n)
+    for s, nivel in zip(sub, df["INCERTIDUMBRE"]):
+        d = DISTRIBUCIONES[nivel]
+        precio = rng.triangular(*(1 + v for v in d["precio"]), n)
+        cantidad = rng.triangular(*(1 + v for v in d["cantidad"]), n)
+        bases += s * precio * cantidad
+    return np.percentile(bases, [50, 80, 95])
+
+
+def main(argv):
+    lineas = int(argv[0]) if argv else 1_000
+    escenarios = int(argv[1]) if len(argv) > 1 else 100_000
+    df = rubros_sinteticos(lineas)
+    df["CANTIDAD"] = np.random.default_rng(0).uniform(1, 50, lineas).round(2)
+
+    simular(df, 1_000)  # calentamiento
+    tiempos = []
+    for i in range(5):
+        t0 = time.perf_counter()
+        res = simular(df, escenarios, 10, 0, 15, semilla=i)
+        tiempos.append(time.perf_counter() - t0)
+    print(f"{lineas} líneas × {escenarios} escenarios: {np.median(tiempos) * 1000:8.1f} ms (mediana de 5)")
+    print(res.to_string(index=False))
+
+    control = directo(df, 20_000)
+    err = np.abs(res["base"].to_numpy() - control) / control * 100
+    print("  diferencia con muestreo directo (20.000 escenarios): " + ", ".join(f"{e:.3f}%" for e in err))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,30 @@
+# ---------------------------
+# DATOS SINTÉTICOS PARA BENCHMARKS
+# ---------------------------
+import numpy as np
+import pandas as pd
+
+CATEGORIAS = ["Demoliciones/Preparación","Cimentación","Estructura","Mampostería","Instalaciones",
+              "Acabados","Carpintería/Cerrajería","Cubierta","Impermeabilización","Exteriores"]
+UNIDADES = ["m²","m³","ud","ml"]
+INCERTIDUMBRES = ["Baja","Media","Alta"]
+
+
+def rubros_sinteticos(n, semilla=0):
+    # Catálogo de rubros con las mismas columnas que la plantilla de la app
+    rng = np.random.default_rng(semilla)
+    idx = np.arange(n)
+    cat = rng.integers(0, len(CATEGORIAS), n)
+    return pd.DataFrame({
+        "CODIGO": [f"R-{i:06d}" for i in idx],
+        "DESCRIPCION": [f"Rubro sintético {i} – {CATEGORIAS[c].lower()} con descripción de longitud media"
+                        for i, c in zip(idx, cat)],
+        "UNIDAD": np.array(UNIDADES, dtype=object)[rng.integers(0, len(UNIDADES), n)],
+        "PRECIO_UNITARIO_USD": rng.uniform(1, 400, n).round(2),
+        "CATEGORIA": np.array(CATEGORIAS, dtype=object)[cat],
+        "INCERTIDUMBRE": np.array(INCERTIDUMBRES, dtype=object)[rng.integers(0, 3, n)],
+        "SUPUESTO_NOTAS": "Supuesto sintético",
+        "FUENTE": "Sintético",
+        "FECHA_ACTUALIZACION": "2025-08-31",
+        "CANTIDAD": rng.uniform(0, 100, n).round(2),
+    })
@@ -0,0 +1,288 @@
+# ---------------------------
+# SUITE DE BENCHMARKS Y REGRESIONES (sin red, sin Streamlit)
+# ---------------------------
+# Uso:  python -m benchmarks.suite [--filas N] [--guardar] [--umbral 0.25] [--solo caso,caso]
+# Mide los caminos calientes de la app sobre un catálogo sintético de N rubros
+# (en un SQLite temporal) y compara la mediana de cada caso con la línea base:
+#   - totales de vista_presu (delta del editor + cascada) y recálculo completo
+#   - vista de rubros por rerun (capa de sesión + TablaEditable con SUBTOTAL)
+#   - "Agregar" de las vistas de catálogo (CapaSesion.agregar + nueva vista)
+#   - vista del presupuesto abierto (Presupuesto.vista + TablaEditable)
+#   - vector de factores de ajuste (región, inflación, moneda) sobre el catálogo
+#   - make_pdf con 100, 1.000 y 10.000 filas
+#   - registro: encolar un login y vaciar 500 registros contra una hoja falsa
+#     (append_rows con latencia simulada, sin gspread ni red), y que un corte
+#     de red se reintente sin perder registros
+# --guardar escribe la línea base; sin él, sale con código 1 si algún caso
+# empeora más que --umbral (y más que --tolerancia-ms en valor absoluto).
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.sintetico import rubros_sinteticos
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LINEA_BASE = os.path.join(RAIZ, "datos", "linea_base_benchmarks.json")
+
+CASOS = {}  # nombre -> (preparar(ctx) -> fn(i), repeticiones)
+
+
+def caso(nombre, repeticiones=30):
+    def registrar(preparar):
+        CASOS[nombre] = (preparar, repeticiones)
+        return preparar
+    return registrar
+
+
+class HojaFalsa:
+    # Sustituto local de un worksheet de gspread: solo append_rows, con latencia fija.
+    # `fallos`: excepciones que se lanzan, una por llamada, antes de empezar a aceptar filas
+    def __init__(self, latencia=0.02, fallos=()):
+        self.latencia = latencia
+        self.fallos = list(fallos)
+        self.filas = []
+        self.llamadas = 0
+
+    def append_rows(self, filas):
+        time.sleep(self.latencia)
+        self.llamadas += 1
+        if self.fallos:
+            raise self.fallos.pop(0)
+        self.filas.extend(filas)
+
+
+# ---------------------------
+# CASOS
+# ---------------------------
+@caso("totales.delta_1_celda", 200)
+def _totales_delta(ctx):
+    from calculo import totales
+    from edicion import TablaEditable
+    tabla = TablaEditable(ctx["rubros"])
+    rng = np.random.default_rng(1)
+
+    def fn(i):
+        tabla.aplicar_delta({"edited_rows": {int(rng.integers(len(tabla))): {"CANTIDAD": float(i)}}})
+        totales(tabla.base, 10, 5, 15, 30)
+    return fn
+
+
+@caso("totales.recalculo_completo", 50)
+def _totales_completo(ctx):
+    from calculo import calcular_totales
+    return lambda i: calcular_totales(ctx["rubros"], 10, 5, 15, 30)
+
+
+@caso("rubros.vista_rerun", 20)
+def _rubros_vista(ctx):
+    # lo que hace tabla_rubros() cuando cambió la capa: vista con cambios + SUBTOTAL
+    from catalogo import CapaSesion
+    from edicion import TablaEditable
+    capa = CapaSesion(ctx["catalogo"], "rubros")
+    base = ctx["rubros"]
+    for k in range(20):
+        capa.agregar({**base.iloc[k].to_dict(), "CANTIDAD": 1.0})
+    return lambda i: TablaEditable(capa.df())
+
+
+@caso("rubros.agregar", 20)
+def _rubros_agregar(ctx):
+    # botón "Agregar" de un formulario: una fila nueva + la vista del rerun siguiente
+    from catalogo import CapaSesion
+    capa = CapaSesion(ctx["catalogo"], "rubros")
+
+    def fn(i):
+        capa.agregar({"CODIGO": f"NUEVO-{i:05d}", "DESCRIPCION": "Rubro nuevo", "UNIDAD": "m²",
+                      "PRECIO_UNITARIO_USD": 10.0, "CATEGORIA": "Acabados", "CANTIDAD": 1.0})
+        capa.df()
+    return fn
+
+
+@caso("presupuesto.vista", 20)
+def _presupuesto_vista(ctx):
+    from edicion import TablaEditable
+    from presupuesto import Presupuesto
+    rubros = ctx["rubros"]
+    p = Presupuesto(rubros["CODIGO"].to_numpy()[::2], np.ones(len(rubros[::2])))
+    return lambda i: TablaEditable(p.vista(rubros))
+
+
+@caso("ajustes.factores", 20)
+def _ajustes_factores(ctx):
+    # vector de factores de región + inflación + moneda sobre todo el catálogo (sin la caché en memoria)
+    import pandas as pd
+    from ajustes import AlmacenAjustes, Perfil
+    aj = AlmacenAjustes(os.path.join(ctx["dir"], "ajustes.sqlite"))
+    aj.guardar_tabla("monedas", pd.DataFrame([["EUR", 0.92, "€"]], columns=["MONEDA", "POR_USD", "SIMBOLO"]))
+    aj.guardar_tabla("factores", pd.DataFrame([["Guayaquil", "*", "*", 1.08], ["Guayaquil", "CATEGORIA", "Acabados", 1.1]],
+                                              columns=["REGION", "COLUMNA", "VALOR", "FACTOR"]))
+    aj.guardar_tabla("inflacion", pd.DataFrame([["*", "*", 3.0]], columns=["COLUMNA", "VALOR", "PCT_ANUAL"]))
+    perfil = Perfil("Guayaquil", "EUR", "2026-01-01")
+
+    def fn(i):
+        aj._cache.clear()
+        aj.factores(ctx["rubros"], perfil)
+    return fn
+
+
+def _caso_pdf(filas):
+    def preparar(ctx):
+        from pdf_presupuesto import make_pdf
+        df = rubros_sinteticos(filas, semilla=3)
+        return lambda i: make_pdf(df, "Cliente", "Constructor", "0999999999", "", "", None)
+    return preparar
+
+
+for _n, _rep in [(100, 10), (1_000, 5), (10_000, 3)]:
+    caso(f"pdf.make_pdf_{_n}", _rep)(_caso_pdf(_n))
+
+
+@caso("registro.encolar", 500)
+def _registro_encolar(ctx):
+    # lo que espera el usuario al registrarse: solo encolar (el envío va en otro hilo)
+    from registro import ColaRegistros
+    cola = ColaRegistros(HojaFalsa(latencia=0.05), intervalo=0.01)
+    ctx["cierres"].append(lambda: cola.vaciar(timeout=30))
+    return lambda i: cola.encolar([f"Usuario {i}", f"09{i:08d}", "", "2025-08-31 10:00:00"])
+
+
+@caso("registro.vaciar_500", 3)
+def _registro_vaciar(ctx):
+    # 500 logins seguidos: cuánto tarda en quedar todo en la hoja (lotes de append_rows)
+    from registro import ColaRegistros
+
+    def fn(i):
+        hoja = HojaFalsa(latencia=0.02)
+        cola = ColaRegistros(hoja, max_lote=200, intervalo=0.01)
+        for k in range(500):
+            cola.encolar([f"Usuario {k}", f"09{k:08d}", "", "2025-08-31 10:00:00"])
+        cola.vaciar(timeout=30)
+        assert len(hoja.filas) == 500, len(hoja.filas)
+    return fn
+
+
+@caso("registro.red_intermitente", 3)
+def _registro_red(ctx):
+    # Cortes de red sin código HTTP (ConnectionError, timeouts): el lote se reintenta, no se descarta
+    import requests
+    from registro import ColaRegistros
+
+    def fn(i):
+        hoja = HojaFalsa(latencia=0.0, fallos=[requests.ConnectionError("sin red"), requests.Timeout("lento"),
+                                               TimeoutError("socket")])
+        cola = ColaRegistros(hoja, intervalo=0.0, espera_base=0.001, dormir=lambda s: None)
+        for k in range(50):
+            cola.encolar([f"Usuario {k}", f"09{k:08d}", "", "2025-08-31 10:00:00"])
+        cola.vaciar(timeout=30)
+        assert cola.descartadas == 0 and len(hoja.filas) == 50, (cola.descartadas, len(hoja.filas))
+    return fn
+
+
+# ---------------------------
+# EJECUCIÓN
+# ---------------------------
+def medir(fn, repeticiones):
+    fn(-1)  # calentamiento
+    tiempos = []
+    for i in range(repeticiones):
+        t0 = time.perf_counter()
+        fn(i)
+        tiempos.append(time.perf_counter() - t0)
+    return float(np.median(tiempos) * 1000)
+
+
+def correr(filas, solo=None):
+    from catalogo import Catalogo
+    resultados = {}
+    with tempfile.TemporaryDirectory() as d:
+        catalogo = Catalogo(os.path.join(d, "catalogo.sqlite"))
+        rubros = rubros_sinteticos(filas)
+        catalogo.importar("rubros", rubros)
+        ctx = {"filas": filas, "dir": d, "catalogo": catalogo, "rubros": catalogo.tabla("rubros"), "cierres": []}
+        for nombre, (preparar, rep) in CASOS.items():
+            if solo and nombre not in solo:
+                continue
+            resultados[nombre] = medir(preparar(ctx), rep)
+            print(f"  {nombre:<28} {resultados[nombre]:10.3f} ms", flush=True)
+        for cerrar in ctx["cierres"]:
+            cerrar()
+    return resultados
+
+
+def comparar(resultados, base, umbral, tolerancia_ms):
+    # -> lista de (caso, ms, base_ms, cambio, estado)
+    filas = []
+    for nombre, ms in resultados.items():
+        ref = base.get(nombre)
+        if ref is None:
+            filas.append((nombre, ms, None, None, "nuevo"))
+            continue
+        cambio = ms / ref - 1 if ref else 0.0
+        regresion = cambio > umbral and ms - ref > tolerancia_ms
+        filas.append((nombre, ms, ref, cambio, "REGRESIÓN" if regresion else "ok"))
+    return filas
+
+
+def main(argv):
+    ap = argparse.ArgumentParser(prog="python -m benchmarks.suite")
+    ap.add_argument("--filas", type=int, default=10_000, help="tamaño del catálogo sintético de rubros")
+    ap.add_argument("--linea-base", default=LINEA_BASE, help="archivo JSON de la línea base")
+    ap.add_argument("--guardar", action="store_true", help="guardar los resultados como nueva línea base")
+    ap.add_argument("--umbral", type=float, default=0.25, help="empeoramiento relativo tolerado (0.25 = 25%%)")
+    ap.add_argument("--tolerancia-ms", type=float, default=0.2, help="diferencia absoluta mínima para fallar")
+    ap.add_argument("--solo", default="", help="casos a correr, separados por coma")
+    args = ap.parse_args(argv)
+    solo = {s.strip() for s in args.solo.split(",") if s.strip()}
+    desconocidos = solo - set(CASOS)
+    if desconocidos:
+        ap.error(f"casos desconocidos: {', '.join(sorted(desconocidos))} (hay: {', '.join(CASOS)})")
+
+    print(f"Catálogo sintético de {args.filas} rubros (mediana por caso):")
+    resultados = correr(args.filas, solo)
+
+    if args.guardar:
+        previo = {}
+        if os.path.exists(args.linea_base):
+            with open(args.linea_base, encoding="utf-8") as f:
+                previo = json.load(f)
+        casos = {**previo.get("casos", {}), **resultados} if previo.get("filas") == args.filas else resultados
+        os.makedirs(os.path.dirname(os.path.abspath(args.linea_base)), exist_ok=True)
+        with open(args.linea_base, "w", encoding="utf-8") as f:
+            json.dump({"filas": args.filas, "maquina": platform.node(), "python": platform.python_version(),
+                       "fecha": time.strftime("%Y-%m-%d %H:%M:%S"), "casos": casos}, f, ensure_ascii=False, indent=2)
+        print(f"Línea base guardada en {args.linea_base}")
+        return 0
+
+    if not os.path.exists(args.linea_base):
+        print(f"Sin línea base ({args.linea_base}); créala con --guardar.")
+        return 0
+    with open(args.linea_base, encoding="utf-8") as f:
+        base = json.load(f)
+    if base.get("filas") != args.filas:
+        print(f"La línea base es de {base.get('filas')} rubros, no de {args.filas}: no se compara.")
+        return 2
+    if base.get("maquina") != platform.node():
+        print(f"Aviso: la línea base se tomó en otra máquina ({base.get('maquina')}).")
+
+    print(f"\nComparación con la línea base del {base.get('fecha')} (umbral {args.umbral:.0%}):")
+    filas = comparar(resultados, base.get("casos", {}), args.umbral, args.tolerancia_ms)
+    for nombre, ms, ref, cambio, estado in filas:
+        ref_txt = f"{ref:10.3f}" if ref is not None else f"{'-':>10}"
+        cambio_txt = f"{cambio:+7.1%}" if cambio is not None else f"{'':>7}"
+        print(f"  {nombre:<28} {ms:10.3f} {ref_txt} ms  {cambio_txt}  {estado}")
+    regresiones = [f[0] for f in filas if f[4] == "REGRESIÓN"]
+    if regresiones:
+        print(f"\n{len(regresiones)} regresión(es): {', '.join(regresiones)}")
+        return 1
+    print("\nSin regresiones.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,167 @@
+# ---------------------------
+# BÚSQUEDA EN CATÁLOGOS (sin Streamlit)
+# ---------------------------
+# Índice invertido sobre CODIGO, DESCRIPCION y CATEGORIA con plegado de acentos
+# ("excavación" = "excavacion", "m²" = "m2"). Cada término de la consulta
+# coincide por igualdad, por prefijo o, si hace falta, de forma difusa por
+# trigramas; los resultados se ordenan por relevancia (tf-idf simple).
+import bisect
+import math
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+CAMPOS = {"CODIGO": 3.0, "DESCRIPCION": 1.0, "CATEGORIA": 0.5}
+_TOKEN = re.compile(r"[a-z0-9]+")
+MAX_PREFIJOS = 200
+MAX_CANDIDATOS_DIFUSOS = 64
+
+
+def plegar(texto):
+    # minúsculas, sin tildes ni diéresis; ² y ³ pasan a 2 y 3
+    texto = unicodedata.normalize("NFKD", str(texto))
+    return "".join(ch for ch in texto if not unicodedata.combining(ch)).lower()
+
+
+def tokens(texto):
+    return _TOKEN.findall(plegar(texto))
+
+
+def _distancia(a, b, maximo):
+    # Levenshtein con corte: devuelve maximo + 1 si se pasa
+    if abs(len(a) - len(b)) > maximo:
+        return maximo + 1
+    previa = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        actual = [i]
+        for j, cb in enumerate(b, 1):
+            actual.append(min(previa[j] + 1, actual[j - 1] + 1, previa[j - 1] + (ca != cb)))
+        if min(actual) > maximo:
+            return maximo + 1
+        previa = actual
+    return previa[-1]
+
+
+def _trigramas(term):
+    t = f"^{term}$"
+    return {t[i:i + 3] for i in range(len(t) - 2)}
+
+
+class IndiceBusqueda:
+    def __init__(self, df, campos=CAMPOS):
+        self.df = df
+        self.n = len(df)
+        pesos = {}  # término -> {doc: peso}
+        for campo, peso in campos.items():
+            if campo not in df.columns:
+                continue
+            valores = df[campo].astype(object).where(df[campo].notna(), "").tolist()
+            for doc, valor in enumerate(valores):
+                toks = tokens(valor)
+                if campo == "CODIGO" and len(toks) > 1:
+                    toks.append("".join(toks))  # "MAN-001" también como "man001"
+                for tok in toks:
+                    d = pesos.setdefault(tok, {})
+                    if d.get(doc, 0.0) < peso:
+                        d[doc] = peso
+        self._vocab = sorted(pesos)
+        self._docs = []
+        self._pesos = []
+        for term in self._vocab:
+            d = pesos[term]
+            idf = math.log(1 + self.n / len(d))
+            self._docs.append(np.fromiter(d.keys(), dtype=np.int64, count=len(d)))
+            self._pesos.append(np.fromiter(d.values(), dtype=float, count=len(d)) * idf)
+        self._pos = {t: i for i, t in enumerate(self._vocab)}
+        self._tri = None
+        self._lock = threading.Lock()
+
+    def _indice_trigramas(self):
+        if self._tri is None:
+            with self._lock:
+                if self._tri is None:
+                    tri = {}
+                    for i, term in enumerate(self._vocab):
+                        for g in _trigramas(term):
+                            tri.setdefault(g, []).append(i)
+                    self._tri = {g: np.array(v, dtype=np.int64) for g, v in tri.items()}
+        return self._tri
+
+    def _terminos(self, tok):
+        # término del vocabulario -> factor de coincidencia (1 exacto, 0.7 prefijo, ≤0.5 difuso)
+        out = {}
+        i = self._pos.get(tok)
+        if i is not None:
+            out[i] = 1.0
+        if len(tok) >= 2:
+            ini = bisect.bisect_left(self._vocab, tok)
+            for j in range(ini, min(ini + MAX_PREFIJOS, len(self._vocab))):
+                if not self._vocab[j].startswith(tok):
+                    break
+                out.setdefault(j, 0.7)
+        if not out and len(tok) >= 3:
+            tri = self._indice_trigramas()
+            gs = _trigramas(tok)
+            cand = [tri[g] for g in gs if g in tri]
+            if cand:
+                # candidatos por trigramas en común, confirmados con distancia de edición
+                ids, comunes = np.unique(np.concatenate(cand), return_counts=True)
+                mejores = ids[np.argsort(-comunes, kind="stable")[:MAX_CANDIDATOS_DIFUSOS]]
+                maximo = 1 if len(tok) < 6 else 2
+                for j in mejores:
+                    d = _distancia(tok, self._vocab[j], maximo)
+                    if d <= maximo:
+                        out[int(j)] = 0.5 * (1 - d / max(len(tok), len(self._vocab[j])))
+        return out
+
+    def buscar(self, consulta, limite=20):
+        # Devuelve las filas del catálogo mejor puntuadas, con columna SCORE
+        toks = tokens(consulta)
+        if not toks or not self.n:
+            return self.df.iloc[:0].assign(SCORE=pd.Series(dtype=float))
+        total = np.zeros(self.n)
+        aciertos = np.zeros(self.n)
+        for tok in toks:
+            puntaje = np.zeros(self.n)
+            for j, factor in self._terminos(tok).items():
+                docs = self._docs[j]
+                puntaje[docs] = np.maximum(puntaje[docs], self._pesos[j] * factor)
+            total += puntaje
+            aciertos += puntaje > 0
+        # premia las filas que cubren todos los términos de la consulta
+        total *= (aciertos / len(toks)) ** 2
+        candidatos = np.flatnonzero(total > 0)
+        if len(candidatos) > limite:
+            candidatos = candidatos[np.argpartition(-total[candidatos], limite - 1)[:limite]]
+        orden = candidatos[np.argsort(-total[candidatos], kind="stable")]
+        return self.df.iloc[orden].assign(SCORE=total[orden].round(3))
+
+
+CAPACIDAD_INDICES = 16  # índices en memoria por proceso (compartidos y de sesiones con cambios)
+
+_cache = OrderedDict()
+_lock_cache = threading.Lock()
+
+
+def indice_compartido(clave, df):
+    # Un índice por clave (p. ej. tabla + versión del catálogo, o tabla + capa de una
+    # sesión con cambios) en una LRU del proceso: una sesión inactiva no retiene el suyo
+    with _lock_cache:
+        idx = _cache.get(clave)
+        if idx is not None and idx.df is df:
+            _cache.move_to_end(clave)
+            return idx
+    idx = IndiceBusqueda(df)  # fuera del lock: no frena las búsquedas de otras sesiones
+    with _lock_cache:
+        # conserva solo la última versión de cada tabla (o capa)
+        for viejo in [k for k in _cache if k[0] == clave[0] and k != clave]:
+            del _cache[viejo]
+        _cache[clave] = idx
+        _cache.move_to_end(clave)
+        while len(_cache) > CAPACIDAD_INDICES:
+            _cache.popitem(last=False)
+    return idx
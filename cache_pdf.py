@@ -0,0 +1,144 @@
+# ---------------------------
+# CACHÉ DE PDF EN DISCO (sin Streamlit)
+# ---------------------------
+# Cada PDF generado se guarda como <clave>.pdf, donde la clave es un hash de
+# todo lo que se imprime: filas del presupuesto, totales y porcentajes, campos
+# de texto, bytes del logo y la fecha del día. Exportar de nuevo un presupuesto
+# sin cambios lee el archivo (sin importar reportlab ni decodificar el logo).
+# - Tamaño acotado (ARQUIPRO_CACHE_PDF_MB); se descarta el menos usado (LRU).
+# - Un directorio por proceso compartido entre sesiones; escrituras atómicas.
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+
+import pandas as pd
+
+from metricas import contar, tramo
+
+RUTA_CACHE_PDF = os.environ.get(
+    "ARQUIPRO_CACHE_PDF", os.path.join(os.path.dirname(os.path.abspath(__file__)), "datos", "cache_pdf")
+)
+CAPACIDAD_MB = float(os.environ.get("ARQUIPRO_CACHE_PDF_MB", "200"))
+VERSION_FORMATO = 3  # subir cuando cambie el diseño del PDF (invalida lo guardado)
+
+
+def clave_pdf(budget_df, *partes, logo_bytes=None):
+    # Hash de las filas (vectorizado con hash_pandas_object) + resto de los datos impresos
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"v{VERSION_FORMATO}|{date.today().isoformat()}|".encode())
+    h.update("|".join(map(str, budget_df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(budget_df, index=False).to_numpy().tobytes())
+    for parte in partes:
+        h.update(b"\x1f" + repr(parte).encode())
+    h.update(b"\x1e" + (bytes(logo_bytes) if logo_bytes else b""))
+    return h.hexdigest()
+
+
+class CachePDF:
+    def __init__(self, directorio=RUTA_CACHE_PDF, capacidad_mb=CAPACIDAD_MB):
+        self.directorio = directorio
+        self.capacidad = int(capacidad_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._archivos = OrderedDict()  # clave -> bytes en disco, del menos al más usado
+        self._total = 0
+        os.makedirs(directorio, exist_ok=True)
+        # lo que quedó de ejecuciones anteriores, ordenado por último uso (mtime)
+        previos = []
+        for nombre in os.listdir(directorio):
+            if nombre.endswith(".pdf"):
+                st = os.stat(os.path.join(directorio, nombre))
+                previos.append((st.st_mtime, nombre[:-4], st.st_size))
+        for _, clave, tam in sorted(previos):
+            self._archivos[clave] = tam
+            self._total += tam
+        self._recortar()
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, f"{clave}.pdf")
+
+    def _recortar(self):
+        # con el lock tomado (o en __init__)
+        while self._total > self.capacidad and self._archivos:
+            clave, tam = self._archivos.popitem(last=False)
+            self._total -= tam
+            try:
+                os.remove(self._ruta(clave))
+            except OSError:
+                pass
+            contar("pdf.cache_descartes")
+
+    def obtener(self, clave):
+        with self._lock:
+            if clave not in self._archivos:
+                return None
+            self._archivos.move_to_end(clave)
+        try:
+            with open(self._ruta(clave), "rb") as f:
+                datos = f.read()
+            os.utime(self._ruta(clave))  # último uso, para el orden LRU al reiniciar
+        except OSError:
+            # otro proceso lo borró
+            with self._lock:
+                self._total -= self._archivos.pop(clave, 0)
+            return None
+        return datos
+
+    def guardar(self, clave, datos):
+        tmp = f"{self._ruta(clave)}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(datos)
+        os.replace(tmp, self._ruta(clave))
+        with self._lock:
+            self._total += len(datos) - self._archivos.pop(clave, 0)
+            self._archivos[clave] = len(datos)
+            self._recortar()
+
+    def limpiar(self):
+        with self._lock:
+            for clave in self._archivos:
+                try:
+                    os.remove(self._ruta(clave))
+                except OSError:
+                    pass
+            self._archivos.clear()
+            self._total = 0
+
+    def uso(self):
+        # -> (archivos, bytes)
+        with self._lock:
+            return len(self._archivos), self._total
+
+
+_caches = {}
+_lock_caches = threading.Lock()
+
+
+def abrir_cache(directorio=RUTA_CACHE_PDF):
+    # Una caché por directorio y por proceso
+    with _lock_caches:
+        cache = _caches.get(directorio)
+        if cache is None:
+            cache = _caches[directorio] = CachePDF(directorio)
+        return cache
+
+
+def pdf_en_cache(budget_df, cliente_nombre, constructor_nombre, constructor_cel, constructor_dir, leyenda,
+                 logo_bytes=None, totales=None, parametros=None, moneda="USD", cache=None):
+    # Mismos argumentos que make_pdf; devuelve los bytes del PDF
+    cache = cache or abrir_cache()
+    with tramo("pdf.cache"):
+        clave = clave_pdf(budget_df, cliente_nombre, constructor_nombre, constructor_cel, constructor_dir, leyenda,
+                          sorted((totales or {}).items()), sorted((parametros or {}).items()), moneda,
+                          logo_bytes=logo_bytes)
+        datos = cache.obtener(clave)
+    if datos is not None:
+        contar("pdf.cache_aciertos")
+        return datos
+    contar("pdf.cache_fallos")
+    from pdf_presupuesto import make_pdf  # reportlab solo si hay que generar
+    datos = make_pdf(budget_df, cliente_nombre, constructor_nombre, constructor_cel, constructor_dir, leyenda,
+                     logo_bytes, totales=totales, parametros=parametros, moneda=moneda).getvalue()
+    cache.guardar(clave, datos)
+    return datos
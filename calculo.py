@@ -0,0 +1,99 @@
+# ---------------------------
+# MOTOR DE CÁLCULO DE PRESUPUESTOS (sin Streamlit)
+# ---------------------------
+# base → indirectos → subtotal → descuento → neto → IVA → total → anticipo
+# Todo se calcula con NumPy, así que un mismo presupuesto puede evaluarse contra
+# un solo juego de parámetros o contra una matriz completa de escenarios.
+import numpy as np
+import pandas as pd
+
+CONCEPTOS = ["base", "indirectos", "subtotal", "descuento", "neto", "iva", "total", "anticipo"]
+PARAMETROS = ["pct_indirectos", "pct_descuento", "pct_iva", "pct_anticipo"]
+PARAMETROS_DEFECTO = {"pct_indirectos": 0.0, "pct_descuento": 0.0, "pct_iva": 15.0, "pct_anticipo": 0.0}
+
+
+def subtotales(df):
+    # CANTIDAD × PRECIO_UNITARIO_USD por fila (vacíos cuentan como 0)
+    cant = pd.to_numeric(df["CANTIDAD"], errors="coerce").to_numpy(dtype=float, na_value=0.0)
+    precio = pd.to_numeric(df["PRECIO_UNITARIO_USD"], errors="coerce").to_numpy(dtype=float, na_value=0.0)
+    return cant * precio
+
+
+def base_presupuesto(df):
+    return float(subtotales(df).sum())
+
+
+def cascada(base, pct_indirectos=0.0, pct_descuento=0.0, pct_iva=15.0, pct_anticipo=0.0):
+    # Acepta escalares o arreglos; se aplica broadcasting entre base y porcentajes
+    base = np.asarray(base, dtype=float)
+    indirectos = base * (np.asarray(pct_indirectos, dtype=float) / 100)
+    subtotal = base + indirectos
+    descuento = subtotal * (np.asarray(pct_descuento, dtype=float) / 100)
+    neto = subtotal - descuento
+    iva = neto * (np.asarray(pct_iva, dtype=float) / 100)
+    total = neto + iva
+    anticipo = total * (np.asarray(pct_anticipo, dtype=float) / 100)
+    return {
+        "base": np.broadcast_to(base, total.shape), "indirectos": indirectos, "subtotal": subtotal,
+        "descuento": descuento, "neto": neto, "iva": iva, "total": total, "anticipo": anticipo,
+    }
+
+
+def _parametros(parametros):
+    # Normaliza la matriz de escenarios; los porcentajes que falten toman el valor por defecto
+    if isinstance(parametros, np.ndarray):
+        params = pd.DataFrame(np.atleast_2d(parametros), columns=PARAMETROS)
+    else:
+        params = pd.DataFrame(parametros).copy()
+    for p in PARAMETROS:
+        if p not in params.columns:
+            params[p] = PARAMETROS_DEFECTO[p]
+        else:
+            params[p] = pd.to_numeric(params[p], errors="coerce").fillna(PARAMETROS_DEFECTO[p])
+    return params
+
+
+def totales(base, pct_indirectos=0.0, pct_descuento=0.0, pct_iva=15.0, pct_anticipo=0.0):
+    # Una base ya conocida (p. ej. el total acumulado de una TablaEditable) -> dict de floats
+    res = cascada(base, pct_indirectos, pct_descuento, pct_iva, pct_anticipo)
+    return {k: float(v) for k, v in res.items()}
+
+
+def calcular_totales(df, pct_indirectos=0.0, pct_descuento=0.0, pct_iva=15.0, pct_anticipo=0.0):
+    # Un presupuesto + un juego de parámetros -> dict de floats
+    return totales(base_presupuesto(df), pct_indirectos, pct_descuento, pct_iva, pct_anticipo)
+
+
+def calcular_escenarios(df, parametros):
+    # Un presupuesto + matriz de parámetros (DataFrame con columnas PARAMETROS,
+    # lista de dicts o arreglo n×4) -> DataFrame con una fila de totales por escenario.
+    # La base se calcula una sola vez; el resto es una pasada vectorizada.
+    params = _parametros(parametros)
+    res = cascada(
+        base_presupuesto(df),
+        params["pct_indirectos"].to_numpy(dtype=float),
+        params["pct_descuento"].to_numpy(dtype=float),
+        params["pct_iva"].to_numpy(dtype=float),
+        params["pct_anticipo"].to_numpy(dtype=float),
+    )
+    out = pd.DataFrame(res, index=params.index)
+    return pd.concat([params[PARAMETROS], out], axis=1)
+
+
+def calcular_lote(presupuestos, parametros):
+    # Varios presupuestos (dict nombre -> DataFrame) × varios escenarios.
+    # Devuelve un DataFrame largo con una fila por (presupuesto, escenario).
+    nombres = list(presupuestos)
+    bases = np.array([base_presupuesto(presupuestos[n]) for n in nombres], dtype=float)
+    params = _parametros(parametros)
+    m = len(params)
+    res = cascada(
+        bases[:, None],
+        *(params[p].to_numpy(dtype=float)[None, :] for p in PARAMETROS),
+    )
+    out = pd.DataFrame({k: np.broadcast_to(v, (len(nombres), m)).ravel() for k, v in res.items()})
+    out.insert(0, "escenario", np.tile(params.index.to_numpy(), len(nombres)))
+    out.insert(0, "presupuesto", np.repeat(np.array(nombres, dtype=object), m))
+    for p in PARAMETROS:
+        out[p] = np.tile(params[p].to_numpy(dtype=float), len(nombres))
+    return out
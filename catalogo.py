@@ -0,0 +1,410 @@
+# ---------------------------
+# CATÁLOGO PERSISTENTE DE PRECIOS (sin Streamlit)
+# ---------------------------
+# Rubros, materiales, mano de obra y herramientas viven en un SQLite local.
+# Cada tabla se carga una vez por proceso y se comparte en solo lectura entre
+# todas las sesiones; cada sesión guarda únicamente sus propios cambios
+# (CapaSesion, indexada por CODIGO) hasta que los confirma en el catálogo.
+import os
+import sqlite3
+import threading
+import weakref
+from collections import OrderedDict
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from metricas import contar
+
+RUTA_CATALOGO = os.environ.get(
+    "ARQUIPRO_CATALOGO", os.path.join(os.path.dirname(os.path.abspath(__file__)), "datos", "catalogo.sqlite")
+)
+
+COLUMNAS = {
+    "rubros": ["CODIGO","DESCRIPCION","UNIDAD","PRECIO_UNITARIO_USD","CATEGORIA","INCERTIDUMBRE","SUPUESTO_NOTAS","FUENTE","FECHA_ACTUALIZACION","CANTIDAD"],
+    "materiales": ["CODIGO","DESCRIPCION","UNIDAD","PRECIO_UNITARIO_USD","FUENTE","FECHA_ACTUALIZACION"],
+    "mano_obra": ["CODIGO","DESCRIPCION","UNIDAD","COSTO_UNITARIO_USD","RENDIMIENTO","FUENTE","FECHA_ACTUALIZACION"],
+    "herramientas": ["CODIGO","DESCRIPCION","UNIDAD","TARIFA_USO_USD","FUENTE","FECHA_ACTUALIZACION"],
+}
+NUMERICAS = {
+    "rubros": ["PRECIO_UNITARIO_USD","CANTIDAD"],
+    "materiales": ["PRECIO_UNITARIO_USD"],
+    "mano_obra": ["COSTO_UNITARIO_USD"],
+    "herramientas": ["TARIFA_USO_USD"],
+}
+TABLAS = list(COLUMNAS)
+# columna de precio de cada tabla (la que se guarda en el historial)
+PRECIO = {
+    "rubros": "PRECIO_UNITARIO_USD", "materiales": "PRECIO_UNITARIO_USD",
+    "mano_obra": "COSTO_UNITARIO_USD", "herramientas": "TARIFA_USO_USD",
+}
+
+# Composición de cada rubro (análisis de precios unitarios, ver apu.py)
+COLUMNAS_APU = ["RUBRO","TIPO","INSUMO","CANTIDAD","RENDIMIENTO"]
+
+# Plantilla inicial vivienda media-baja (Quito) con cantidades=0
+PLANTILLA_RUBROS = [
+    ["DEM-001","Limpieza y trazo de terreno","m²",0.80,"Demoliciones/Preparación","Baja","Terreno accesible, sin escombros previos","Ref. local","2025-08-31"],
+    ["MOV-001","Excavación manual zanjas cimentación","m³",10.50,"Cimentación","Media","Suelo tipo II, sin agua","Ref. local","2025-08-31"],
+    ["CIM-001","Cimentación corrida hormigón ciclópeo","m³",85.00,"Cimentación","Media","Dosificación 120 kg, piedra disponible","Ref. local","2025-08-31"],
+    ["EST-001","Columna de hormigón armado f'c=210 kg/cm²","m³",165.00,"Estructura","Media","Acero #3-#5, cimbras reutilizables","Ref. local","2025-08-31"],
+    ["EST-002","Viga/Cadena de amarre f'c=210 kg/cm²","m³",160.00,"Estructura","Media","Longitudes regulares","Ref. local","2025-08-31"],
+    ["EST-003","Losa maciza de hormigón armado 12 cm","m²",24.00,"Estructura","Media","Espesor 12 cm, malla 6-6/10-10","Ref. local","2025-08-31"],
+    ["MAN-001","Muro bloque cemento 15 cm","m²",18.50,"Mampostería","Media","Bloque estándar, mortero 1:4","Ref. local","2025-08-31"],
+    ["MAN-002","Tabique interior bloque 10 cm","m²",16.00,"Mampostería","Media","Altura ≤ 2.6 m","Ref. local","2025-08-31"],
+    ["INS-001","Instalación sanitaria baño completo","ud",320.00,"Instalaciones","Alta","Incluye tuberías y aparatos básicos","Ref. local","2025-08-31"],
+    ["INS-002","Instalación eléctrica vivienda tipo (hasta 60 m²)","ud",380.00,"Instalaciones","Alta","Canalización y tablero básico","Ref. local","2025-08-31"],
+    ["ACB-001","Piso cerámico económico","m²",11.50,"Acabados","Media","Incluye adhesivo, junta","Ref. local","2025-08-31"],
+    ["ACB-002","Revestimiento cerámico pared (baño/cocina)","m²",13.50,"Acabados","Media","Altura 1.50 m","Ref. local","2025-08-31"],
+    ["ACB-003","Enlucido y pintura interior","m²",6.80,"Acabados","Media","Pintura látex estándar","Ref. local","2025-08-31"],
+    ["ACB-004","Pintura exterior","m²",7.50,"Acabados","Media","Sellador + 2 manos","Ref. local","2025-08-31"],
+    ["CAR-001","Puerta metálica simple","ud",140.00,"Carpintería/Cerrajería","Alta","Incluye bisagras y cerradura simple","Ref. local","2025-08-31"],
+    ["CAR-002","Ventana metálica c/vidrio 1.20x1.00","ud",120.00,"Carpintería/Cerrajería","Media","Perfilería liviana","Ref. local","2025-08-31"],
+    ["CBT-001","Estructura metálica para cubierta liviana","m²",18.00,"Cubierta","Media","Luz corta","Ref. local","2025-08-31"],
+    ["CBT-002","Cubierta teja fibrocemento","m²",12.00,"Cubierta","Media","Incluye fijaciones","Ref. local","2025-08-31"],
+    ["IMP-001","Impermeabilización losa expuesta","m²",9.50,"Impermeabilización","Alta","Membrana asfáltica 3 mm","Ref. local","2025-08-31"],
+    ["EXT-001","Cerramiento perimetral en bloque","m²",19.00,"Exteriores","Media","Altura 2.00 m","Ref. local","2025-08-31"],
+    ["EXT-002","Acceso peatonal hormigón simple","m²",10.00,"Exteriores","Baja","Espesor 8 cm","Ref. local","2025-08-31"],
+]
+
+
+def plantilla_rubros():
+    df = pd.DataFrame(PLANTILLA_RUBROS, columns=COLUMNAS["rubros"][:-1])
+    df["CANTIDAD"] = 0.0
+    return df
+
+
+def fecha_iso(serie):
+    # Fechas en texto (2025-08-31, 31/08/2025, ...) -> "AAAA-MM-DD"; inválidas -> None
+    texto = pd.Series(serie, dtype=object).reset_index(drop=True).astype(str).str.strip()
+    fechas = pd.to_datetime(texto.str[:10], errors="coerce", format="%Y-%m-%d")
+    otras = fechas.isna() & texto.ne("None")
+    if otras.any():
+        fechas[otras] = pd.to_datetime(texto[otras], errors="coerce", format="mixed", dayfirst=True)
+    return fechas.dt.strftime("%Y-%m-%d").astype(object).where(fechas.notna(), None)
+
+
+def normalizar(nombre, df):
+    # Columnas del esquema en orden, CODIGO como texto y numéricas como float
+    df = df.reindex(columns=COLUMNAS[nombre])
+    df["CODIGO"] = df["CODIGO"].astype(object).where(df["CODIGO"].notna(), "").astype(str).str.strip()
+    for col in NUMERICAS[nombre]:
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype(float)
+    return df
+
+
+class Catalogo:
+    def __init__(self, ruta=RUTA_CATALOGO):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._tablas = {}      # nombre -> DataFrame compartido (no modificar en sitio)
+        self._posiciones = {}  # nombre -> dict CODIGO -> posición en la tabla
+        self._historial = {}   # nombre -> DataFrame (CODIGO, FECHA, PRECIO, FUENTE) ordenado por FECHA
+        self.version = {t: 0 for t in TABLAS + ["apu"]}
+        if os.path.dirname(ruta):
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        self._crear()
+
+    def _conectar(self):
+        return sqlite3.connect(self.ruta, timeout=30)
+
+    def _crear(self):
+        with self._conectar() as con:
+            for nombre, cols in COLUMNAS.items():
+                defs = ", ".join(
+                    "CODIGO TEXT PRIMARY KEY" if c == "CODIGO" else f"{c} {'REAL' if c in NUMERICAS[nombre] else 'TEXT'}"
+                    for c in cols
+                )
+                con.execute(f"CREATE TABLE IF NOT EXISTS {nombre} ({defs})")
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS apu (RUBRO TEXT, TIPO TEXT, INSUMO TEXT, CANTIDAD REAL, RENDIMIENTO REAL, "
+                "PRIMARY KEY (RUBRO, TIPO, INSUMO))"
+            )
+            # historial de precios: solo se agregan filas, nunca se modifican
+            con.execute("CREATE TABLE IF NOT EXISTS historial (TABLA TEXT, CODIGO TEXT, FECHA TEXT, PRECIO REAL, FUENTE TEXT)")
+            con.execute("CREATE INDEX IF NOT EXISTS historial_codigo_fecha ON historial (TABLA, CODIGO, FECHA)")
+            if con.execute("SELECT COUNT(*) FROM rubros").fetchone()[0] == 0:
+                self._anotar_historial(con, "rubros", plantilla_rubros())
+                self._upsert(con, "rubros", plantilla_rubros())
+            for nombre in TABLAS:
+                # catálogos anteriores al historial: se parte de los precios actuales
+                if con.execute("SELECT 1 FROM historial WHERE TABLA = ? LIMIT 1", (nombre,)).fetchone() is None:
+                    actual = pd.read_sql_query(f"SELECT * FROM {nombre}", con)
+                    self._anotar_historial(con, nombre, actual)
+
+    def _upsert(self, con, nombre, df, actualizar=None, solo_nuevos=False):
+        # `actualizar`: columnas que se pisan en códigos existentes (por defecto todas)
+        cols = COLUMNAS[nombre]
+        actualizar = [c for c in (actualizar or cols) if c in cols and c != "CODIGO"]
+        if solo_nuevos or not actualizar:
+            conflicto = "DO NOTHING"
+        else:
+            conflicto = "DO UPDATE SET " + ", ".join(f"{c}=excluded.{c}" for c in actualizar)
+        sql = (f"INSERT INTO {nombre} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))}) "
+               f"ON CONFLICT(CODIGO) {conflicto}")
+        df = normalizar(nombre, df)
+        df = df[df["CODIGO"] != ""].astype(object).where(df.notna(), None)
+        con.executemany(sql, df.itertuples(index=False, name=None))
+
+    def _anotar_historial(self, con, nombre, filas, solo_nuevos=False):
+        # Agrega al historial los precios nuevos o distintos del guardado. La fecha es la
+        # FECHA_ACTUALIZACION de la fila si es válida y posterior a la guardada; si no, la de hoy.
+        col = PRECIO[nombre]
+        if col not in filas.columns:
+            return
+        filas = normalizar(nombre, filas)
+        filas = filas[(filas["CODIGO"] != "") & filas[col].notna()].drop_duplicates("CODIGO", keep="last")
+        previo = pd.read_sql_query(f"SELECT CODIGO, {col} AS PRECIO, FECHA_ACTUALIZACION AS FECHA FROM {nombre}", con)
+        previo = previo.drop_duplicates("CODIGO", keep="last").set_index("CODIGO").reindex(filas["CODIGO"])
+        nuevo = previo["PRECIO"].isna().to_numpy()
+        precio = filas[col].to_numpy(dtype=float)
+        cambio = nuevo if solo_nuevos else nuevo | ~np.isclose(precio, previo["PRECIO"].to_numpy(dtype=float, na_value=np.nan))
+        if not cambio.any():
+            return
+        fecha = fecha_iso(filas["FECHA_ACTUALIZACION"])
+        fecha_previa = fecha_iso(previo["FECHA"])
+        posterior = fecha.notna() & (fecha_previa.isna() | (fecha.fillna("") > fecha_previa.fillna("")))
+        fecha = fecha.where(posterior, date.today().isoformat())
+        fuente = filas["FUENTE"].astype(object).where(filas["FUENTE"].notna(), None)
+        columnas = [filas["CODIGO"], fecha, pd.Series(precio), fuente]
+        con.executemany(
+            "INSERT INTO historial (TABLA, CODIGO, FECHA, PRECIO, FUENTE) VALUES (?, ?, ?, ?, ?)",
+            zip([nombre] * int(cambio.sum()), *(c.to_numpy(dtype=object)[cambio].tolist() for c in columnas)),
+        )
+        self._historial.pop(nombre, None)
+
+    def _cargar(self, nombre):
+        with self._conectar() as con:
+            df = pd.read_sql_query(f"SELECT {', '.join(COLUMNAS[nombre])} FROM {nombre} ORDER BY rowid", con)
+        df = normalizar(nombre, df)
+        self._tablas[nombre] = df
+        self._posiciones[nombre] = {c: i for i, c in enumerate(df["CODIGO"])}
+        return df
+
+    def tabla(self, nombre):
+        df = self._tablas.get(nombre)
+        if df is None:
+            with self._lock:
+                df = self._tablas.get(nombre)
+                if df is None:
+                    df = self._cargar(nombre)
+        return df
+
+    def posiciones(self, nombre):
+        self.tabla(nombre)
+        return self._posiciones[nombre]
+
+    def guardar(self, nombre, filas, borrados=()):
+        # filas: DataFrame con las filas nuevas/modificadas; borrados: CODIGOs a eliminar
+        with self._lock:
+            with self._conectar() as con:
+                if filas is not None and len(filas):
+                    self._anotar_historial(con, nombre, filas)
+                    self._upsert(con, nombre, filas)
+                if borrados:
+                    con.executemany(f"DELETE FROM {nombre} WHERE CODIGO = ?", [(c,) for c in borrados])
+            self._cargar(nombre)
+            self.version[nombre] += 1
+
+    def importar(self, nombre, filas, actualizar=None, solo_nuevos=False):
+        # Carga masiva en una sola transacción; devuelve (nuevos, actualizados)
+        previos = self.posiciones(nombre)
+        with self._lock:
+            with self._conectar() as con:
+                self._anotar_historial(con, nombre, filas, solo_nuevos)
+                self._upsert(con, nombre, filas, actualizar, solo_nuevos)
+            self._cargar(nombre)
+            self.version[nombre] += 1
+        existe = filas["CODIGO"].isin(list(previos))
+        return int((~existe).sum()), 0 if solo_nuevos else int(existe.sum())
+
+    def historial(self, nombre):
+        # Historial de precios de una tabla, en columnas y ordenado por FECHA (ver historial.py)
+        df = self._historial.get(nombre)
+        if df is None:
+            with self._conectar() as con:
+                df = pd.read_sql_query(
+                    "SELECT CODIGO, FECHA, PRECIO, FUENTE FROM historial WHERE TABLA = ? ORDER BY FECHA, rowid",
+                    con, params=(nombre,),
+                )
+            df["FECHA"] = pd.to_datetime(df["FECHA"]).astype("datetime64[ns]")
+            self._historial[nombre] = df
+        return df
+
+    def componentes(self):
+        # Tabla APU completa (RUBRO, TIPO, INSUMO, CANTIDAD, RENDIMIENTO), compartida
+        df = self._tablas.get("apu")
+        if df is None:
+            with self._lock:
+                with self._conectar() as con:
+                    df = pd.read_sql_query(f"SELECT {', '.join(COLUMNAS_APU)} FROM apu ORDER BY rowid", con)
+                self._tablas["apu"] = df
+        return df
+
+    def guardar_componentes(self, rubro, df):
+        # Reemplaza la composición de un rubro
+        filas = df.reindex(columns=COLUMNAS_APU[1:]).dropna(subset=["TIPO", "INSUMO"])
+        with self._lock:
+            with self._conectar() as con:
+                con.execute("DELETE FROM apu WHERE RUBRO = ?", (rubro,))
+                con.executemany(
+                    "INSERT OR REPLACE INTO apu VALUES (?, ?, ?, ?, ?)",
+                    [(rubro, t, str(i), None if pd.isna(c) else float(c), None if pd.isna(r) else float(r))
+                     for t, i, c, r in filas.itertuples(index=False, name=None)],
+                )
+            self._tablas.pop("apu", None)
+            self.version["apu"] += 1
+
+
+_catalogos = {}
+_lock_catalogos = threading.Lock()
+
+
+def abrir_catalogo(ruta=RUTA_CATALOGO):
+    # Un Catalogo por ruta y por proceso
+    with _lock_catalogos:
+        cat = _catalogos.get(ruta)
+        if cat is None:
+            cat = _catalogos[ruta] = Catalogo(ruta)
+        return cat
+
+
+class CapaSesion:
+    # Cambios de una sesión sobre una tabla compartida (copy-on-write por CODIGO)
+    def __init__(self, catalogo, nombre):
+        self.catalogo = catalogo
+        self.nombre = nombre
+        self.cambios = {}     # CODIGO -> dict fila (nuevas o modificadas)
+        self.borrados = set()
+        self.revision = 0     # sube con cada cambio (para invalidar vistas derivadas)
+
+    def __len__(self):
+        return len(self.cambios) + len(self.borrados)
+
+    def df(self):
+        base = self.catalogo.tabla(self.nombre)
+        if not self.cambios and not self.borrados:
+            return base  # sin cambios: la misma tabla compartida, sin copias
+        cols = COLUMNAS[self.nombre]
+        pos = self.catalogo.posiciones(self.nombre)
+        vista = base.copy(deep=False)
+        contar("catalogo.copias_capa")
+        modificados = [c for c in self.cambios if c in pos]
+        if modificados:
+            idx = [pos[c] for c in modificados]
+            filas = normalizar(self.nombre, pd.DataFrame([self.cambios[c] for c in modificados], index=idx))
+            for col in cols:
+                # la base es compartida: se copia solo la columna que se sobrescribe
+                # (correcto con o sin copy-on-write de pandas)
+                columna = vista[col].copy()
+                columna.loc[idx] = filas[col].to_numpy()
+                vista[col] = columna
+        if self.borrados:
+            vista = vista[~vista["CODIGO"].isin(self.borrados)]
+        nuevos = [f for c, f in self.cambios.items() if c not in pos]
+        if nuevos:
+            vista = pd.concat([vista, normalizar(self.nombre, pd.DataFrame(nuevos))], ignore_index=True)
+        return vista.reset_index(drop=True)
+
+    def agregar(self, fila):
+        fila = normalizar(self.nombre, pd.DataFrame([fila])).iloc[0].to_dict()
+        self.cambios[fila["CODIGO"]] = fila
+        self.borrados.discard(fila["CODIGO"])
+        self.revision += 1
+
+    def fijar(self, columna, valores):
+        # Cambia una columna solo en las filas indicadas (Series CODIGO -> valor)
+        base = self.catalogo.tabla(self.nombre)
+        pos = self.catalogo.posiciones(self.nombre)
+        cambiados = 0
+        for codigo, valor in valores.items():
+            fila = self.cambios.get(codigo)
+            if fila is None:
+                if codigo not in pos or codigo in self.borrados:
+                    continue
+                fila = base.iloc[pos[codigo]].to_dict()
+            self.cambios[codigo] = {**fila, columna: valor}
+            cambiados += 1
+        if cambiados:
+            self.revision += 1
+
+    def actualizar(self, editado):
+        # Compara la tabla editada contra la vista actual y registra solo las diferencias
+        actual = self.df()
+        nuevo = normalizar(self.nombre, editado)
+        nuevo = nuevo[nuevo["CODIGO"] != ""].drop_duplicates("CODIGO", keep="last")
+        pos = self.catalogo.posiciones(self.nombre)
+        quitados = set(actual["CODIGO"]) - set(nuevo["CODIGO"])
+        for codigo in quitados:
+            self.cambios.pop(codigo, None)
+            if codigo in pos:
+                self.borrados.add(codigo)
+        previo = actual.drop_duplicates("CODIGO", keep="last").set_index("CODIGO").reindex(nuevo["CODIGO"])
+        comp = nuevo.set_index("CODIGO")
+        distinto = ~((comp == previo) | (comp.isna() & previo.isna())).all(axis=1)
+        for codigo, fila in comp[distinto].iterrows():
+            self.cambios[codigo] = {"CODIGO": codigo, **fila.to_dict()}
+            self.borrados.discard(codigo)
+        # sin diferencias no sube la revisión: las vistas e índices derivados siguen valiendo
+        if quitados or distinto.any():
+            self.revision += 1
+        return list(comp.index[distinto])
+
+    def registrar(self, filas, borrados=()):
+        # Registra filas que ya se sabe que cambiaron (delta del editor), sin comparar la tabla
+        pos = self.catalogo.posiciones(self.nombre)
+        cambiados = 0
+        for codigo in borrados:
+            self.cambios.pop(codigo, None)
+            if codigo in pos:
+                self.borrados.add(codigo)
+            cambiados += 1
+        if len(filas):
+            for fila in normalizar(self.nombre, filas).to_dict("records"):
+                if fila["CODIGO"]:
+                    self.cambios[fila["CODIGO"]] = fila
+                    self.borrados.discard(fila["CODIGO"])
+                    cambiados += 1
+        if cambiados:
+            self.revision += 1
+
+    def confirmar(self):
+        # Escribe los cambios de la sesión en el catálogo compartido
+        filas = pd.DataFrame(list(self.cambios.values())) if self.cambios else None
+        self.catalogo.guardar(self.nombre, filas, self.borrados)
+        self.cambios.clear()
+        self.borrados.clear()
+        self.revision += 1
+
+    def descartar(self):
+        if len(self):
+            self.cambios.clear()
+            self.borrados.clear()
+            self.revision += 1
+
+
+CAPACIDAD_VISTAS = 16  # vistas de capas con cambios en memoria por proceso
+_vistas = OrderedDict()  # (id capa, versión, revisión) -> (weakref capa, DataFrame)
+_lock_vistas = threading.Lock()
+
+
+def vista_capa(capa):
+    # capa.df() memorizada en una LRU del proceso y no en la sesión: una sesión
+    # inactiva no retiene su copia (si se descartó, se rehace al volver)
+    if not len(capa):
+        return capa.df()  # la tabla compartida, sin copias
+    clave = (id(capa), capa.catalogo.version[capa.nombre], capa.revision)
+    with _lock_vistas:
+        en_cache = _vistas.get(clave)
+        if en_cache is not None and en_cache[0]() is capa:
+            _vistas.move_to_end(clave)
+            return en_cache[1]
+    df = capa.df()
+    with _lock_vistas:
+        for viejo in [k for k in _vistas if k[0] == id(capa) and k != clave]:
+            del _vistas[viejo]
+        _vistas[clave] = (weakref.ref(capa), df)
+        while len(_vistas) > CAPACIDAD_VISTAS:
+            _vistas.popitem(last=False)
+    return df
@@ -0,0 +1,171 @@
+# ---------------------------
+# CUBICACIÓN DESDE LA GEOMETRÍA (sin Streamlit)
+# ---------------------------
+# Las cantidades de una vivienda tipo salen de unas pocas medidas (área de piso,
+# perímetro y altura de muros, tabiques, vanos, baños). El cálculo va en dos pasos,
+# ambos vectorizados sobre todas las variantes de planta a la vez:
+#   1. variables (una fila por variante) -> magnitudes derivadas (m² de muro neto,
+#      m³ de zanja, ...) con operaciones de columnas NumPy.
+#   2. magnitudes × matriz de reglas -> CANTIDAD por CODIGO (un producto de matrices).
+# Una regla es (CODIGO, MAGNITUD, FACTOR); varias filas del mismo CODIGO se suman
+# (p. ej. enlucido = 2 × tabiques + 1 × cara interior de muros exteriores).
+import numpy as np
+import pandas as pd
+
+import calculo
+
+# variable -> (valor por defecto, descripción)
+VARIABLES = {
+    "AREA_PISO": (60.0, "Área de piso (m²)"),
+    "PERIMETRO": (32.0, "Perímetro de muros exteriores (ml)"),
+    "ALTURA": (2.5, "Altura de muros (m)"),
+    "TABIQUES": (18.0, "Longitud de tabiques interiores (ml)"),
+    "PUERTAS": (5, "Puertas (ud)"),
+    "VENTANAS": (6, "Ventanas (ud)"),
+    "BANOS": (1, "Baños (ud)"),
+    "AREA_PUERTA": (1.9, "Área por puerta (m²)"),
+    "AREA_VENTANA": (1.2, "Área por ventana (m²)"),
+    "ALERO": (1.15, "Factor cubierta/área de piso (aleros y pendiente)"),
+    "ZANJA_ANCHO": (0.4, "Ancho de zanja de cimentación (m)"),
+    "ZANJA_PROF": (0.6, "Profundidad de zanja (m)"),
+    "SEP_COLUMNAS": (3.5, "Separación entre columnas (m)"),
+    "SECCION_COLUMNA": (0.09, "Sección de columna (m²)"),
+    "SECCION_VIGA": (0.06, "Sección de viga/cadena (m²)"),
+    "REVEST_BANO": (12.0, "Revestimiento cerámico por baño (m²)"),
+    "CERRAMIENTO": (0.0, "Cerramiento perimetral del terreno (ml)"),
+    "ALTURA_CERRAMIENTO": (2.0, "Altura del cerramiento (m)"),
+    "ACCESO": (0.0, "Acceso peatonal de hormigón (m²)"),
+}
+
+MAGNITUDES = [
+    "UNIDAD", "AREA_PISO", "AREA_CUBIERTA", "MURO_EXT", "MURO_INT", "VANOS", "ZANJA", "COLUMNAS", "VIGAS",
+    "PUERTAS", "VENTANAS", "BANOS", "REVEST_BANOS", "CERRAMIENTO_M2", "ACCESO",
+]
+COLUMNAS_REGLAS = ["CODIGO", "MAGNITUD", "FACTOR"]
+
+# Juegos de reglas sobre los rubros de la plantilla (catalogo.PLANTILLA_RUBROS).
+# El FACTOR incluye desperdicios cuando corresponde.
+_COMUNES = [
+    ("DEM-001", "AREA_PISO", 1.2),     # limpieza y trazo con holgura alrededor
+    ("MOV-001", "ZANJA", 1.0),
+    ("CIM-001", "ZANJA", 1.0),
+    ("EST-001", "COLUMNAS", 1.0),
+    ("EST-002", "VIGAS", 1.0),
+    ("MAN-001", "MURO_EXT", 1.05),
+    ("MAN-002", "MURO_INT", 1.05),
+    ("INS-001", "BANOS", 1.0),
+    ("INS-002", "UNIDAD", 1.0),
+    ("ACB-001", "AREA_PISO", 1.05),
+    ("ACB-002", "REVEST_BANOS", 1.05),
+    ("ACB-003", "MURO_INT", 2.0),      # tabiques: las dos caras
+    ("ACB-003", "MURO_EXT", 1.0),      # muros exteriores: cara interior
+    ("ACB-004", "MURO_EXT", 1.0),
+    ("CAR-001", "PUERTAS", 1.0),
+    ("CAR-002", "VENTANAS", 1.0),
+    ("EXT-001", "CERRAMIENTO_M2", 1.0),
+    ("EXT-002", "ACCESO", 1.0),
+]
+REGLAS = {
+    "Vivienda con cubierta liviana": pd.DataFrame(
+        _COMUNES + [("CBT-001", "AREA_CUBIERTA", 1.0), ("CBT-002", "AREA_CUBIERTA", 1.05)], columns=COLUMNAS_REGLAS),
+    "Vivienda con losa": pd.DataFrame(
+        _COMUNES + [("EST-003", "AREA_PISO", 1.0), ("IMP-001", "AREA_PISO", 1.0)], columns=COLUMNAS_REGLAS),
+}
+REGLAS_DEFECTO = "Vivienda con cubierta liviana"
+
+
+def variantes_desde(variables):
+    # dict / Series (una variante) o DataFrame (varias) -> DataFrame con todas las VARIABLES
+    df = pd.DataFrame([variables]) if isinstance(variables, (dict, pd.Series)) else pd.DataFrame(variables)
+    desconocidas = [c for c in df.columns if c not in VARIABLES]
+    if desconocidas:
+        raise ValueError(f"Variables desconocidas: {', '.join(map(str, desconocidas))}")
+    out = pd.DataFrame(index=df.index)
+    for v, (defecto, _) in VARIABLES.items():
+        out[v] = pd.to_numeric(df[v], errors="coerce").fillna(defecto) if v in df.columns else float(defecto)
+    return out.astype(float)
+
+
+def rejilla(**valores):
+    # Todas las combinaciones de los valores dados, p. ej.
+    # rejilla(AREA_PISO=[50, 60, 70], ALTURA=[2.4, 2.6]) -> 6 variantes
+    indice = pd.MultiIndex.from_product(list(valores.values()), names=list(valores))
+    return variantes_desde(indice.to_frame(index=False))
+
+
+def magnitudes(variantes):
+    # Variables (V filas) -> magnitudes derivadas (V × len(MAGNITUDES)), todo por columnas
+    v = {c: variantes[c].to_numpy(dtype=float) for c in VARIABLES}
+    vanos = v["PUERTAS"] * v["AREA_PUERTA"] + v["VENTANAS"] * v["AREA_VENTANA"]
+    largo_cimientos = v["PERIMETRO"] + v["TABIQUES"]
+    columnas = np.ceil(v["PERIMETRO"] / np.maximum(v["SEP_COLUMNAS"], 0.5))
+    m = {
+        "UNIDAD": np.ones(len(variantes)),
+        "AREA_PISO": v["AREA_PISO"],
+        "AREA_CUBIERTA": v["AREA_PISO"] * v["ALERO"],
+        "MURO_EXT": np.maximum(v["PERIMETRO"] * v["ALTURA"] - vanos, 0.0),  # vanos en muros exteriores
+        "MURO_INT": v["TABIQUES"] * v["ALTURA"],
+        "VANOS": vanos,
+        "ZANJA": largo_cimientos * v["ZANJA_ANCHO"] * v["ZANJA_PROF"],
+        "COLUMNAS": columnas * v["SECCION_COLUMNA"] * v["ALTURA"],
+        "VIGAS": largo_cimientos * v["SECCION_VIGA"],
+        "PUERTAS": v["PUERTAS"],
+        "VENTANAS": v["VENTANAS"],
+        "BANOS": v["BANOS"],
+        "REVEST_BANOS": v["BANOS"] * v["REVEST_BANO"],
+        "CERRAMIENTO_M2": v["CERRAMIENTO"] * v["ALTURA_CERRAMIENTO"],
+        "ACCESO": v["ACCESO"],
+    }
+    return pd.DataFrame(m, index=variantes.index, columns=MAGNITUDES)
+
+
+def matriz_reglas(reglas):
+    # Reglas -> (CODIGOs en orden de aparición, matriz len(MAGNITUDES) × CODIGOs)
+    reglas = pd.DataFrame(reglas).reindex(columns=COLUMNAS_REGLAS)
+    reglas = reglas.dropna(subset=["CODIGO", "MAGNITUD"])
+    reglas = reglas[reglas["CODIGO"].astype(str).str.strip() != ""]
+    mag = reglas["MAGNITUD"].astype(str).str.strip().str.upper()
+    malas = sorted(set(mag) - set(MAGNITUDES))
+    if malas:
+        raise ValueError(f"Magnitudes desconocidas en las reglas: {', '.join(malas)}")
+    codigos = pd.Index(pd.unique(reglas["CODIGO"].astype(str).str.strip()))
+    coef = np.zeros((len(MAGNITUDES), len(codigos)))
+    np.add.at(coef, (pd.Index(MAGNITUDES).get_indexer(mag), codigos.get_indexer(reglas["CODIGO"].astype(str).str.strip())),
+              pd.to_numeric(reglas["FACTOR"], errors="coerce").fillna(1.0).to_numpy(dtype=float))
+    return codigos, coef
+
+
+def cubicar(variantes, reglas=None, decimales=2):
+    # Variantes (V filas de VARIABLES) -> DataFrame V × CODIGO con las cantidades
+    reglas = REGLAS[REGLAS_DEFECTO] if reglas is None else reglas
+    variantes = variantes_desde(variantes)
+    codigos, coef = matriz_reglas(reglas)
+    q = magnitudes(variantes).to_numpy() @ coef
+    return pd.DataFrame(np.round(q, decimales), index=variantes.index, columns=codigos)
+
+
+def cantidades(variables, reglas=None):
+    # Una sola variante -> Series CODIGO -> CANTIDAD (para llenar un presupuesto)
+    q = cubicar(variables, reglas).iloc[0]
+    return q.rename("CANTIDAD").rename_axis("CODIGO")
+
+
+def barrido(variantes, catalogo, reglas=None, parametros=None, factores=None):
+    # Estudio de factibilidad: cada variante con su base, total y costo por m².
+    # Cantidades (V × R) @ precios del catálogo (R) y la cascada de calculo.py,
+    # todo en una pasada. `parametros`: pct_indirectos, pct_descuento, pct_iva, pct_anticipo.
+    # `factores`: uno por fila del catálogo (región/inflación/moneda, ver ajustes.py).
+    variantes = variantes_desde(variantes)
+    q = cubicar(variantes, reglas, decimales=6)
+    precio = pd.to_numeric(catalogo["PRECIO_UNITARIO_USD"], errors="coerce").to_numpy(dtype=float)
+    if factores is not None:
+        precio = precio * factores
+    precio = pd.Series(precio, index=catalogo["CODIGO"].astype(str))
+    precio = precio[~precio.index.duplicated(keep="last")]  # como en el catálogo, gana la última
+    precio = precio.reindex(q.columns).fillna(0.0).to_numpy()
+    res = calculo.cascada(q.to_numpy() @ precio, **{**calculo.PARAMETROS_DEFECTO, **(parametros or {})})
+    out = variantes.copy()
+    for k in ["base", "total"]:
+        out[k] = res[k]
+    out["costo_m2"] = out["total"] / out["AREA_PISO"].where(out["AREA_PISO"] > 0)
+    return out
@@ -0,0 +1,141 @@
+# ---------------------------
+# EDICIÓN INCREMENTAL DE TABLAS (sin Streamlit)
+# ---------------------------
+# `st.data_editor` entrega en session_state solo el delta de la edición:
+#     {"edited_rows": {pos: {col: valor}}, "added_rows": [{col: valor}], "deleted_rows": [pos]}
+# TablaEditable aplica ese delta sobre su DataFrame en sitio y actualiza solo los
+# SUBTOTAL de las filas tocadas y la base acumulada. Editar celdas cuesta O(filas
+# editadas); agregar o borrar filas sigue requiriendo reconstruir el índice.
+import numpy as np
+import pandas as pd
+
+from calculo import subtotales
+from metricas import contar
+
+NUMERICAS = ("CANTIDAD", "PRECIO_UNITARIO_USD")
+
+
+def _coercer(df):
+    for col in NUMERICAS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(float)
+    return df
+
+
+class TablaEditable:
+    def __init__(self, df):
+        df = _coercer(df.reset_index(drop=True).drop(columns=["SUBTOTAL"], errors="ignore"))
+        sub = subtotales(df)
+        self.df = df.assign(SUBTOTAL=sub.round(2))
+        self.base = float(sub.sum())
+        self.version = 0  # cambia tras cada delta para reiniciar el widget del editor
+
+    def __len__(self):
+        return len(self.df)
+
+    def datos(self):
+        # Tabla sin la columna calculada (para PDF, exportación, etc.)
+        return self.df.drop(columns=["SUBTOTAL"])
+
+    def _valor(self, col, val):
+        if col in NUMERICAS:
+            try:
+                return float(val)
+            except (TypeError, ValueError):
+                return np.nan
+        return val
+
+    def _sub(self, idx):
+        # subtotal sin redondear de las filas `idx`, leyendo directo de los arreglos
+        cant = self.df["CANTIDAD"].to_numpy(dtype=float)[idx]
+        precio = self.df["PRECIO_UNITARIO_USD"].to_numpy(dtype=float)[idx]
+        return np.nan_to_num(cant * precio)
+
+    def _escribir(self, col, idx, valores):
+        self.df.iloc[idx, self.df.columns.get_loc(col)] = valores
+
+    def aplicar_delta(self, delta, con_filas=False):
+        # Aplica el delta en sitio. Con `con_filas` devuelve además las filas
+        # modificadas/agregadas y los CODIGO eliminados o renombrados.
+        editadas = {int(k): v for k, v in (delta.get("edited_rows") or {}).items()}
+        borradas = sorted({int(i) for i in (delta.get("deleted_rows") or [])})
+        nuevas = list(delta.get("added_rows") or [])
+        borrados = []
+        idx = np.fromiter(editadas, dtype=np.int64, count=len(editadas))
+
+        if editadas:
+            antes = self._sub(idx)
+            # agrupa por columna: una sola escritura por columna editada
+            por_col = {}
+            for pos, valores in editadas.items():
+                for col, val in valores.items():
+                    if col != "SUBTOTAL" and col in self.df.columns:
+                        por_col.setdefault(col, ([], []))
+                        por_col[col][0].append(pos)
+                        por_col[col][1].append(self._valor(col, val))
+            if "CODIGO" in por_col:
+                previos = self.df["CODIGO"].to_numpy()[por_col["CODIGO"][0]]
+                borrados += [p for p, n in zip(previos, por_col["CODIGO"][1]) if p != n]
+            for col, (ps, vs) in por_col.items():
+                self._escribir(col, ps, vs)
+            despues = self._sub(idx)
+            self._escribir("SUBTOTAL", idx, despues.round(2))
+            self.base += float(despues.sum() - antes.sum())
+
+        if borradas:
+            self.base -= float(self._sub(borradas).sum())
+            if "CODIGO" in self.df.columns:
+                borrados += self.df["CODIGO"].to_numpy()[borradas].tolist()
+            self.df = self.df.drop(index=self.df.index[borradas]).reset_index(drop=True)
+            # posiciones de las filas editadas tras el borrado
+            idx = idx[~np.isin(idx, borradas)]
+            idx = idx - np.searchsorted(np.asarray(borradas), idx)
+
+        n_previas = len(self.df)
+        if nuevas:
+            self._anexar(pd.DataFrame(nuevas))
+
+        self.version += 1
+        contar("edicion.filas_delta", len(editadas) + len(borradas) + len(nuevas))
+        res = {"borrados": borrados}
+        if con_filas:
+            pos = np.concatenate([idx, np.arange(n_previas, len(self.df))])
+            res["filas"] = self.datos().iloc[pos]
+        return res
+
+    def _anexar(self, filas):
+        agregadas = _coercer(filas.reindex(columns=self.df.columns.drop("SUBTOTAL")))
+        sub = subtotales(agregadas)
+        self.base += float(sub.sum())
+        self.df = pd.concat([self.df, agregadas.assign(SUBTOTAL=sub.round(2))], ignore_index=True)
+
+    def agregar(self, filas):
+        # Agrega filas del catálogo (p. ej. resultados de búsqueda) que aún no estén en la tabla
+        filas = filas[~filas["CODIGO"].astype(str).isin(self.df["CODIGO"].astype(str))]
+        filas = filas.drop_duplicates("CODIGO")
+        if len(filas):
+            self._anexar(filas.reset_index(drop=True))
+            self.version += 1
+        return len(filas)
+
+    def fijar(self, columna, valores):
+        # Cambia `columna` en las filas cuyo CODIGO está en `valores` (Series CODIGO -> valor)
+        codigos = self.df["CODIGO"].astype(str)
+        mask = codigos.isin(valores.index).to_numpy()
+        if not mask.any():
+            return 0
+        idx = np.flatnonzero(mask)
+        antes = self._sub(idx)
+        self._escribir(columna, idx, codigos.iloc[idx].map(valores).to_numpy())
+        despues = self._sub(idx)
+        self._escribir("SUBTOTAL", idx, despues.round(2))
+        self.base += float(despues.sum() - antes.sum())
+        self.version += 1
+        return len(idx)
+
+    def recalcular(self):
+        # Recalcula todo desde cero (corrige deriva de redondeo si hiciera falta)
+        sub = subtotales(self.df)
+        self.df["SUBTOTAL"] = sub.round(2)
+        self.base = float(sub.sum())
+        return self.base
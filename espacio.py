@@ -0,0 +1,210 @@
+# ---------------------------
+# ESPACIOS DE TRABAJO COMPARTIDOS (sin Streamlit)
+# ---------------------------
+# Los presupuestos viven en el servidor (SQLite), agrupados por espacio de
+# trabajo (un equipo o un usuario), y no en st.session_state: una sesión solo
+# recuerda el espacio, el presupuesto abierto y la versión que leyó.
+# - Concurrencia optimista: cada guardado indica la versión sobre la que se
+#   editó; si otro usuario guardó antes, se lanza ConflictoVersion.
+# - Los presupuestos más usados quedan en una LRU en memoria, compartida por
+#   todas las sesiones del proceso; cada lectura entrega una copia (solo las
+#   líneas, ver presupuesto.py), así que las sesiones no se pisan entre sí.
+# - Un espacio se identifica con un código opaco (nuevo_espacio); quien lo
+#   conoce puede leer, editar y borrar sus presupuestos, así que no se usan
+#   nombres ni teléfonos adivinables.
+# - Los espacios sin uso por DIAS_INACTIVIDAD (ARQUIPRO_ESPACIOS_DIAS) se borran
+#   (purgar); el último uso es el último guardado o la última sesión que lo abrió.
+#   Un espacio sin presupuestos no deja nada en la base.
+import os
+import re
+import secrets
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from metricas import contar
+from presupuesto import Presupuesto
+
+RUTA_ESPACIOS = os.environ.get(
+    "ARQUIPRO_ESPACIOS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "datos", "espacios.sqlite")
+)
+CAPACIDAD_LRU = 128  # presupuestos en memoria por proceso
+DIAS_INACTIVIDAD = int(os.environ.get("ARQUIPRO_ESPACIOS_DIAS", "180"))
+_SEP = "\x1f"  # separador de códigos en la columna CODIGOS
+_CODIGO_ESPACIO = re.compile(r"[A-Za-z0-9_-]{16,64}")
+
+
+class ConflictoVersion(Exception):
+    def __init__(self, nombre, esperada, actual):
+        super().__init__(f"El presupuesto '{nombre}' cambió (versión {actual}, se esperaba {esperada}).")
+        self.nombre = nombre
+        self.esperada = esperada
+        self.actual = actual
+
+
+def nuevo_espacio():
+    # ~128 bits aleatorios: no se puede adivinar el espacio de otro equipo
+    return secrets.token_urlsafe(16)
+
+
+def espacio_valido(codigo):
+    return bool(_CODIGO_ESPACIO.fullmatch(str(codigo or "").strip()))
+
+
+def _copia(p):
+    return Presupuesto(p.codigos, p.cantidad, p.precio, p.fecha)
+
+
+class AlmacenPresupuestos:
+    def __init__(self, ruta=RUTA_ESPACIOS, capacidad=CAPACIDAD_LRU):
+        self.ruta = ruta
+        self.capacidad = capacidad
+        self._lock = threading.Lock()
+        self._lru = OrderedDict()  # (espacio, nombre) -> (versión, Presupuesto)
+        if os.path.dirname(ruta):
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with self._conectar() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS presupuestos (ESPACIO TEXT, NOMBRE TEXT, VERSION INTEGER, FECHA TEXT, "
+                "ACTUALIZADO TEXT, CODIGOS TEXT, CANTIDAD BLOB, PRECIO BLOB, PRIMARY KEY (ESPACIO, NOMBRE))"
+            )
+            # último uso por espacio (abrirlo sin guardar también cuenta)
+            con.execute("CREATE TABLE IF NOT EXISTS espacios (ESPACIO TEXT PRIMARY KEY, USADO TEXT)")
+        self._purgado = None  # fecha de la última purga de este proceso
+
+    def _conectar(self):
+        return sqlite3.connect(self.ruta, timeout=30)
+
+    def _recordar(self, clave, version, p):
+        with self._lock:
+            self._lru[clave] = (version, p)
+            self._lru.move_to_end(clave)
+            while len(self._lru) > self.capacidad:
+                self._lru.popitem(last=False)
+
+    def nombres(self, espacio):
+        with self._conectar() as con:
+            filas = con.execute("SELECT NOMBRE FROM presupuestos WHERE ESPACIO = ? ORDER BY rowid", (espacio,))
+            return [f[0] for f in filas]
+
+    def version(self, espacio, nombre):
+        with self._conectar() as con:
+            fila = con.execute("SELECT VERSION FROM presupuestos WHERE ESPACIO = ? AND NOMBRE = ?",
+                               (espacio, nombre)).fetchone()
+        return None if fila is None else fila[0]
+
+    def cargar(self, espacio, nombre):
+        # -> (copia del Presupuesto, versión); KeyError si no existe
+        clave = (espacio, nombre)
+        actual = self.version(espacio, nombre)
+        if actual is None:
+            with self._lock:
+                self._lru.pop(clave, None)
+            raise KeyError(nombre)
+        with self._lock:
+            en_memoria = self._lru.get(clave)
+            if en_memoria is not None and en_memoria[0] == actual:
+                self._lru.move_to_end(clave)
+                return _copia(en_memoria[1]), actual
+        with self._conectar() as con:
+            fila = con.execute(
+                "SELECT VERSION, FECHA, CODIGOS, CANTIDAD, PRECIO FROM presupuestos WHERE ESPACIO = ? AND NOMBRE = ?",
+                (espacio, nombre),
+            ).fetchone()
+        if fila is None:
+            raise KeyError(nombre)
+        version, fecha, codigos, cantidad, precio = fila
+        p = Presupuesto(codigos.split(_SEP) if codigos else [], np.frombuffer(cantidad, dtype=np.float64),
+                        np.frombuffer(precio, dtype=np.float64), fecha)
+        self._recordar(clave, version, p)
+        return _copia(p), version
+
+    def guardar(self, espacio, nombre, p, version=0):
+        # `version`: la que se leyó (0 = crear uno nuevo). Devuelve la nueva versión.
+        if not str(espacio or "").strip():
+            raise ValueError("El espacio de trabajo no puede estar vacío.")
+        datos = (p.fecha, datetime.now().isoformat(timespec="seconds"), _SEP.join(p.codigos.tolist()),
+                 np.ascontiguousarray(p.cantidad, dtype=np.float64).tobytes(),
+                 np.ascontiguousarray(p.precio, dtype=np.float64).tobytes())
+        with self._conectar() as con:
+            if version == 0:
+                try:
+                    con.execute("INSERT INTO presupuestos VALUES (?, ?, 1, ?, ?, ?, ?, ?)", (espacio, nombre, *datos))
+                except sqlite3.IntegrityError:
+                    raise ConflictoVersion(nombre, 0, self.version(espacio, nombre))
+            else:
+                cur = con.execute(
+                    "UPDATE presupuestos SET VERSION = VERSION + 1, FECHA = ?, ACTUALIZADO = ?, CODIGOS = ?, "
+                    "CANTIDAD = ?, PRECIO = ? WHERE ESPACIO = ? AND NOMBRE = ? AND VERSION = ?",
+                    (*datos, espacio, nombre, version),
+                )
+                if cur.rowcount == 0:
+                    raise ConflictoVersion(nombre, version, self.version(espacio, nombre))
+        self._recordar((espacio, nombre), version + 1, _copia(p))
+        return version + 1
+
+    def eliminar(self, espacio, nombre, version=None):
+        with self._conectar() as con:
+            if version is None:
+                con.execute("DELETE FROM presupuestos WHERE ESPACIO = ? AND NOMBRE = ?", (espacio, nombre))
+            else:
+                cur = con.execute("DELETE FROM presupuestos WHERE ESPACIO = ? AND NOMBRE = ? AND VERSION = ?",
+                                  (espacio, nombre, version))
+                if cur.rowcount == 0:
+                    raise ConflictoVersion(nombre, version, self.version(espacio, nombre))
+        with self._lock:
+            self._lru.pop((espacio, nombre), None)
+
+    def tocar(self, espacio):
+        # Marca el espacio como usado (una vez por sesión); solo si tiene presupuestos.
+        # De paso purga los abandonados, como mucho una vez al día por proceso.
+        ahora = datetime.now()
+        with self._conectar() as con:
+            con.execute("INSERT OR REPLACE INTO espacios SELECT ?, ? WHERE EXISTS "
+                        "(SELECT 1 FROM presupuestos WHERE ESPACIO = ?)",
+                        (espacio, ahora.isoformat(timespec="seconds"), espacio))
+        if self._purgado != ahora.date():
+            self._purgado = ahora.date()
+            self.purgar()
+
+    def purgar(self, dias=DIAS_INACTIVIDAD):
+        # Borra los espacios sin uso en `dias` días; devuelve cuántos
+        corte = (datetime.now() - timedelta(days=dias)).isoformat(timespec="seconds")
+        with self._conectar() as con:
+            viejos = [f[0] for f in con.execute(
+                "SELECT p.ESPACIO FROM presupuestos p LEFT JOIN espacios e ON e.ESPACIO = p.ESPACIO "
+                "GROUP BY p.ESPACIO HAVING MAX(COALESCE(MAX(e.USADO), ''), MAX(p.ACTUALIZADO)) < ?", (corte,))]
+            con.executemany("DELETE FROM presupuestos WHERE ESPACIO = ?", [(e,) for e in viejos])
+            con.execute("DELETE FROM espacios WHERE ESPACIO NOT IN (SELECT DISTINCT ESPACIO FROM presupuestos)")
+        if viejos:
+            borrar = set(viejos)
+            with self._lock:
+                for clave in [k for k in self._lru if k[0] in borrar]:
+                    del self._lru[clave]
+            contar("espacios.purgados", len(viejos))
+        return len(viejos)
+
+    def todos(self, espacio):
+        # nombre -> Presupuesto (p. ej. para exportar el espacio completo)
+        return {n: self.cargar(espacio, n)[0] for n in self.nombres(espacio)}
+
+    def en_memoria(self):
+        with self._lock:
+            return len(self._lru), sum(p.nbytes() for _, p in self._lru.values())
+
+
+_almacenes = {}
+_lock_almacenes = threading.Lock()
+
+
+def abrir_almacen(ruta=RUTA_ESPACIOS):
+    # Un almacén por ruta y por proceso
+    with _lock_almacenes:
+        alm = _almacenes.get(ruta)
+        if alm is None:
+            alm = _almacenes[ruta] = AlmacenPresupuestos(ruta)
+        return alm
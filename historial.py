@@ -0,0 +1,99 @@
+# ---------------------------
+# HISTORIAL DE PRECIOS (sin Streamlit)
+# ---------------------------
+# El catálogo agrega una fila (CODIGO, FECHA, PRECIO, FUENTE) cada vez que un
+# precio cambia (ver Catalogo._anotar_historial); nunca se reescribe. Con eso se
+# responde "precio vigente a la fecha D" para muchas líneas en un solo
+# `merge_asof`, y los informes de deriva comparan varias fechas sin guardar
+# copias completas de las tablas.
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+CAPACIDAD_INFORMES = 32  # informes de deriva en memoria por proceso
+
+
+def _fechas(fechas, n):
+    fechas = pd.to_datetime(fechas)
+    if np.ndim(fechas) == 0:
+        return pd.DatetimeIndex(np.full(n, np.datetime64(pd.Timestamp(fechas), "ns")))
+    return pd.DatetimeIndex(fechas).astype("datetime64[ns]")
+
+
+def precios_a_fecha(historial, codigos, fechas):
+    # Precio vigente de cada código a su fecha (una fecha para todos o una por línea).
+    # NaN si el código no tenía precio registrado en esa fecha.
+    codigos = np.asarray(codigos, dtype=object).astype(str)
+    n = len(codigos)
+    if not n or not len(historial):
+        return np.full(n, np.nan)
+    izq = pd.DataFrame({"CODIGO": codigos, "FECHA": _fechas(fechas, n), "_pos": np.arange(n)})
+    izq = izq.sort_values("FECHA", kind="stable")
+    res = pd.merge_asof(izq, historial[["CODIGO", "FECHA", "PRECIO"]], on="FECHA", by="CODIGO")
+    out = np.full(n, np.nan)
+    out[res["_pos"].to_numpy()] = res["PRECIO"].to_numpy(dtype=float, na_value=np.nan)
+    return out
+
+
+def deriva(historial, fechas, codigos=None):
+    # Informe de deriva: precio vigente en cada fecha (columnas) por código (filas),
+    # más la variación entre la primera y la última fecha.
+    fechas = sorted(pd.to_datetime(list(fechas)))
+    if codigos is None:
+        codigos = pd.unique(historial["CODIGO"])
+    codigos = np.asarray(codigos, dtype=object)
+    k = len(fechas)
+    precios = precios_a_fecha(historial, np.repeat(codigos, k), np.tile(np.array(fechas, dtype="datetime64[ns]"), len(codigos)))
+    out = pd.DataFrame(precios.reshape(len(codigos), k), index=pd.Index(codigos, name="CODIGO"),
+                       columns=[f.strftime("%Y-%m-%d") for f in fechas])
+    if k:
+        primero, ultimo = out.iloc[:, 0], out.iloc[:, -1]
+        out["VARIACION"] = ultimo - primero
+        out["VARIACION_PCT"] = (ultimo - primero) / primero.where(primero != 0) * 100
+    return out
+
+
+_informes = OrderedDict()
+_lock_informes = threading.Lock()
+
+
+def deriva_compartida(clave, historial, fechas):
+    # deriva() memorizada por proceso; `clave` debe cambiar con el historial
+    # (p. ej. tabla + ruta + versión del catálogo). Las fechas entran en la clave.
+    clave = (*clave, *[pd.Timestamp(f) for f in sorted(pd.to_datetime(list(fechas)))])
+    with _lock_informes:
+        informe = _informes.get(clave)
+        if informe is not None:
+            _informes.move_to_end(clave)
+            return informe
+    informe = deriva(historial, fechas)
+    with _lock_informes:
+        _informes[clave] = informe
+        while len(_informes) > CAPACIDAD_INFORMES:
+            _informes.popitem(last=False)
+    return informe
+
+
+def comparar_presupuesto(presupuesto, historial, catalogo, fecha):
+    # Reprecia un presupuesto (ver presupuesto.py) a los precios vigentes en `fecha` y lo
+    # compara con los de hoy. Las líneas con precio propio lo conservan en ambos casos;
+    # las que no tenían precio registrado en esa fecha usan el de hoy.
+    vista = presupuesto.vista(catalogo)
+    hoy = presupuesto.precios(catalogo)
+    antes = precios_a_fecha(historial, presupuesto.codigos, fecha)
+    sin_historial = np.isnan(antes)
+    antes = np.where(np.isnan(presupuesto.precio), np.where(sin_historial, hoy, antes), presupuesto.precio)
+    out = pd.DataFrame({
+        "CODIGO": presupuesto.codigos,
+        "DESCRIPCION": vista["DESCRIPCION"].to_numpy(),
+        "CANTIDAD": presupuesto.cantidad,
+        "PRECIO_FECHA": antes,
+        "PRECIO_HOY": hoy,
+    })
+    out["SUBTOTAL_FECHA"] = out["CANTIDAD"] * out["PRECIO_FECHA"]
+    out["SUBTOTAL_HOY"] = out["CANTIDAD"] * out["PRECIO_HOY"]
+    out["DIFERENCIA"] = out["SUBTOTAL_HOY"] - out["SUBTOTAL_FECHA"]
+    out["SIN_HISTORIAL"] = sin_historial & np.isnan(presupuesto.precio)
+    return out
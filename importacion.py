@@ -0,0 +1,200 @@
+# ---------------------------
+# IMPORTACIÓN MASIVA DE LISTAS DE PRECIOS (sin Streamlit)
+# ---------------------------
+# Lee CSV, Excel o Parquet por bloques, valida cada bloque de forma vectorizada
+# (CODIGO, UNIDAD y columnas numéricas), deduplica por CODIGO (gana la última
+# fila del archivo) y lo fusiona en el catálogo en una sola transacción. Las
+# filas rechazadas se devuelven con su número de fila y el motivo.
+import os
+
+import numpy as np
+import pandas as pd
+
+from busqueda import plegar
+from catalogo import COLUMNAS, NUMERICAS, PRECIO
+from metricas import contar
+
+TAM_BLOQUE = 20_000
+FORMATOS = ["csv", "xlsx", "parquet"]
+
+# encabezados habituales en listas de proveedores -> columna del catálogo
+SINONIMOS = {
+    "COD": "CODIGO", "CODIGO_ITEM": "CODIGO", "ITEM": "CODIGO",
+    "DESCRIPCION_ITEM": "DESCRIPCION", "DETALLE": "DESCRIPCION",
+    "UND": "UNIDAD", "UNID": "UNIDAD", "U": "UNIDAD",
+    "FECHA": "FECHA_ACTUALIZACION",
+}
+# nombres alternativos de la columna de precio de cada tabla
+SINONIMOS_PRECIO = ["PRECIO", "PRECIO_USD", "PRECIO_UNITARIO", "COSTO", "COSTO_USD", "TARIFA", "VALOR"]
+
+
+def _encabezado(col):
+    return "_".join(plegar(col).upper().replace(".", " ").split())
+
+
+def _columnas(nombre, cols):
+    # Renombra encabezados del archivo a columnas del catálogo (sin tildes ni mayúsculas)
+    destino = {}
+    for col in cols:
+        enc = _encabezado(col)
+        if enc in SINONIMOS_PRECIO:
+            enc = PRECIO[nombre]
+        enc = SINONIMOS.get(enc, enc)
+        if enc in COLUMNAS[nombre] and enc not in destino.values():
+            destino[col] = enc
+    return destino
+
+
+def formato(nombre_archivo):
+    ext = os.path.splitext(str(nombre_archivo))[1].lower().lstrip(".")
+    return {"txt": "csv", "xls": "xlsx", "xlsm": "xlsx", "pq": "parquet"}.get(ext, ext)
+
+
+def _separador(archivo):
+    # "," o ";" (Excel en español exporta con ";"), mirando solo la primera línea
+    if hasattr(archivo, "read"):
+        pos = archivo.tell()
+        primera = archivo.readline()
+        archivo.seek(pos)
+    else:
+        with open(archivo, "rb") as f:
+            primera = f.readline()
+    if isinstance(primera, bytes):
+        primera = primera.decode("utf-8", errors="ignore")
+    return max([",", ";", "\t", "|"], key=primera.count)
+
+
+def leer_bloques(archivo, nombre_archivo=None, tam_bloque=TAM_BLOQUE):
+    # `archivo`: ruta u objeto archivo (p. ej. el de st.file_uploader).
+    # Devuelve bloques de DataFrame con todo como texto (la validación convierte).
+    fmt = formato(nombre_archivo or getattr(archivo, "name", archivo))
+    if fmt == "csv":
+        yield from pd.read_csv(archivo, dtype=str, keep_default_na=False, chunksize=tam_bloque,
+                               sep=_separador(archivo), encoding="utf-8-sig")
+    elif fmt == "parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Para importar Parquet instala pyarrow.")
+        for lote in pq.ParquetFile(archivo).iter_batches(batch_size=tam_bloque):
+            yield lote.to_pandas().astype(object)
+    elif fmt == "xlsx":
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValueError("Para importar Excel instala openpyxl.")
+        libro = load_workbook(archivo, read_only=True, data_only=True)
+        try:
+            filas = libro.worksheets[0].iter_rows(values_only=True)
+            encabezado = [str(c) if c is not None else "" for c in next(filas, [])]
+            bloque = []
+            for fila in filas:
+                bloque.append(fila)
+                if len(bloque) == tam_bloque:
+                    yield pd.DataFrame(bloque, columns=encabezado, dtype=object)
+                    bloque = []
+            if bloque:
+                yield pd.DataFrame(bloque, columns=encabezado, dtype=object)
+        finally:
+            libro.close()
+    else:
+        raise ValueError(f"Formato no soportado: '{fmt}'. Usa {', '.join(FORMATOS)}.")
+
+
+_AMBIGUO = r"[-+]?[1-9]\d{0,2}[.,]\d{3}"                      # "1.000" / "12,500": ¿miles o decimales?
+_MILES_PUNTO = r"[-+]?[1-9]\d{0,2}(?:\.\d{3})+(?:,\d+)?"      # "1.234.567,89"
+_MILES_COMA = r"[-+]?[1-9]\d{0,2}(?:,\d{3})+(?:\.\d+)?"       # "1,234,567.89"
+_DECIMAL_COMA = r"[-+]?\d*,\d+"                               # "1234,5"
+
+
+def _numero(serie):
+    # Texto -> número; el último de "." o "," es el separador decimal ("1.234,50",
+    # "1,234.50", "1,5", "1.5"). Un solo separador seguido de 3 cifras ("1.000") es
+    # ambiguo y no se adivina. Devuelve (números, máscara de ambiguos); vacíos = NaN.
+    if pd.api.types.is_numeric_dtype(serie):
+        return pd.to_numeric(serie, errors="coerce"), pd.Series(False, index=serie.index)
+    es_texto = serie.map(lambda v: isinstance(v, str))
+    directo = pd.to_numeric(serie.where(~es_texto), errors="coerce")  # celdas ya numéricas (Excel)
+    txt = serie.where(es_texto, "").astype(str).str.replace(r"[\s$]", "", regex=True)
+    ambiguo = txt.str.fullmatch(_AMBIGUO)
+    miles_punto = ~ambiguo & txt.str.fullmatch(_MILES_PUNTO)
+    miles_coma = ~ambiguo & txt.str.fullmatch(_MILES_COMA)
+    decimal_coma = ~ambiguo & ~miles_punto & txt.str.fullmatch(_DECIMAL_COMA)
+    txt = txt.where(~miles_punto, txt.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    txt = txt.where(~miles_coma, txt.str.replace(",", "", regex=False))
+    txt = txt.where(~decimal_coma, txt.str.replace(",", ".", regex=False))
+    txt = txt.where(~ambiguo & (txt != ""), None)
+    return pd.to_numeric(txt, errors="coerce").where(es_texto, directo), ambiguo
+
+
+def validar(nombre, bloque, fila_inicial=0):
+    # Un bloque crudo -> (filas válidas normalizadas, rechazadas con FILA/CODIGO/MOTIVO)
+    bloque = bloque.rename(columns=_columnas(nombre, bloque.columns))
+    bloque = bloque.loc[:, ~bloque.columns.duplicated()]
+    presentes = [c for c in COLUMNAS[nombre] if c in bloque.columns]
+    df = bloque[presentes].copy()
+    # número de fila como en el archivo (1 = encabezado)
+    fila = np.arange(fila_inicial, fila_inicial + len(df)) + 2
+    motivo = pd.Series("", index=df.index, dtype=object)
+
+    def rechazar(mascara, texto):
+        nonlocal motivo
+        motivo = motivo.where(~(mascara & (motivo == "")), texto)
+
+    codigo = df["CODIGO"].astype(object).where(df["CODIGO"].notna(), "").astype(str).str.strip()
+    df["CODIGO"] = codigo
+    rechazar(codigo == "", "CODIGO vacío")
+    rechazar(codigo.str.len() > 40, "CODIGO demasiado largo")
+    if "UNIDAD" in df.columns:
+        unidad = df["UNIDAD"].astype(object).where(df["UNIDAD"].notna(), "").astype(str).str.strip()
+        df["UNIDAD"] = unidad
+        rechazar(unidad == "", "UNIDAD vacía")
+    for col in NUMERICAS[nombre]:
+        if col not in df.columns:
+            continue
+        crudo = df[col]
+        num, ambiguo = _numero(crudo)
+        vacio = crudo.isna() | (crudo.astype(str).str.strip() == "")
+        if col == PRECIO[nombre]:
+            rechazar(vacio, f"{col} vacío")
+        rechazar(ambiguo, f"{col} ambiguo (¿miles o decimales?): usa 1000 o 1,00")
+        rechazar(num.isna() & ~vacio, f"{col} no es un número")
+        rechazar(num < 0, f"{col} negativo")
+        df[col] = num
+    malas = motivo != ""
+    rechazadas = pd.DataFrame({"FILA": fila[malas.to_numpy()], "CODIGO": codigo[malas].to_numpy(),
+                               "MOTIVO": motivo[malas].to_numpy()})
+    return df[~malas], rechazadas
+
+
+def importar(catalogo, nombre, archivo, nombre_archivo=None, solo_nuevos=False, tam_bloque=TAM_BLOQUE):
+    # Importa un archivo completo en la tabla `nombre` del catálogo. Devuelve un dict con
+    # el resumen (leidas, nuevas, actualizadas, duplicadas, rechazadas) y los códigos tocados.
+    validas, rechazadas, leidas, columnas = [], [], 0, None
+    for bloque in leer_bloques(archivo, nombre_archivo, tam_bloque):
+        if columnas is None:
+            columnas = set(_columnas(nombre, bloque.columns).values())
+            faltan = [c for c in ("CODIGO", "UNIDAD", PRECIO[nombre]) if c not in columnas]
+            if faltan:
+                raise ValueError(f"Faltan columnas obligatorias: {', '.join(faltan)}.")
+        ok, malas = validar(nombre, bloque, leidas)
+        validas.append(ok)
+        rechazadas.append(malas)
+        leidas += len(bloque)
+    if columnas is None:
+        raise ValueError("El archivo está vacío.")
+    contar("importacion.filas", leidas)
+    filas = pd.concat(validas, ignore_index=True) if validas else pd.DataFrame(columns=["CODIGO"])
+    unicas = filas.drop_duplicates("CODIGO", keep="last")
+    nuevas, actualizadas = (0, 0)
+    if len(unicas):
+        # en códigos existentes solo se pisan las columnas que trae el archivo
+        nuevas, actualizadas = catalogo.importar(nombre, unicas, actualizar=sorted(columnas), solo_nuevos=solo_nuevos)
+    return {
+        "leidas": leidas,
+        "nuevas": nuevas,
+        "actualizadas": actualizadas,
+        "duplicadas": len(filas) - len(unicas),
+        "rechazadas": pd.concat(rechazadas, ignore_index=True),
+        "codigos": unicas["CODIGO"].tolist(),
+    }
@@ -0,0 +1,208 @@
+# ---------------------------
+# INSTRUMENTACIÓN (sin Streamlit, solo biblioteca estándar)
+# ---------------------------
+# Tramos con tiempo (`with tramo("totales"):`) y contadores (`contar("copias_df")`)
+# acumulados por proceso. Se exportan como JSON o texto Prometheus a un archivo
+# (ARQUIPRO_METRICAS_ARCHIVO) o por HTTP local (ARQUIPRO_METRICAS_PUERTO:
+# /metrics y /metrics.json). Además se guardan los tramos de la ejecución
+# (rerun) en curso de cada sesión, para el panel de administración.
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LIMITES_S = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+INTERVALO_ARCHIVO = 10.0  # segundos mínimos entre escrituras del archivo
+
+_lock = threading.Lock()
+_tramos = {}      # nombre -> [cantidad, suma_s, max_s, cubetas...]
+_contadores = {}  # nombre -> valor
+_local = threading.local()  # tramos del rerun en curso (un hilo por sesión de Streamlit)
+_inicio = time.time()
+
+
+def registrar(nombre, segundos):
+    with _lock:
+        t = _tramos.get(nombre)
+        if t is None:
+            t = _tramos[nombre] = [0, 0.0, 0.0] + [0] * len(LIMITES_S)
+        t[0] += 1
+        t[1] += segundos
+        t[2] = max(t[2], segundos)
+        for i, limite in enumerate(LIMITES_S):
+            if segundos <= limite:
+                t[3 + i] += 1
+                break
+    rerun = getattr(_local, "rerun", None)
+    if rerun is not None:
+        rerun.append((nombre, segundos))
+
+
+@contextmanager
+def tramo(nombre):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar(nombre, time.perf_counter() - t0)
+
+
+def contar(nombre, n=1):
+    with _lock:
+        _contadores[nombre] = _contadores.get(nombre, 0) + n
+
+
+def inicio_rerun():
+    # Los tramos de los callbacks que corrieron antes (ver antes_del_rerun) abren este rerun
+    _local.rerun = getattr(_local, "pendientes", None) or []
+    _local.t0 = getattr(_local, "t0_pendientes", None) or time.perf_counter()
+    _local.pendientes = _local.t0_pendientes = None
+
+
+def antes_del_rerun(fn):
+    # Envuelve un callback de widget (on_change/on_click). Streamlit los corre en el mismo
+    # hilo pero antes del script, o sea antes de inicio_rerun(): sus tramos (y su tiempo)
+    # se guardan aparte y se atribuyen al rerun que sigue.
+    def envuelto(*args, **kwargs):
+        if getattr(_local, "rerun", None) is not None:
+            return fn(*args, **kwargs)
+        _local.rerun = getattr(_local, "pendientes", None) or []
+        _local.t0_pendientes = getattr(_local, "t0_pendientes", None) or time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.pendientes, _local.rerun = _local.rerun, None
+    return envuelto
+
+
+def fin_rerun():
+    # Cierra el rerun de este hilo: devuelve sus tramos y, si corresponde, escribe el archivo
+    rerun = getattr(_local, "rerun", None) or []
+    t0 = getattr(_local, "t0", None)
+    _local.rerun = None
+    if t0 is not None:
+        total = time.perf_counter() - t0
+        registrar("rerun", total)
+        rerun.append(("rerun", total))
+    _exportar_archivo()
+    return rerun
+
+
+def instantanea():
+    with _lock:
+        tramos = {k: list(v) for k, v in _tramos.items()}
+        contadores = dict(_contadores)
+    return {
+        "desde": _inicio,
+        "tramos": {
+            k: {"cantidad": v[0], "total_ms": v[1] * 1000, "promedio_ms": v[1] / v[0] * 1000 if v[0] else 0.0,
+                "max_ms": v[2] * 1000, "cubetas": dict(zip([str(x) for x in LIMITES_S], v[3:]))}
+            for k, v in sorted(tramos.items())
+        },
+        "contadores": dict(sorted(contadores.items())),
+    }
+
+
+def a_json():
+    return json.dumps(instantanea(), ensure_ascii=False, indent=2)
+
+
+def _etiqueta(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def a_prometheus():
+    with _lock:
+        tramos = {k: list(v) for k, v in _tramos.items()}
+        contadores = dict(_contadores)
+    lineas = ["# TYPE arquipro_tramo_segundos histogram"]
+    for nombre, v in sorted(tramos.items()):
+        acum = 0
+        et = _etiqueta(nombre)
+        for limite, n in zip(LIMITES_S, v[3:]):
+            acum += n
+            lineas.append(f'arquipro_tramo_segundos_bucket{{tramo="{et}",le="{limite}"}} {acum}')
+        lineas.append(f'arquipro_tramo_segundos_bucket{{tramo="{et}",le="+Inf"}} {v[0]}')
+        lineas.append(f'arquipro_tramo_segundos_sum{{tramo="{et}"}} {v[1]:.6f}')
+        lineas.append(f'arquipro_tramo_segundos_count{{tramo="{et}"}} {v[0]}')
+    lineas.append("# TYPE arquipro_contador_total counter")
+    for nombre, n in sorted(contadores.items()):
+        lineas.append(f'arquipro_contador_total{{nombre="{_etiqueta(nombre)}"}} {n}')
+    return "\n".join(lineas) + "\n"
+
+
+def guardar(ruta):
+    # .json -> JSON; cualquier otra extensión -> texto Prometheus (p. ej. para node_exporter)
+    texto = a_json() if ruta.endswith(".json") else a_prometheus()
+    tmp = f"{ruta}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(texto)
+    os.replace(tmp, ruta)
+
+
+_ultima_escritura = 0.0
+
+
+def _exportar_archivo():
+    global _ultima_escritura
+    ruta = os.environ.get("ARQUIPRO_METRICAS_ARCHIVO")
+    if not ruta or time.monotonic() - _ultima_escritura < INTERVALO_ARCHIVO:
+        return
+    _ultima_escritura = time.monotonic()
+    try:
+        guardar(ruta)
+    except OSError:
+        pass
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            cuerpo, tipo = a_json(), "application/json"
+        elif self.path.startswith("/metrics"):
+            cuerpo, tipo = a_prometheus(), "text/plain; version=0.0.4"
+        else:
+            self.send_error(404)
+            return
+        datos = cuerpo.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", f"{tipo}; charset=utf-8")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def log_message(self, *args):
+        pass
+
+
+_servidor = None
+_puerto_intentado = False
+
+
+def servir(puerto, host="127.0.0.1"):
+    # Endpoint local de métricas, uno por proceso (hilo en segundo plano)
+    global _servidor
+    with _lock:
+        if _servidor is None:
+            _servidor = ThreadingHTTPServer((host, int(puerto)), _Manejador)
+            threading.Thread(target=_servidor.serve_forever, name="arquipro-metricas", daemon=True).start()
+        return _servidor
+
+
+def configurar_desde_entorno():
+    global _puerto_intentado
+    puerto = os.environ.get("ARQUIPRO_METRICAS_PUERTO")
+    if puerto and not _puerto_intentado:
+        _puerto_intentado = True
+        try:
+            servir(puerto)
+        except OSError:
+            pass  # otro proceso ya tiene el puerto
+
+
+def reiniciar():
+    with _lock:
+        _tramos.clear()
+        _contadores.clear()
@@ -0,0 +1,431 @@
+# ---------------------------
+# PDF DEL PRESUPUESTO (sin Streamlit)
+# ---------------------------
+# Las filas llegan como un iterador de tuplas (codigo, descripcion, unidad,
+# cantidad, precio, categoria) generado por bloques desde los arreglos de
+# columnas, sin `iterrows`. El encabezado de la tabla se repite en cada página
+# y se imprimen subtotales por página y por CATEGORIA.
+# Los totales (indirectos, descuento, IVA, anticipo) no se calculan aquí: llegan
+# ya calculados con calculo.totales (lo mismo que muestra la app) y van en la
+# portada y en el resumen final. Las DESCRIPCION largas se parten en líneas
+# según el ancho real del texto (cada palabra se mide una sola vez).
+import multiprocessing
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+import calculo
+from metricas import contar, tramo
+
+COLUMNAS_PDF = ["CODIGO","DESCRIPCION","UNIDAD","CANTIDAD","PRECIO_UNITARIO_USD","CATEGORIA"]
+ENCABEZADOS = ["Código","Descripción","Unidad","Cant.","P.Unit ({moneda})","Subtotal ({moneda})"]
+ANCHOS = [60, 220, 50, 50, 80, 80]
+MARGEN_X = 40
+ALTO_FILA = 12
+ALTO_LINEA = 9  # líneas siguientes de una DESCRIPCION partida
+MAX_LINEAS_DESC = 3
+FUENTE, TAM_FUENTE = "Helvetica", 8
+Y_MIN = 120  # debajo de esto se pasa de página (queda sitio para subtotal y pie)
+TAM_BLOQUE = 2000
+RESUMEN = [  # (concepto de calculo.totales, etiqueta, parámetro que se muestra entre paréntesis)
+    ("base", "Base", None), ("indirectos", "Indirectos", "pct_indirectos"), ("subtotal", "Subtotal", None),
+    ("descuento", "Descuento", "pct_descuento"), ("neto", "Neto", None), ("iva", "IVA", "pct_iva"),
+    ("total", "TOTAL", None), ("anticipo", "Anticipo", "pct_anticipo"),
+]
+
+
+def _texto(arr):
+    return pd.Series(arr, dtype=object).fillna("").astype(str).to_numpy()
+
+
+def subtotales_categoria(budget_df):
+    # [(categoria, rubros, subtotal)] en el mismo orden en que se imprimen las categorías
+    if not len(budget_df):
+        return []
+    if "CATEGORIA" in budget_df.columns:
+        categoria = _texto(budget_df["CATEGORIA"])
+    else:
+        categoria = np.full(len(budget_df), "", dtype=object)
+    g = pd.Series(calculo.subtotales(budget_df)).groupby(categoria, sort=False)
+    return list(zip(g.size().index.tolist(), g.size().tolist(), g.sum().tolist()))
+
+
+def filas_presupuesto(budget_df, por_categoria=True, tam_bloque=TAM_BLOQUE):
+    # Convierte el DataFrame en arreglos de columnas una sola vez y los entrega
+    # por bloques como tuplas de Python (memoria acotada al tamaño del bloque).
+    n = len(budget_df)
+    codigo = _texto(budget_df["CODIGO"])
+    desc = _texto(budget_df["DESCRIPCION"])
+    unidad = _texto(budget_df["UNIDAD"])
+    cant = pd.to_numeric(budget_df["CANTIDAD"], errors="coerce").to_numpy(dtype=float, na_value=0.0)
+    precio = pd.to_numeric(budget_df["PRECIO_UNITARIO_USD"], errors="coerce").to_numpy(dtype=float, na_value=0.0)
+    if "CATEGORIA" in budget_df.columns:
+        categoria = _texto(budget_df["CATEGORIA"])
+    else:
+        categoria = np.full(n, "", dtype=object)
+    cols = [codigo, desc, unidad, cant, precio, categoria]
+    if por_categoria and n:
+        # agrupa categorías contiguas conservando el orden de aparición
+        _, primera, inv = np.unique(categoria, return_index=True, return_inverse=True)
+        orden = np.argsort(primera[inv], kind="stable")
+        cols = [c[orden] for c in cols]
+    for i in range(0, n, tam_bloque):
+        yield from zip(*(c[i:i + tam_bloque].tolist() for c in cols))
+
+
+def _abrir_logo(logo):
+    if logo is None or isinstance(logo, ImageReader):
+        return logo
+    try:
+        return ImageReader(BytesIO(logo) if isinstance(logo, (bytes, bytearray)) else logo)
+    except Exception:
+        return None
+
+
+def spool(max_memoria=8 * 1024 * 1024):
+    # Archivo temporal que vive en memoria hasta `max_memoria` y luego pasa a disco
+    return tempfile.SpooledTemporaryFile(max_size=max_memoria, mode="w+b")
+
+
+_anchos = {}  # palabra -> ancho en FUENTE/TAM_FUENTE (las descripciones repiten mucho vocabulario)
+
+
+def _ancho(palabra):
+    w = _anchos.get(palabra)
+    if w is None:
+        if len(_anchos) > 200_000:
+            _anchos.clear()
+        w = _anchos[palabra] = stringWidth(palabra, FUENTE, TAM_FUENTE)
+    return w
+
+
+def envolver(texto, ancho, max_lineas=MAX_LINEAS_DESC):
+    # Parte `texto` en líneas que entran en `ancho` puntos; la última se corta con "..."
+    if not texto:
+        return [""]
+    palabras = texto.split()
+    anchos = [_ancho(p) for p in palabras]
+    espacio = _ancho(" ")
+    if sum(anchos) + espacio * (len(palabras) - 1) <= ancho:
+        return [" ".join(palabras)]
+    lineas, actual, usado = [], [], 0.0
+    for p, w in zip(palabras, anchos):
+        if actual and usado + espacio + w > ancho:
+            lineas.append(actual)
+            actual, usado = [], 0.0
+        usado += (espacio if actual else 0.0) + w
+        actual.append(p)
+    lineas.append(actual)
+    texto_lineas = [" ".join(l) for l in lineas]
+    if len(texto_lineas) > max_lineas:
+        texto_lineas = texto_lineas[:max_lineas]
+        texto_lineas[-1] = _cortar(texto_lineas[-1] + " ...", ancho)
+    # una palabra sola más ancha que la columna también se corta
+    return [_cortar(l, ancho) if len(l) > 1 and l.count(" ") == 0 and _ancho(l) > ancho else l
+            for l in texto_lineas]
+
+
+def _cortar(texto, ancho):
+    if stringWidth(texto, FUENTE, TAM_FUENTE) <= ancho:
+        return texto
+    texto = texto.removesuffix(" ...")
+    while texto and stringWidth(texto + "...", FUENTE, TAM_FUENTE) > ancho:
+        texto = texto[:-1]
+    return texto.rstrip() + "..."
+
+
+def _etiqueta(etiqueta, param, parametros):
+    pct = (parametros or {}).get(param) if param else None
+    return f"{etiqueta} ({pct:g}%)" if pct is not None else etiqueta
+
+
+class _Pagina:
+    def __init__(self, c, cliente_nombre, moneda="USD"):
+        self.c = c
+        self.cliente_nombre = cliente_nombre
+        self.moneda = moneda
+        self.width, self.height = A4
+        self.num = 0
+        self.y = 0
+        self.subtotal = 0.0
+        self.acumulado = 0.0
+        self.ancho_tabla = sum(ANCHOS)
+
+    def portada(self, logo, constructor_nombre, constructor_cel, constructor_dir, leyenda, totales, parametros,
+                categorias):
+        # Página 1: datos, resumen de totales y subtotales por categoría
+        c, width, height = self.c, self.width, self.height
+        x_fin = MARGEN_X + self.ancho_tabla
+        self.num = 1
+        if logo is not None:
+            try:
+                c.drawImage(logo, width-140, height-100, width=120, height=60, preserveAspectRatio=True, mask='auto')
+            except Exception:
+                pass
+        c.setFont("Helvetica-Bold", 18)
+        c.drawString(MARGEN_X, height-60, "Presupuesto de Obra")
+        c.setFont("Helvetica", 10)
+        y = height - 90
+        for texto in [f"Cliente: {self.cliente_nombre}", f"Fecha: {datetime.now().strftime('%Y-%m-%d')}",
+                      f"Constructor: {constructor_nombre}  |  Cel.: {constructor_cel}",
+                      f"Dirección: {constructor_dir}" if constructor_dir else None,
+                      leyenda or None]:
+            if texto:
+                c.drawString(MARGEN_X, y, texto)
+                y -= 15
+
+        y -= 15
+        c.setFont("Helvetica-Bold", 11)
+        c.drawString(MARGEN_X, y, "Resumen")
+        y = self.resumen(y - 18, totales, parametros, x_fin)
+
+        y -= 20
+        c.setFont("Helvetica-Bold", 11)
+        c.drawString(MARGEN_X, y, "Subtotales por categoría")
+        y -= 16
+        c.setFont("Helvetica-Bold", 9)
+        c.drawString(MARGEN_X, y, "Categoría")
+        c.drawRightString(x_fin - 160, y, "Rubros")
+        c.drawRightString(x_fin - 70, y, f"Subtotal ({self.moneda})")
+        c.drawRightString(x_fin, y, "% base")
+        y -= 4
+        c.line(MARGEN_X, y, x_fin, y)
+        y -= 12
+        c.setFont("Helvetica", 9)
+        base = totales["base"] or 1.0
+        for k, (cat, rubros, sub) in enumerate(categorias):
+            if y < Y_MIN - 40:
+                c.drawString(MARGEN_X, y, f"... y {len(categorias) - k} categorías más (ver detalle)")
+                break
+            c.drawString(MARGEN_X, y, cat or "Sin categoría")
+            c.drawRightString(x_fin - 160, y, f"{rubros}")
+            c.drawRightString(x_fin - 70, y, f"{sub:,.2f}")
+            c.drawRightString(x_fin, y, f"{sub / base * 100:.1f}%")
+            y -= 13
+
+    def resumen(self, y, totales, parametros, x_fin):
+        # Cascada base → ... → anticipo, tal como la calcula calculo.totales
+        c = self.c
+        for concepto, etiqueta, param in RESUMEN:
+            fuerte = concepto == "total"
+            c.setFont("Helvetica-Bold" if fuerte else "Helvetica", 10 if fuerte else 9)
+            c.drawString(x_fin - 250, y, _etiqueta(etiqueta, param, parametros))
+            c.drawRightString(x_fin, y, f"{totales[concepto]:,.2f} {self.moneda}")
+            y -= 14
+        return y
+
+    def encabezado_tabla(self):
+        c = self.c
+        c.setFont("Helvetica-Bold", 9)
+        x = MARGEN_X
+        for htxt, w in zip(ENCABEZADOS, ANCHOS):
+            c.drawString(x, self.y, htxt.format(moneda=self.moneda))
+            x += w
+        self.y -= ALTO_FILA
+        c.line(MARGEN_X, self.y, MARGEN_X + self.ancho_tabla, self.y)
+        self.y -= 8
+        c.setFont(FUENTE, TAM_FUENTE)
+
+    def cerrar(self):
+        # subtotal de la página antes de pasar a la siguiente
+        c = self.c
+        self.acumulado += self.subtotal
+        c.setFont("Helvetica-Oblique", 8)
+        c.drawRightString(
+            MARGEN_X + self.ancho_tabla, Y_MIN - 20,
+            f"Subtotal página {self.num}: {self.subtotal:,.2f}  |  Acumulado: {self.acumulado:,.2f} {self.moneda}",
+        )
+        self.subtotal = 0.0
+
+    def siguiente(self, cerrar=True):
+        c = self.c
+        if cerrar:
+            self.cerrar()
+        c.showPage()
+        self.num += 1
+        c.setFont("Helvetica", 8)
+        c.drawString(MARGEN_X, self.height-40, f"Presupuesto de Obra – {self.cliente_nombre} (detalle)")
+        c.drawRightString(MARGEN_X + self.ancho_tabla, self.height-40, f"Pág. {self.num}")
+        self.y = self.height - 70
+        self.encabezado_tabla()
+
+    def espacio(self, alto=ALTO_FILA):
+        if self.y - alto < Y_MIN:
+            self.siguiente()
+
+
+def render_pdf(filas, salida, cliente_nombre, constructor_nombre, constructor_cel, constructor_dir, leyenda, logo=None,
+               totales=None, parametros=None, categorias=(), moneda="USD"):
+    # `salida` puede ser una ruta o un objeto archivo (BytesIO, spool(), archivo abierto).
+    # `totales`: dict de calculo.totales; `categorias`: salida de subtotales_categoria.
+    c = canvas.Canvas(salida, pagesize=A4)
+    pag = _Pagina(c, cliente_nombre, moneda)
+    pag.portada(_abrir_logo(logo), constructor_nombre, constructor_cel, constructor_dir, leyenda, totales, parametros,
+                categorias)
+    pag.siguiente(cerrar=False)
+    x_cols = np.cumsum([MARGEN_X] + ANCHOS[:-1]).tolist()
+    x_num = [x + w - 4 for x, w in zip(x_cols, ANCHOS)]  # números alineados a la derecha
+    x_fin = MARGEN_X + pag.ancho_tabla
+    ancho_desc = ANCHOS[1] - 6
+
+    total = 0.0
+    cat_actual = None
+    sub_cat = 0.0
+
+    def cerrar_categoria():
+        pag.espacio()
+        c.setFont("Helvetica-Bold", 8)
+        c.drawRightString(x_fin, pag.y, f"Subtotal {cat_actual or 'Sin categoría'}: {sub_cat:,.2f}")
+        c.setFont(FUENTE, TAM_FUENTE)
+        pag.y -= ALTO_FILA + 4
+
+    for codigo, desc, unidad, cant, precio, categoria in filas:
+        if categoria != cat_actual:
+            if cat_actual is not None:
+                cerrar_categoria()
+            cat_actual, sub_cat = categoria, 0.0
+            pag.espacio(2 * ALTO_FILA)
+            c.setFont("Helvetica-Bold", 9)
+            c.drawString(MARGEN_X, pag.y, categoria or "Sin categoría")
+            c.setFont(FUENTE, TAM_FUENTE)
+            pag.y -= ALTO_FILA
+        lineas = envolver(desc, ancho_desc)
+        pag.espacio(ALTO_FILA + ALTO_LINEA * (len(lineas) - 1))
+        sub = cant * precio
+        total += sub
+        sub_cat += sub
+        pag.subtotal += sub
+        y = pag.y
+        c.drawString(x_cols[0], y, codigo)
+        c.drawString(x_cols[2], y, unidad)
+        c.drawRightString(x_num[3], y, f"{cant:,.2f}")
+        c.drawRightString(x_num[4], y, f"{precio:,.2f}")
+        c.drawRightString(x_num[5], y, f"{sub:,.2f}")
+        for linea in lineas:
+            c.drawString(x_cols[1], y, linea)
+            y -= ALTO_LINEA
+        pag.y -= ALTO_FILA + ALTO_LINEA * (len(lineas) - 1)
+    if cat_actual is not None:
+        cerrar_categoria()
+
+    # Resumen final: los mismos totales de la portada
+    alto_resumen = 14 * len(RESUMEN) + 30
+    pag.espacio(alto_resumen)
+    y = pag.y - 6
+    c.line(MARGEN_X, y, x_fin, y)
+    pag.resumen(y - 16, totales, parametros, x_fin)
+    pag.y -= alto_resumen
+    pag.cerrar()
+
+    # Pie - datos constructor
+    c.setFont("Helvetica", 9)
+    c.drawString(MARGEN_X, 60, f"Constructor: {constructor_nombre}  |  Cel.: {constructor_cel}")
+    if constructor_dir:
+        c.drawString(MARGEN_X, 46, f"Dirección: {constructor_dir}")
+    if leyenda:
+        c.drawString(MARGEN_X, 32, f"Leyenda: {leyenda}")
+
+    c.showPage()
+    c.save()
+    return total
+
+
+def nombre_archivo(nombre):
+    return f"{nombre.replace(' ','_')}.pdf"
+
+
+def make_pdf(budget_df, cliente_nombre, constructor_nombre, constructor_cel, constructor_dir, leyenda, logo_bytes,
+             salida=None, totales=None, parametros=None, moneda="USD"):
+    # Sin `salida` devuelve un BytesIO (como antes); con ruta/archivo escribe ahí.
+    # `totales`: el dict de calculo.totales que muestra la app; si falta se calcula
+    # con calculo.calcular_totales y `parametros` (pct_indirectos, pct_descuento, ...).
+    # `moneda`: solo la etiqueta; los precios ya vienen convertidos (ver ajustes.py).
+    buffer = BytesIO() if salida is None else salida
+    with tramo("pdf.make_pdf"):
+        if totales is None:
+            parametros = {**calculo.PARAMETROS_DEFECTO, **(parametros or {})}
+            totales = calculo.calcular_totales(budget_df, **parametros)
+        render_pdf(filas_presupuesto(budget_df), buffer, cliente_nombre, constructor_nombre,
+                   constructor_cel, constructor_dir, leyenda, logo_bytes,
+                   totales=totales, parametros=parametros, categorias=subtotales_categoria(budget_df),
+                   moneda=moneda)
+    contar("pdf.filas", len(budget_df))
+    if hasattr(buffer, "seek"):
+        buffer.seek(0)
+    return buffer
+
+
+# ---------------------------
+# EXPORTACIÓN MASIVA (todos los presupuestos -> ZIP)
+# ---------------------------
+_logo_proceso = None  # logo ya decodificado, uno por proceso trabajador (solo en los hijos del pool)
+
+
+def _iniciar_trabajador(logo_bytes):
+    global _logo_proceso
+    _logo_proceso = _abrir_logo(logo_bytes)
+
+
+def _render(tarea, logo):
+    nombre, budget_df, datos = tarea
+    buffer = make_pdf(budget_df, datos["cliente_nombre"], datos["constructor_nombre"], datos["constructor_cel"],
+                      datos.get("constructor_dir", ""), datos.get("leyenda", ""), logo,
+                      parametros=datos.get("parametros"), moneda=datos.get("moneda", "USD"))
+    return nombre, buffer.getvalue()
+
+
+def _render_uno(tarea):
+    # Solo en los trabajadores del pool (ahí el global es de un único proceso y exportación)
+    return _render(tarea, _logo_proceso)
+
+
+def exportar_todos(presupuestos, datos, logo_bytes=None, procesos=None, salida=None):
+    # presupuestos: dict nombre -> DataFrame. `datos` tiene los campos de texto del PDF
+    # (cliente_nombre, constructor_nombre, constructor_cel, constructor_dir, leyenda) y,
+    # opcionalmente, "parametros" (los porcentajes con que se calculan los totales) y "moneda";
+    # si `datos` es callable se llama con el nombre del presupuesto.
+    # Cada PDF se genera en un proceso del pool; el logo se decodifica una vez por proceso.
+    datos_de = datos if callable(datos) else (lambda _nombre: datos)
+    tareas = []
+    for nombre, df in presupuestos.items():
+        cols = [c for c in COLUMNAS_PDF if c in df.columns]
+        tareas.append((nombre, df[cols], dict(datos_de(nombre))))
+    procesos = min(procesos or os.cpu_count() or 1, max(len(tareas), 1))
+
+    zbuf = BytesIO() if salida is None else salida
+    usados = set()
+    with zipfile.ZipFile(zbuf, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        def guardar(nombre, pdf_bytes):
+            arch = nombre_archivo(nombre)
+            base, n = arch[:-4], 1
+            while arch in usados:
+                n += 1
+                arch = f"{base}_{n}.pdf"
+            usados.add(arch)
+            zf.writestr(arch, pdf_bytes)
+
+        if procesos <= 1:
+            # en el proceso del servidor el logo es local: un global lo verían otras sesiones
+            logo = _abrir_logo(logo_bytes)
+            for tarea in tareas:
+                guardar(*_render(tarea, logo))
+        else:
+            # "spawn": no se hereda el estado del servidor (hilos, sesiones) en los hijos
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=procesos, mp_context=ctx,
+                                     initializer=_iniciar_trabajador, initargs=(logo_bytes,)) as ex:
+                for nombre, pdf_bytes in ex.map(_render_uno, tareas):
+                    guardar(nombre, pdf_bytes)
+    if hasattr(zbuf, "seek"):
+        zbuf.seek(0)
+    return zbuf
@@ -0,0 +1,148 @@
+# ---------------------------
+# PRESUPUESTO COMPACTO (sin Streamlit)
+# ---------------------------
+# Un presupuesto guarda solo sus líneas: CODIGO -> CANTIDAD y, si el usuario lo
+# cambió, un precio propio (NaN = precio del catálogo). Descripción, unidad,
+# categoría, notas, etc. se toman del catálogo compartido solo al mostrar o
+# exportar (`vista`), así la memoria crece con las líneas usadas y no con el
+# tamaño del catálogo.
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+COLUMNAS_LINEA = ["CODIGO","CANTIDAD","PRECIO_USD"]
+
+
+def _posiciones(catalogo, codigos):
+    # Posición de cada código en el catálogo (-1 si no está)
+    cod = pd.Index(catalogo["CODIGO"].astype(str))
+    if cod.is_unique:
+        return cod.get_indexer(pd.Index(codigos, dtype=object))
+    # con códigos repetidos gana la última fila, igual que en el catálogo
+    pos = pd.Series(np.arange(len(cod)), index=cod)
+    pos = pos[~pos.index.duplicated(keep="last")]
+    return pos.reindex(pd.Index(codigos, dtype=object)).fillna(-1).to_numpy(dtype=np.int64)
+
+
+def _precio_catalogo(catalogo, pos):
+    cat = pd.to_numeric(catalogo["PRECIO_UNITARIO_USD"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    if not len(cat):
+        return np.full(len(pos), np.nan)
+    return np.where(pos >= 0, cat[np.maximum(pos, 0)], np.nan)
+
+
+class Presupuesto:
+    def __init__(self, codigos=(), cantidades=(), precios=None, fecha=None):
+        self.codigos = np.array([str(c) for c in codigos], dtype=object)
+        self.cantidad = np.array(cantidades, dtype=float).reshape(-1)
+        n = len(self.codigos)
+        self.precio = np.full(n, np.nan) if precios is None else np.array(precios, dtype=float).reshape(-1)
+        self.fecha = fecha or date.today().isoformat()  # fecha de la cotización (ver historial.py)
+        self.version = 0
+
+    @classmethod
+    def desde_df(cls, df, catalogo=None, solo_con_cantidad=True):
+        # Desde una tabla completa de rubros. El precio queda como propio solo
+        # donde difiere del `catalogo` (por defecto, la misma tabla).
+        if solo_con_cantidad:
+            df = df[pd.to_numeric(df["CANTIDAD"], errors="coerce").fillna(0.0) != 0]
+        p = cls()
+        p.registrar(df, (), df if catalogo is None else catalogo)
+        p.version = 0
+        return p
+
+    @classmethod
+    def desde_lineas(cls, lineas, fecha=None):
+        lineas = lineas.reindex(columns=COLUMNAS_LINEA)
+        return cls(lineas["CODIGO"].to_numpy(), lineas["CANTIDAD"].to_numpy(), lineas["PRECIO_USD"].to_numpy(), fecha)
+
+    def __len__(self):
+        return len(self.codigos)
+
+    def nbytes(self):
+        return self.codigos.nbytes + self.cantidad.nbytes + self.precio.nbytes + sum(len(c) for c in self.codigos)
+
+    def lineas(self):
+        return pd.DataFrame({"CODIGO": self.codigos, "CANTIDAD": self.cantidad, "PRECIO_USD": self.precio})
+
+    def posiciones(self, catalogo):
+        # Fila del catálogo de cada línea (-1 si el código ya no está)
+        return _posiciones(catalogo, self.codigos)
+
+    def precios(self, catalogo):
+        # Precio efectivo por línea: el propio si existe, si no el del catálogo
+        base = _precio_catalogo(catalogo, _posiciones(catalogo, self.codigos))
+        return np.where(np.isnan(self.precio), base, self.precio)
+
+    def base(self, catalogo):
+        return float(np.nansum(self.cantidad * self.precios(catalogo)))
+
+    def vista(self, catalogo):
+        # Une las líneas con el catálogo (solo para mostrar o exportar)
+        pos = _posiciones(catalogo, self.codigos)
+        vista = catalogo.iloc[np.maximum(pos, 0)].reset_index(drop=True) if len(catalogo) else \
+            catalogo.reindex(range(len(self)))
+        vista = vista.drop(columns=["SUBTOTAL"], errors="ignore")
+        if (pos < 0).any():
+            # líneas con códigos que ya no están en el catálogo
+            vista = vista.astype(object)
+            vista.loc[pos < 0, :] = None
+        vista["CODIGO"] = self.codigos
+        vista["CANTIDAD"] = self.cantidad
+        vista["PRECIO_UNITARIO_USD"] = np.where(np.isnan(self.precio), _precio_catalogo(catalogo, pos), self.precio)
+        return vista
+
+    def _donde(self, codigos):
+        return pd.Index(self.codigos).get_indexer(pd.Index(codigos, dtype=object))
+
+    def agregar(self, codigos, cantidad=0.0):
+        # Agrega líneas nuevas (las que ya existen no se duplican)
+        codigos = pd.unique(pd.Series(codigos, dtype=object).astype(str))
+        nuevos = codigos[self._donde(codigos) < 0]
+        if len(nuevos):
+            self.codigos = np.concatenate([self.codigos, nuevos.astype(object)])
+            self.cantidad = np.concatenate([self.cantidad, np.full(len(nuevos), float(cantidad))])
+            self.precio = np.concatenate([self.precio, np.full(len(nuevos), np.nan)])
+            self.version += 1
+        return len(nuevos)
+
+    def fijar_cantidades(self, codigos, cantidades):
+        # Reemplaza CANTIDAD de esas líneas (conservando el precio propio) y agrega
+        # las que falten; p. ej. las cantidades que calcula cubicacion.py
+        cod = pd.Series(codigos, dtype=object).astype(str).to_numpy(dtype=object)
+        cant = np.asarray(cantidades, dtype=float).reshape(-1)
+        pos = self._donde(cod)
+        existe = pos >= 0
+        self.cantidad[pos[existe]] = cant[existe]
+        self.codigos = np.concatenate([self.codigos, cod[~existe]])
+        self.cantidad = np.concatenate([self.cantidad, cant[~existe]])
+        self.precio = np.concatenate([self.precio, np.full(int((~existe).sum()), np.nan)])
+        self.version += 1
+        return int((~existe).sum())
+
+    def registrar(self, filas, borrados, catalogo):
+        # Aplica filas editadas/agregadas (vista completa) y códigos eliminados.
+        # El precio se guarda como propio solo si difiere del catálogo.
+        if len(borrados):
+            quedan = ~pd.Index(self.codigos).isin(pd.Index(list(borrados), dtype=object).astype(str))
+            self.codigos, self.cantidad, self.precio = self.codigos[quedan], self.cantidad[quedan], self.precio[quedan]
+        filas = filas.dropna(subset=["CODIGO"])
+        filas = filas[filas["CODIGO"].astype(str).str.strip() != ""].drop_duplicates("CODIGO", keep="last")
+        if len(filas):
+            cod = filas["CODIGO"].astype(str).to_numpy(dtype=object)
+            cant = pd.to_numeric(filas["CANTIDAD"], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+            precio = pd.to_numeric(filas["PRECIO_UNITARIO_USD"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+            ref = _precio_catalogo(catalogo, _posiciones(catalogo, cod))
+            propio = np.where(np.isclose(precio, ref, rtol=0, atol=1e-9), np.nan, precio)
+            pos = self._donde(cod)
+            existe = pos >= 0
+            self.cantidad[pos[existe]] = cant[existe]
+            self.precio[pos[existe]] = propio[existe]
+            self.codigos = np.concatenate([self.codigos, cod[~existe]])
+            self.cantidad = np.concatenate([self.cantidad, cant[~existe]])
+            self.precio = np.concatenate([self.precio, propio[~existe]])
+        else:
+            existe = np.zeros(0, dtype=bool)
+        self.version += 1
+        return int((~existe).sum())  # líneas nuevas
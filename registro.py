@@ -0,0 +1,166 @@
+# ---------------------------
+# REGISTRO EN GOOGLE SHEETS (cliente compartido + cola de escritura)
+# ---------------------------
+# - La hoja se abre una sola vez por proceso; el cliente de gspread reutiliza el
+#   token de la cuenta de servicio y lo refresca solo cuando expira.
+# - Los registros se encolan y un hilo en segundo plano los envía en lotes con
+#   `append_rows`, reintentando con espera exponencial ante 429/5xx. El login
+#   nunca espera la ida y vuelta a Sheets.
+# - La cola acepta cualquier objeto con `append_rows(filas)`, así que se puede
+#   probar con una hoja falsa local.
+import atexit
+import logging
+import random
+import threading
+import time
+
+from metricas import contar, tramo
+
+SHEET_URL = "https://docs.google.com/spreadsheets/d/1FzV4o3uQafKohDbil0kzfJBHaxmH2QKvOL2MC6gxGE0/edit?usp=sharing"
+SCOPE = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
+
+log = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_hojas = {}  # url -> worksheet
+_colas = {}  # id(worksheet) -> ColaRegistros
+
+
+def obtener_hoja(creds_info, url=SHEET_URL, scopes=SCOPE):
+    # Hoja 1: "Usuarios registrados" con columnas: Nombre y Apellido | WhatsApp | Email | Fecha/Hora
+    with _lock:
+        ws = _hojas.get(url)
+        if ws is None:
+            import gspread
+            from google.oauth2.service_account import Credentials
+            creds = Credentials.from_service_account_info(creds_info, scopes=scopes)
+            client = gspread.authorize(creds)
+            ws = client.open_by_url(url).sheet1
+            _hojas[url] = ws
+        return ws
+
+
+def olvidar_hoja(url=SHEET_URL):
+    # Fuerza a reabrir la hoja en la próxima llamada (p. ej. tras rotar credenciales)
+    with _lock:
+        _hojas.pop(url, None)
+
+
+def _codigo_http(exc):
+    code = getattr(exc, "code", None)
+    if code is None:
+        code = getattr(getattr(exc, "response", None), "status_code", None)
+    return code
+
+
+def es_reintentable(exc):
+    # 429 y 5xx: cuota o falla del servidor. Sin código HTTP, los errores de red
+    # (requests.RequestException, socket.timeout, ConnectionError: todos OSError)
+    # también se reintentan; solo un 4xx (salvo 429) descarta el lote.
+    code = _codigo_http(exc)
+    if code is None:
+        return isinstance(exc, OSError)
+    return code == 429 or (isinstance(code, int) and code >= 500)
+
+
+class ColaRegistros:
+    def __init__(self, hoja, max_lote=200, intervalo=0.5, reintentos=5, espera_base=1.0, espera_max=32.0, dormir=time.sleep):
+        self.hoja = hoja
+        self.max_lote = max_lote
+        self.intervalo = intervalo
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+        self.espera_max = espera_max
+        self._dormir = dormir
+        self._pendientes = []
+        self._en_vuelo = 0
+        self._cond = threading.Condition()
+        self._hilo = None
+        self.enviadas = 0
+        self.descartadas = 0
+
+    def encolar(self, fila):
+        with self._cond:
+            self._pendientes.append(list(fila))
+            self._arrancar()
+            self._cond.notify_all()
+
+    def pendientes(self):
+        with self._cond:
+            return len(self._pendientes) + self._en_vuelo
+
+    def vaciar(self, timeout=None):
+        # Bloquea hasta que la cola quede vacía (o venza el timeout). Devuelve True si vació.
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._arrancar()
+            self._cond.notify_all()
+            while self._pendientes or self._en_vuelo:
+                resto = None if limite is None else limite - time.monotonic()
+                if resto is not None and resto <= 0:
+                    return False
+                self._cond.wait(resto)
+        return True
+
+    def _arrancar(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            self._hilo = threading.Thread(target=self._trabajar, name="arquipro-registro", daemon=True)
+            self._hilo.start()
+
+    def _trabajar(self):
+        while True:
+            with self._cond:
+                while not self._pendientes:
+                    self._cond.wait()
+                # deja que se junten más registros antes de enviar (ráfagas de logins)
+                if len(self._pendientes) < self.max_lote and self.intervalo:
+                    self._cond.wait(self.intervalo)
+                lote = self._pendientes[:self.max_lote]
+                del self._pendientes[:self.max_lote]
+                self._en_vuelo = len(lote)
+            ok = self._enviar(lote)
+            with self._cond:
+                self._en_vuelo = 0
+                if ok is None:
+                    # cuota agotada o red caída tras todos los reintentos: se devuelven al frente
+                    self._pendientes[:0] = lote
+                self._cond.notify_all()
+            if ok is None:
+                self._dormir(self.espera_max)
+
+    def _enviar(self, lote):
+        # True = enviado, False = descartado por error permanente, None = reintentar más tarde
+        for intento in range(self.reintentos + 1):
+            try:
+                with tramo("sheets.append_rows"):
+                    self.hoja.append_rows(lote)
+                self.enviadas += len(lote)
+                contar("sheets.filas_enviadas", len(lote))
+                return True
+            except Exception as e:
+                if not es_reintentable(e):
+                    self.descartadas += len(lote)
+                    log.exception("No se pudieron guardar %d registros en Google Sheets", len(lote))
+                    return False
+                if intento == self.reintentos:
+                    log.warning("Google Sheets no responde (cuota o red); %d registros quedan en cola", len(lote))
+                    return None
+                contar("sheets.reintentos")
+                espera = min(self.espera_max, self.espera_base * 2 ** intento)
+                self._dormir(espera * (1 + random.random() * 0.25))
+
+
+def cola_registros(hoja, **opciones):
+    # Una cola por hoja y por proceso
+    with _lock:
+        cola = _colas.get(id(hoja))
+        if cola is None:
+            cola = ColaRegistros(hoja, **opciones)
+            _colas[id(hoja)] = cola
+        return cola
+
+
+@atexit.register
+def _vaciar_al_salir():
+    for cola in list(_colas.values()):
+        cola.vaciar(timeout=10)
@@ -0,0 +1,130 @@
+# ---------------------------
+# REVISIONES DE PRESUPUESTOS: DIFERENCIAS Y FUSIÓN (sin Streamlit)
+# ---------------------------
+# Trabaja sobre las líneas de presupuesto.py (CODIGO, CANTIDAD, precio propio)
+# alineadas por CODIGO con pandas.Index, sin unir el catálogo ni materializar
+# las dos tablas completas: solo se devuelven las filas que cambiaron.
+# - diferencias(a, b): agregadas, eliminadas y modificadas entre dos revisiones.
+# - comparar(revisiones): una columna de cantidad y subtotal por revisión.
+# - fusionar(base, propia, ajena): fusión de tres vías por CODIGO y campo.
+import numpy as np
+import pandas as pd
+
+from presupuesto import Presupuesto
+
+CAMPOS = ["CANTIDAD", "PRECIO_USD"]  # campos que se comparan y fusionan (NaN = precio del catálogo)
+
+
+def _alinear(p, codigos):
+    # Posiciones de `codigos` en las líneas de p (-1 si no está)
+    return pd.Index(p.codigos).get_indexer(codigos)
+
+
+def _tomar(arr, pos):
+    return np.where(pos >= 0, arr[np.maximum(pos, 0)] if len(arr) else np.nan, np.nan)
+
+
+def _igual(x, y):
+    return (x == y) | (np.isnan(x) & np.isnan(y))
+
+
+def diferencias(a, b, catalogo=None):
+    # Filas que cambian de la revisión `a` a la `b`. Con `catalogo` (rubros vigentes)
+    # se agregan precios efectivos y subtotales; si no, solo cantidades y precios propios.
+    codigos = pd.Index(a.codigos).union(pd.Index(b.codigos), sort=False)
+    pa, pb = _alinear(a, codigos), _alinear(b, codigos)
+    ca, cb = _tomar(a.cantidad, pa), _tomar(b.cantidad, pb)
+    xa, xb = _tomar(a.precio, pa), _tomar(b.precio, pb)
+    estado = np.full(len(codigos), "", dtype=object)
+    estado[(pa < 0) & (pb >= 0)] = "agregada"
+    estado[(pa >= 0) & (pb < 0)] = "eliminada"
+    ambas = (pa >= 0) & (pb >= 0)
+    distinta = ambas & ~(_igual(ca, cb) & _igual(xa, xb))
+    if catalogo is not None:
+        # un cambio de precio de catálogo no es una edición, pero sí cambia el subtotal
+        ea, eb = _tomar(a.precios(catalogo), pa), _tomar(b.precios(catalogo), pb)
+        distinta |= ambas & ~_igual(ea, eb)
+    estado[distinta] = "modificada"
+    cambia = estado != ""
+    out = pd.DataFrame({
+        "CODIGO": np.asarray(codigos)[cambia],
+        "ESTADO": estado[cambia],
+        "CANTIDAD_A": ca[cambia], "CANTIDAD_B": cb[cambia],
+        "PRECIO_USD_A": xa[cambia], "PRECIO_USD_B": xb[cambia],
+    })
+    if catalogo is not None:
+        out["PRECIO_EFECTIVO_A"] = ea[cambia]
+        out["PRECIO_EFECTIVO_B"] = eb[cambia]
+        out["SUBTOTAL_A"] = np.nan_to_num(out["CANTIDAD_A"] * out["PRECIO_EFECTIVO_A"])
+        out["SUBTOTAL_B"] = np.nan_to_num(out["CANTIDAD_B"] * out["PRECIO_EFECTIVO_B"])
+        out["DIFERENCIA"] = out["SUBTOTAL_B"] - out["SUBTOTAL_A"]
+    return out
+
+
+def comparar(revisiones, catalogo, solo_cambios=True):
+    # Varias revisiones (dict nombre -> Presupuesto) lado a lado por CODIGO:
+    # CANTIDAD_<rev> y SUBTOTAL_<rev> para cada una. Con `solo_cambios` quedan
+    # únicamente los códigos cuya cantidad o subtotal difiere entre revisiones.
+    nombres = list(revisiones)
+    codigos = pd.Index([], dtype=object)
+    for p in revisiones.values():
+        codigos = codigos.union(pd.Index(p.codigos), sort=False)
+    cant = np.full((len(codigos), len(nombres)), np.nan)
+    sub = np.zeros((len(codigos), len(nombres)))
+    for j, p in enumerate(revisiones.values()):
+        pos = _alinear(p, codigos)
+        cant[:, j] = _tomar(p.cantidad, pos)
+        sub[:, j] = np.nan_to_num(cant[:, j] * _tomar(p.precios(catalogo), pos))
+    if solo_cambios and len(nombres) > 1:
+        c0 = np.nan_to_num(cant[:, :1], nan=-np.inf)
+        distinto = ((np.nan_to_num(cant, nan=-np.inf) != c0) | ~np.isclose(sub, sub[:, :1])).any(axis=1)
+    else:
+        distinto = np.ones(len(codigos), dtype=bool)
+    out = pd.DataFrame({"CODIGO": np.asarray(codigos)[distinto]})
+    for j, n in enumerate(nombres):
+        out[f"CANTIDAD_{n}"] = cant[distinto, j]
+        out[f"SUBTOTAL_{n}"] = sub[distinto, j]
+    totales = pd.Series(sub.sum(axis=0), index=nombres, name="BASE")
+    return out, totales
+
+
+def fusionar(base, propia, ajena):
+    # Fusión de tres vías por CODIGO y campo: gana el lado que cambió respecto de `base`.
+    # Si ambos cambiaron lo mismo de forma distinta (o uno borró la línea que el otro
+    # editó) es un conflicto y queda la versión `propia`.
+    # Devuelve (Presupuesto fusionado, DataFrame con los conflictos).
+    codigos = pd.Index(base.codigos).union(pd.Index(propia.codigos), sort=False)
+    codigos = codigos.union(pd.Index(ajena.codigos), sort=False)
+    pb, pp, pa = _alinear(base, codigos), _alinear(propia, codigos), _alinear(ajena, codigos)
+    en_b, en_p, en_a = pb >= 0, pp >= 0, pa >= 0
+    ambas = en_p & en_a
+
+    valores, fusion = {}, {}
+    mod_p = np.zeros(len(codigos), dtype=bool)
+    mod_a = np.zeros(len(codigos), dtype=bool)
+    choque = np.zeros(len(codigos), dtype=bool)
+    for campo, attr in zip(CAMPOS, ["cantidad", "precio"]):
+        vb, vp, va = _tomar(getattr(base, attr), pb), _tomar(getattr(propia, attr), pp), _tomar(getattr(ajena, attr), pa)
+        cp, ca = en_b & en_p & ~_igual(vp, vb), en_b & en_a & ~_igual(va, vb)
+        mod_p |= cp
+        mod_a |= ca
+        # editada por ambos con valores distintos, o agregada por ambos con valores distintos
+        choque |= ambas & ~_igual(vp, va) & ((cp & ca) | ~en_b)
+        # con las dos versiones presentes, el campo viene del lado que lo cambió
+        fusion[campo] = np.where(en_p, np.where(ambas & ca & ~cp, va, vp), va)
+        valores[campo] = (vb, vp, va)
+
+    borrada_p, borrada_a = en_b & ~en_p, en_b & ~en_a
+    choque |= (borrada_p & mod_a) | (borrada_a & mod_p)
+    # se borra si algún lado la borró, salvo que el otro la haya editado y ese otro sea `propia`
+    queda = (en_p | en_a) & ~borrada_p & ~(borrada_a & ~mod_p)
+
+    cod = np.asarray(codigos)
+    fusionado = Presupuesto(cod[queda], fusion["CANTIDAD"][queda], fusion["PRECIO_USD"][queda], propia.fecha)
+    motivo = np.where(~en_b, "agregada distinta en ambas",
+                      np.where(borrada_p | borrada_a, "borrada en un lado y editada en el otro", "editada en ambas"))
+    conflictos = pd.DataFrame({"CODIGO": cod[choque], "CONFLICTO": motivo[choque]})
+    for campo, (vb, vp, va) in valores.items():
+        for lado, v in (("BASE", vb), ("PROPIA", vp), ("AJENA", va)):
+            conflictos[f"{campo}_{lado}"] = v[choque]
+    return fusionado, conflictos
@@ -0,0 +1,96 @@
+# ---------------------------
+# RIESGO DE COSTO - MONTE CARLO (sin Streamlit)
+# ---------------------------
+# Cada rubro tiene una INCERTIDUMBRE (Baja/Media/Alta). Cada nivel define una
+# distribución triangular relativa (mínimo, moda, máximo) para el precio y otra
+# para la cantidad. El factor precio×cantidad de cada nivel se resume en una
+# tabla de cuantiles; cada escenario sortea un índice por línea, así que la
+# simulación es: sorteo de enteros -> búsqueda en tabla -> producto matricial
+# con los subtotales. Se procesa por bloques de escenarios para acotar memoria.
+import numpy as np
+import pandas as pd
+
+from calculo import cascada, subtotales
+
+DISTRIBUCIONES = {
+    "Baja":  {"precio": (-0.05, 0.00, 0.05), "cantidad": (-0.02, 0.00, 0.03)},
+    "Media": {"precio": (-0.10, 0.00, 0.15), "cantidad": (-0.05, 0.00, 0.10)},
+    "Alta":  {"precio": (-0.15, 0.05, 0.35), "cantidad": (-0.10, 0.00, 0.25)},
+}
+NIVEL_DEFECTO = "Media"  # rubros sin INCERTIDUMBRE o con un valor desconocido
+PERCENTILES = [50, 80, 95]
+PUNTOS_TABLA = 1024  # resolución de la tabla de cuantiles (potencia de 2)
+MAX_ELEMENTOS = 4_000_000  # escenarios × líneas por bloque
+
+
+def _cuantiles_triangular(minimo, moda, maximo, u):
+    # Inversa de la acumulada de la triangular (en factores 1 + variación)
+    a, c, b = 1 + minimo, 1 + moda, 1 + maximo
+    if b <= a:
+        return np.full(len(u), a)
+    fc = (c - a) / (b - a)
+    return np.where(u < fc, a + np.sqrt(u * (b - a) * (c - a)), b - np.sqrt((1 - u) * (b - a) * (b - c)))
+
+
+def tabla_factores(dist, puntos=PUNTOS_TABLA):
+    # Cuantiles del producto precio×cantidad de un nivel (sin azar: rejilla estratificada)
+    u = (np.arange(512) + 0.5) / 512
+    precio = _cuantiles_triangular(*dist["precio"], u)
+    cantidad = _cuantiles_triangular(*dist["cantidad"], u)
+    producto = np.sort((precio[:, None] * cantidad[None, :]).ravel())
+    pos = ((np.arange(puntos) + 0.5) / puntos * len(producto)).astype(np.int64)
+    return producto[pos].astype(np.float32)
+
+
+def _indices(rng, forma, puntos):
+    # Enteros uniformes en [0, puntos): 4 por cada palabra de 64 bits del generador
+    n = forma[0] * forma[1]
+    crudo = rng.bit_generator.random_raw(-(-n // 4)).view(np.uint16)[:n]
+    return (crudo >> (17 - int(puntos).bit_length())).reshape(forma)
+
+
+def simular_bases(subtotal, niveles, n=100_000, distribuciones=None, semilla=None, max_elementos=MAX_ELEMENTOS):
+    # subtotal: CANTIDAD × PRECIO por línea; niveles: INCERTIDUMBRE por línea.
+    # Devuelve un arreglo con la base simulada de cada escenario.
+    distribuciones = distribuciones or DISTRIBUCIONES
+    subtotal = np.asarray(subtotal, dtype=float)
+    niveles = pd.Series(niveles, dtype=object).where(lambda s: s.isin(list(distribuciones)), NIVEL_DEFECTO).to_numpy()
+    usar = subtotal != 0
+    subtotal, niveles = subtotal[usar], niveles[usar]
+    bases = np.zeros(n)
+    if not len(subtotal):
+        return bases
+    # líneas agrupadas por nivel: cada grupo usa su propia tabla
+    grupos = []
+    for nivel in pd.unique(niveles):
+        sel = niveles == nivel
+        grupos.append((tabla_factores(distribuciones[nivel]), subtotal[sel].astype(np.float32), subtotal[sel].sum()))
+    rng = np.random.default_rng(semilla)
+    bloque = max(1, max_elementos // len(subtotal))
+    for ini in range(0, n, bloque):
+        k = min(bloque, n - ini)
+        for tabla, pesos, suma in grupos:
+            idx = _indices(rng, (k, len(pesos)), len(tabla))
+            # se suma en float64 la desviación respecto de la suma exacta (menos redondeo)
+            bases[ini:ini + k] += suma + (np.take(tabla, idx) - np.float32(1)) @ pesos
+    return bases
+
+
+def simular(df, n=100_000, pct_indirectos=0.0, pct_descuento=0.0, pct_iva=15.0,
+            distribuciones=None, percentiles=PERCENTILES, semilla=None):
+    # Un presupuesto (vista con CANTIDAD, PRECIO_UNITARIO_USD, INCERTIDUMBRE) -> DataFrame
+    # con la base y el total (después de indirectos, descuento e IVA) en cada percentil,
+    # y la contingencia = total del percentil - total determinístico.
+    niveles = df["INCERTIDUMBRE"] if "INCERTIDUMBRE" in df.columns else pd.Series(NIVEL_DEFECTO, index=df.index)
+    sub = subtotales(df)
+    bases = simular_bases(sub, niveles.to_numpy(), n, distribuciones, semilla)
+    punto = cascada(sub.sum(), pct_indirectos, pct_descuento, pct_iva)["total"]
+    base_p = np.percentile(bases, percentiles)
+    total_p = cascada(base_p, pct_indirectos, pct_descuento, pct_iva)["total"]
+    return pd.DataFrame({
+        "percentil": [f"P{p}" for p in percentiles],
+        "base": base_p,
+        "total": total_p,
+        "contingencia": total_p - punto,
+        "contingencia_pct": np.where(punto != 0, (total_p - punto) / (punto or 1) * 100, 0.0),
+    })
@@ -0,0 +1,47 @@
+# ---------------------------
+# TEMA (CSS) - se arma una sola vez por proceso
+# ---------------------------
+# app.py se vuelve a ejecutar en cada interacción; como este módulo se importa
+# una sola vez, el CSS de cada tema queda listo en memoria.
+_PLANTILLA = """
+    <style>
+    html, body, [class*="css"]  {{
+      background-color: {fondo} !important;
+      color: {texto} !important;
+      font-family: Inter, system-ui, -apple-system, Segoe UI, Roboto, "Helvetica Neue", Arial;
+    }}
+    .stButton>button {{
+      border-radius: 12px;
+      border: 2px solid {acento};
+      background: {boton};
+      color: {texto};
+    }}
+    .stButton>button:hover {{
+      border-color: {acento_hover};
+      background: {boton_hover};
+    }}
+    .help-btn button{{
+      background: #FFD400 !important;
+      color: #000 !important;
+      border: 0 !important;
+      font-weight: 700 !important;
+    }}
+    .accent{{
+      border: 1px solid {acento} !important;
+      border-radius: 12px;
+      padding: 8px 12px;
+    }}
+    </style>
+"""
+
+# Tema oscuro + acentos verde claro + botón ayuda amarillo
+CSS = {
+    "Oscuro": _PLANTILLA.format(fondo="#121212", texto="#FFFFFF", acento="#7CFFB2", boton="#1E1E1E",
+                                acento_hover="#B5FFD4", boton_hover="#2A2A2A"),
+    "Claro": _PLANTILLA.format(fondo="#FAFAFA", texto="#111", acento="#2ecc71", boton="#FFFFFF",
+                               acento_hover="#35d47a", boton_hover="#F3FFF8"),
+}
+
+
+def css(dark=True):
+    return CSS["Oscuro" if dark else "Claro"]